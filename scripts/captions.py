@@ -0,0 +1,138 @@
+import os
+import hashlib
+import json
+
+# Pillow n'est importé qu'au premier rendu d'une légende absente du cache
+
+# --- Chemins des fichiers ---
+# Les légendes rendues sont mises en cache (persistant entre les exécutions) et identifiées par un hash
+# de leur texte, de la police, de la taille et du style : un même texte n'est jamais rendu deux fois.
+CAPTION_CACHE_DIR = os.path.join("cache", "captions")
+
+FONT_PATHS = [
+    "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf", # Common on Linux
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",                # Common on Linux
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans-Regular.ttf",
+    "/System/Library/Fonts/Supplemental/Arial.ttf",                   # macOS
+    "C:/Windows/Fonts/arial.ttf"                                      # Windows
+]
+
+# Styles de légende :
+#   "box": texte blanc sur un fond noir semi-transparent (timecodes de compile_video.py)
+#   "outline": texte blanc avec un contour noir (titre et streamer incrustés par download_clips.py)
+CAPTION_STYLES = {
+    "box": {"fill": (255, 255, 255, 255), "box": (0, 0, 0, 153), "stroke_width": 0, "stroke_fill": None},
+    "outline": {"fill": (255, 255, 255, 255), "box": None, "stroke_width": 2, "stroke_fill": (0, 0, 0, 255)}
+}
+
+_font_cache = {}
+
+def find_font_path():
+    """Retourne le premier fichier de police TrueType disponible, ou None."""
+    for path in FONT_PATHS:
+        if os.path.exists(path):
+            return path
+    return None
+
+def get_caption_font(size):
+    """Charge (une seule fois par taille) la police des légendes, ou la police par défaut de Pillow."""
+    if size not in _font_cache:
+        from PIL import ImageFont
+
+        font_path = find_font_path()
+        try:
+            _font_cache[size] = ImageFont.truetype(font_path, size) if font_path else ImageFont.load_default()
+        except IOError:
+            print("⚠️ Police TrueType illisible pour les légendes. Utilisation de la police par défaut de Pillow.")
+            _font_cache[size] = ImageFont.load_default()
+    return _font_cache[size]
+
+def caption_strip_height(font_size, line_count):
+    """Hauteur de la bande de légende : constante pour un profil, afin que toutes ses légendes aient la même taille."""
+    return max(1, line_count) * int(font_size * 1.4) + 2 * int(font_size * 0.3)
+
+def fit_line(draw, text, font_size, max_width, stroke_width):
+    """Réduit la taille de police (jusqu'à 60 %) puis tronque le texte pour qu'il tienne dans max_width."""
+    size = font_size
+    while True:
+        font = get_caption_font(size)
+        width = draw.textlength(text, font=font) + 2 * stroke_width
+        if width <= max_width:
+            return text, font
+        if size > font_size * 0.6:
+            size -= 2
+            continue
+        while text and draw.textlength(text + "…", font=font) + 2 * stroke_width > max_width:
+            text = text[:-1]
+        return text.rstrip() + "…", font
+
+def render_caption(lines, width, height, font_size, style="box"):
+    """
+    Rend une légende (une ou plusieurs lignes centrées) en image RGBA transparente de width x height.
+    Retourne le chemin du PNG en cache ; l'image n'est générée que si elle n'existe pas déjà.
+    """
+    key_data = json.dumps([lines, find_font_path(), font_size, width, height, style], ensure_ascii=False)
+    key = hashlib.sha1(key_data.encode("utf-8")).hexdigest()
+    caption_path = os.path.join(CAPTION_CACHE_DIR, f"{key}.png")
+    if os.path.exists(caption_path):
+        return caption_path
+
+    from PIL import Image, ImageDraw
+
+    os.makedirs(CAPTION_CACHE_DIR, exist_ok=True)
+    caption_style = CAPTION_STYLES[style]
+    image = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(image)
+
+    line_height = int(font_size * 1.4)
+    padding = int(font_size * 0.3)
+    for i, line in enumerate(lines):
+        text, font = fit_line(draw, line, font_size, width - 2 * padding, caption_style["stroke_width"])
+        text_width = draw.textlength(text, font=font)
+        x = (width - text_width) / 2
+        y = padding + i * line_height
+        if caption_style["box"]:
+            draw.rectangle([x - padding, y, x + text_width + padding, y + line_height], fill=caption_style["box"])
+        draw.text(
+            (x, y + (line_height - font.size) / 2) if hasattr(font, "size") else (x, y),
+            text,
+            font=font,
+            fill=caption_style["fill"],
+            stroke_width=caption_style["stroke_width"],
+            stroke_fill=caption_style["stroke_fill"]
+        )
+
+    # Écriture atomique : un PNG à moitié écrit ne doit jamais être servi depuis le cache
+    temp_path = f"{caption_path}.{os.getpid()}.tmp"
+    image.save(temp_path, format="PNG")
+    os.replace(temp_path, caption_path)
+    return caption_path
+
+def build_caption_timeline(captions, width, height, font_size, total_duration, list_path, style="box"):
+    """
+    Écrit une liste de concaténation FFmpeg (concat demuxer) d'images de légende, avec une image transparente
+    dans les intervalles sans légende. Lue comme une seule entrée vidéo, elle permet d'afficher toutes les
+    légendes avec un unique filtre overlay, quel que soit le nombre de clips.
+    captions: liste de (début en secondes, durée d'affichage, [lignes]).
+    """
+    blank_path = render_caption([], width, height, font_size, style)
+    entries = []
+    position = 0.0
+    for start, display_duration, lines in sorted(captions, key=lambda caption: caption[0]):
+        if start > position:
+            entries.append((blank_path, start - position))
+        entries.append((render_caption(lines, width, height, font_size, style), display_duration))
+        position = start + display_duration
+    if total_duration > position:
+        entries.append((blank_path, total_duration - position))
+
+    with open(list_path, "w", encoding="utf-8") as f:
+        f.write("ffconcat version 1.0\n")
+        for image_path, duration in entries:
+            if duration <= 0:
+                continue
+            f.write(f"file '{os.path.abspath(image_path)}'\n")
+            f.write(f"duration {duration:.3f}\n")
+        # Le concat demuxer ignore la durée de la dernière entrée : on répète l'image finale
+        f.write(f"file '{os.path.abspath(entries[-1][0] if entries else blank_path)}'\n")
+    return list_path
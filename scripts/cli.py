@@ -0,0 +1,142 @@
+import os
+import sys
+import json
+import time
+import argparse
+import importlib
+import statistics
+import subprocess
+from datetime import datetime, timezone
+
+from run_context import RUN_ID_ENV_VAR, RUN_ROOT_ENV_VAR, TARGET_ENV_VAR, file_lock, atomic_write_json
+
+# Point d'entrée unique du pipeline : chaque sous-commande importe son module au moment de l'exécution,
+# si bien qu'une étape ne paie jamais l'import des dépendances des autres (googleapiclient, Pillow, numpy...).
+# Sous-commande -> (module du dossier scripts/, description)
+COMMANDS = {
+    "top-clips": ("get_top_clips", "Sélectionne les meilleurs clips Twitch de chaque cible"),
+    "download": ("download_clips", "Télécharge et prétraite les clips sélectionnés"),
+    "compile": ("compile_video", "Compile les clips en vidéo(s) avec timecodes"),
+    "metadata": ("generate_metadata", "Génère le titre, la description et les tags"),
+    "thumbnail": ("generate_thumbnail", "Génère la miniature et ses variantes"),
+    "upload": ("upload_youtube", "Uploade la vidéo et la miniature sur YouTube"),
+    "rollup": ("rollup", "Assemble un best of hebdomadaire ou mensuel à partir des segments archivés"),
+    "broadcaster-id": ("get_broadcaster_id", "Affiche l'ID Twitch d'un streamer"),
+    "benchmark-encoder": ("encoder_benchmark", "Compare des réglages x264 et recommande un profil"),
+    "benchmark-clips": ("clip_model", "Compare le modèle Clip aux dictionnaires"),
+}
+# Étapes qui appellent une API authentifiée : leur jeton d'accès (voir credentials.py) est préparé en
+# arrière-plan pendant l'import du module, au lieu d'être demandé une fois l'étape lancée.
+COMMAND_CREDENTIALS = {
+    "top-clips": "twitch",
+    "broadcaster-id": "twitch",
+    "upload": "youtube",
+}
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# --- Mesure du démarrage à froid ---
+# Historique des mesures (persistant entre les exécutions, voir l'étape de cache du workflow)
+COLD_START_HISTORY_JSON = os.path.join("cache", "metrics", "cold_start.json")
+COLD_START_HISTORY_LENGTH = 30 # Nombre de mesures conservées
+COLD_START_REPEAT = 5 # Lancements par module (la médiane est retenue)
+
+def measure_cold_start(module_name, repeat=COLD_START_REPEAT):
+    """
+    Lance un interpréteur neuf qui importe uniquement le module d'une étape.
+    Retourne {"process": durée totale du processus, "import": durée de l'import} en secondes (médianes),
+    ou None si le module ne peut pas être importé (dépendance manquante).
+    """
+    code = (
+        "import sys, time; sys.path.insert(0, sys.argv[1]); start = time.perf_counter(); "
+        f"import {module_name}; print(time.perf_counter() - start)"
+    )
+    process_times = []
+    import_times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, "-c", code, SCRIPTS_DIR], capture_output=True, text=True)
+        elapsed = time.perf_counter() - start
+        if result.returncode != 0:
+            print(f"  ⚠️ {module_name} : import impossible ({result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'erreur inconnue'})")
+            return None
+        process_times.append(elapsed)
+        import_times.append(float(result.stdout.strip().splitlines()[-1]))
+    return {"process": statistics.median(process_times), "import": statistics.median(import_times)}
+
+def load_cold_start_history():
+    if not os.path.exists(COLD_START_HISTORY_JSON):
+        return []
+    try:
+        with open(COLD_START_HISTORY_JSON, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (IOError, json.JSONDecodeError) as e:
+        print(f"⚠️ Historique des démarrages illisible ({e}), il sera recréé.")
+        return []
+
+def benchmark_startup(argv=None):
+    """Mesure le démarrage à froid de chaque sous-commande et le compare à la mesure précédente."""
+    parser = argparse.ArgumentParser(prog="cli.py benchmark-startup", description="Mesure le démarrage à froid de chaque étape.")
+    parser.add_argument("--repeat", type=int, default=COLD_START_REPEAT, help="Lancements par étape (médiane retenue).")
+    args = parser.parse_args(argv)
+
+    history = load_cold_start_history()
+    previous = history[-1]["stages"] if history else {}
+
+    print(f"⏱️ Démarrage à froid par étape (médiane de {args.repeat} lancements)")
+    print(f"{'Étape':<20}{'Processus (ms)':>16}{'Import (ms)':>14}{'Écart (ms)':>12}")
+    stages = {}
+    for command, (module_name, _) in COMMANDS.items():
+        timing = measure_cold_start(module_name, args.repeat)
+        if timing is None:
+            continue
+        stages[command] = timing
+        delta = ""
+        if command in previous:
+            delta = f"{(timing['process'] - previous[command]['process']) * 1000:+.0f}"
+        print(f"{command:<20}{timing['process'] * 1000:>16.0f}{timing['import'] * 1000:>14.0f}{delta:>12}")
+
+    with file_lock(COLD_START_HISTORY_JSON):
+        history = load_cold_start_history()
+        history.append({"date": datetime.now(timezone.utc).isoformat(timespec="seconds"), "stages": stages})
+        atomic_write_json(COLD_START_HISTORY_JSON, history[-COLD_START_HISTORY_LENGTH:], indent=2)
+    print(f"Mesures enregistrées dans {COLD_START_HISTORY_JSON}")
+
+def main(argv=None):
+    command_list = "\n".join(f"  {name:<20}{description}" for name, (_, description) in COMMANDS.items())
+    parser = argparse.ArgumentParser(
+        prog="cli.py",
+        description="Pipeline des clips Twitch du jour : une sous-commande par étape.",
+        epilog=f"Étapes :\n{command_list}\n  {'benchmark-startup':<20}Mesure le démarrage à froid de chaque étape\n\n"
+               "Les options d'une étape s'affichent avec : cli.py <étape> -h",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--run-id", help="Identifiant de l'exécution : ses fichiers sont lus et écrits sous runs/<id>/ (voir run_context.py).")
+    parser.add_argument("--run-root", help="Racine explicite des fichiers de l'exécution (prioritaire sur --run-id).")
+    parser.add_argument("--target", help="Cible de compilation (voir COMPILATION_TARGETS) : ses fichiers sont sous targets/<cible>/ (voir run_context.py).")
+    parser.add_argument("command", choices=list(COMMANDS) + ["benchmark-startup"], metavar="étape")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.command == "benchmark-startup":
+        benchmark_startup(args.args)
+        return
+
+    # Défini avant l'import de l'étape : ses chemins sont résolus à l'import
+    if args.run_id:
+        os.environ[RUN_ID_ENV_VAR] = args.run_id
+    if args.run_root:
+        os.environ[RUN_ROOT_ENV_VAR] = args.run_root
+    if args.target:
+        os.environ[TARGET_ENV_VAR] = args.target
+
+    if args.command in COMMAND_CREDENTIALS:
+        from credentials import prefetch
+        prefetch(COMMAND_CREDENTIALS[args.command])
+
+    module_name, _ = COMMANDS[args.command]
+    module = importlib.import_module(module_name)
+    module.main(args.args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+import os
+import json
+import bisect
+from io import BytesIO
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from run_context import file_lock, atomic_write_json, read_json
+
+# numpy, requests et Pillow ne sont importés que si des miniatures doivent être téléchargées et hachées :
+# le dédoublonnage par VOD (drop_overlapping_clips) et les empreintes en cache n'en ont pas besoin.
+
+# --- Chemins des fichiers ---
+# Cache persistant entre les exécutions (contrairement à data/ qui est supprimé à la fin du workflow)
+CACHE_DIR = "cache"
+HASH_CACHE_JSON = os.path.join(CACHE_DIR, "thumbnail_hashes.json") # Empreintes perceptuelles par ID de clip
+
+# --- PARAMÈTRES DE DÉDOUBLONNAGE ---
+# Distance de Hamming maximale (sur 64 bits) pour considérer deux miniatures comme la même scène
+MAX_HAMMING_DISTANCE = 10
+# Deux clips du même streamer ne sont comparés que s'ils ont été créés à moins de X secondes d'intervalle
+DUPLICATE_TIME_WINDOW_SECONDS = 15 * 60
+# Nombre de miniatures téléchargées en parallèle
+THUMBNAIL_FETCH_WORKERS = 8
+
+class BKTree:
+    """Arbre BK sur la distance de Hamming : recherche des empreintes proches sans comparer toutes les paires."""
+
+    def __init__(self):
+        self.root = None # (hash, items, {distance: enfant})
+
+    def add(self, value, item):
+        if self.root is None:
+            self.root = (value, [item], {})
+            return
+        node = self.root
+        while True:
+            node_value, node_items, children = node
+            distance = hamming_distance(value, node_value)
+            if distance == 0:
+                node_items.append(item)
+                return
+            if distance not in children:
+                children[distance] = (value, [item], {})
+                return
+            node = children[distance]
+
+    def search(self, value, max_distance):
+        """Retourne les éléments dont l'empreinte est à une distance <= max_distance."""
+        matches = []
+        nodes = [self.root] if self.root is not None else []
+        while nodes:
+            node_value, node_items, children = nodes.pop()
+            distance = hamming_distance(value, node_value)
+            if distance <= max_distance:
+                matches.extend(node_items)
+            # Inégalité triangulaire : seuls ces sous-arbres peuvent contenir des résultats
+            for child_distance, child in children.items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    nodes.append(child)
+        return matches
+
+def hamming_distance(a, b):
+    """Nombre de bits différents entre deux empreintes de 64 bits."""
+    return bin(a ^ b).count("1")
+
+def load_hash_cache():
+    """Charge le cache des empreintes (ID de clip -> empreinte hexadécimale)."""
+    if not os.path.exists(HASH_CACHE_JSON):
+        return {}
+    try:
+        with open(HASH_CACHE_JSON, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (IOError, json.JSONDecodeError) as e:
+        print(f"  ⚠️ Cache des empreintes illisible ({e}), il sera reconstruit.")
+        return {}
+
+def save_hash_cache(cache):
+    # Fusion sous verrou avec les empreintes enregistrées entre-temps par une autre exécution
+    with file_lock(HASH_CACHE_JSON):
+        merged = read_json(HASH_CACHE_JSON, {})
+        merged.update(cache)
+        atomic_write_json(HASH_CACHE_JSON, merged)
+
+def fetch_thumbnail_pixels(url):
+    """
+    Télécharge la miniature d'aperçu d'un clip et la réduit en niveaux de gris 9x8 (entrée du dHash).
+    Retourne None si la miniature n'est pas disponible.
+    """
+    if not url:
+        return None
+    import numpy as np
+    import requests
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        response = requests.get(url, timeout=10)
+        response.raise_for_status()
+        img = Image.open(BytesIO(response.content))
+        img.draft("L", (64, 64)) # Décodage JPEG directement à échelle réduite
+        img = img.convert("L").resize((9, 8), Image.Resampling.BILINEAR)
+        return np.asarray(img, dtype=np.int16)
+    except (requests.exceptions.RequestException, IOError, UnidentifiedImageError) as e:
+        print(f"  ⚠️ Miniature indisponible ({url}): {e}")
+        return None
+
+def compute_dhashes(pixel_blocks):
+    """
+    Calcule les dHash 64 bits d'un lot de miniatures 9x8 en une seule opération vectorisée.
+    Chaque bit indique si un pixel est plus clair que son voisin de droite.
+    """
+    import numpy as np
+
+    stack = np.stack(pixel_blocks) # (N, 8, 9)
+    bits = stack[:, :, 1:] > stack[:, :, :-1] # (N, 8, 8)
+    packed = np.packbits(bits.reshape(len(pixel_blocks), 64), axis=1) # (N, 8) octets
+    return [int(value) for value in packed.view(">u8").ravel()]
+
+def get_clip_hashes(clips):
+    """Retourne {ID de clip: empreinte} en ne téléchargeant que les miniatures absentes du cache."""
+    cache = load_hash_cache()
+    missing = [clip for clip in clips if clip.id not in cache and clip.thumbnail_url]
+
+    if missing:
+        print(f"  🖼️ Téléchargement de {len(missing)} miniatures d'aperçu ({len(clips) - len(missing)} empreintes en cache)...")
+        with ThreadPoolExecutor(max_workers=THUMBNAIL_FETCH_WORKERS) as executor:
+            pixels = list(executor.map(lambda clip: fetch_thumbnail_pixels(clip.thumbnail_url), missing))
+        fetched = [(clip, block) for clip, block in zip(missing, pixels) if block is not None]
+        if fetched:
+            hashes = compute_dhashes([block for _, block in fetched])
+            for (clip, _), value in zip(fetched, hashes):
+                cache[clip.id] = f"{value:016x}"
+            save_hash_cache(cache)
+
+    return {clip.id: int(cache[clip.id], 16) for clip in clips if clip.id in cache}
+
+def parse_created_at(clip):
+    try:
+        return datetime.strptime(clip.created_at, "%Y-%m-%dT%H:%M:%SZ").timestamp()
+    except (TypeError, ValueError):
+        return None
+
+def filter_near_duplicates(clips):
+    """
+    Supprime les clips quasi identiques (même scène clippée par plusieurs viewers) avant tout téléchargement.
+
+    Les clips doivent être fournis dans l'ordre du classement : le premier d'un groupe de doublons
+    (le mieux classé) est conservé. Deux clips sont des doublons s'ils viennent du même streamer,
+    ont été créés dans la même fenêtre de temps et ont des miniatures perceptuellement proches.
+    Les clips sans miniature exploitable sont toujours conservés.
+    """
+    if not clips:
+        return clips
+
+    print(f"\n--- Dédoublonnage perceptuel de {len(clips)} clips candidats ---")
+    hashes = get_clip_hashes(clips)
+
+    trees = {} # Un arbre BK par streamer
+    kept_clips = []
+    for clip in clips:
+        clip_hash = hashes.get(clip.id)
+        if clip_hash is None:
+            kept_clips.append(clip)
+            continue
+
+        created_at = parse_created_at(clip)
+        tree = trees.setdefault(clip.broadcaster_id, BKTree())
+        duplicate_of = None
+        for other in tree.search(clip_hash, MAX_HAMMING_DISTANCE):
+            other_created_at = parse_created_at(other)
+            if created_at is None or other_created_at is None or abs(created_at - other_created_at) <= DUPLICATE_TIME_WINDOW_SECONDS:
+                duplicate_of = other
+                break
+
+        if duplicate_of is not None:
+            print(f"  [DOUBLON] Ignoré : '{clip.title}' ({clip.viewer_count} vues), même scène que '{duplicate_of.title}' ({duplicate_of.viewer_count} vues)")
+            continue
+
+        tree.add(clip_hash, clip)
+        kept_clips.append(clip)
+
+    print(f"✅ {len(clips) - len(kept_clips)} doublon(s) supprimé(s), {len(kept_clips)} clips conservés.")
+    return kept_clips
+
+class VodIntervalIndex:
+    """
+    Index des intervalles [vod_offset, vod_offset + duration] des clips, par video_id (VOD d'origine).
+    Les intervalles sont triés par début : les clips chevauchant un intervalle se trouvent par recherche
+    dichotomique, bornée par la durée du plus long clip de la VOD.
+    """
+
+    def __init__(self, clips):
+        by_video = {}
+        for clip in clips:
+            interval = clip_vod_interval(clip)
+            if interval is not None:
+                by_video.setdefault(clip.video_id, []).append((interval[0], interval[1], clip))
+
+        self.intervals = {}
+        self.starts = {}
+        self.max_length = {}
+        for video_id, intervals in by_video.items():
+            intervals.sort(key=lambda interval: interval[0])
+            self.intervals[video_id] = intervals
+            self.starts[video_id] = [interval[0] for interval in intervals]
+            self.max_length[video_id] = max(end - start for start, end, _ in intervals)
+
+    def overlapping(self, video_id, start, end):
+        """Retourne les clips de la VOD dont l'intervalle chevauche [start, end]."""
+        starts = self.starts.get(video_id)
+        if not starts:
+            return []
+        lo = bisect.bisect_left(starts, start - self.max_length[video_id])
+        hi = bisect.bisect_left(starts, end)
+        return [clip for other_start, other_end, clip in self.intervals[video_id][lo:hi] if other_end > start]
+
+def clip_vod_interval(clip):
+    """Intervalle du clip dans sa VOD, ou None si la VOD n'est pas connue (VOD supprimée, offset absent)."""
+    if not clip.video_id or clip.vod_offset is None:
+        return None
+    start = float(clip.vod_offset)
+    return start, start + clip.duration
+
+def drop_overlapping_clips(clips):
+    """
+    Ne garde que le clip le plus vu de chaque moment de stream : deux clips dont les intervalles
+    dans la même VOD se chevauchent montrent la même scène. Aucun téléchargement n'est nécessaire.
+    L'ordre des clips conservés est préservé.
+    """
+    index = VodIntervalIndex(clips)
+    dropped_ids = set()
+    kept_ids = set()
+    for clip in sorted(clips, key=lambda x: x.viewer_count, reverse=True):
+        interval = clip_vod_interval(clip)
+        if interval is None:
+            continue
+        winner = next((other for other in index.overlapping(clip.video_id, *interval) if other.id in kept_ids), None)
+        if winner is not None:
+            dropped_ids.add(clip.id)
+            print(f"  [CHEVAUCHEMENT] Ignoré : '{clip.title}' ({clip.viewer_count} vues), même moment que '{winner.title}' ({winner.viewer_count} vues)")
+        else:
+            kept_ids.add(clip.id)
+
+    if dropped_ids:
+        print(f"✅ {len(dropped_ids)} clip(s) chevauchant un clip plus vu de la même VOD supprimé(s).")
+    return [clip for clip in clips if clip.id not in dropped_ids]
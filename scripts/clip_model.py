@@ -0,0 +1,387 @@
+import os
+import json
+import time
+import uuid
+import argparse
+import tracemalloc
+
+# Sérialisation rapide optionnelle : orjson (même JSON, plus rapide) et msgpack (binaire, plus compact).
+# Sans ces paquets, la bibliothèque standard json est utilisée.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Extension des fichiers de passage écrits en msgpack (tous les autres sont en JSON)
+MSGPACK_EXTENSION = ".msgpack"
+
+# --- FLUX DE PASSAGE (JSON Lines) ---
+# En plus de son fichier final, une étape peut publier ses clips au fur et à mesure dans un fichier .jsonl
+# (un enregistrement par ligne, ajouté puis vidé immédiatement) : l'étape suivante commence à les traiter
+# sans attendre la fin. Événements :
+#   start: en-tête (première ligne) avec le jeton de l'exécution (token) et le PID du processus qui écrit (pid)
+#   provisional: clip presque sûrement retenu, publié avant la fin de la sélection (peut ne pas être confirmé)
+#   clip: enregistrement définitif, dans l'ordre de la liste finale
+#   complete: marqueur de fin (status "ok" ou "failed", count = nombre d'enregistrements "clip")
+# Un lecteur ne prend que les lignes terminées par un saut de ligne : une ligne en cours d'écriture est ignorée.
+# Le jeton est lu dans STREAM_TOKEN (partagé par l'écrivain et le lecteur lancés ensemble) : un lecteur qui attend
+# un jeton ignore un flux laissé par une exécution précédente, même terminé, jusqu'à ce qu'il soit recréé.
+STREAM_EXTENSION = ".jsonl"
+STREAM_POLL_SECONDS = 1.0
+STREAM_TOKEN_ENV_VAR = "STREAM_TOKEN"
+
+class Clip:
+    """
+    Clip Twitch candidat (champs de l'API Helix utilisés par le pipeline).
+    __slots__ évite un dictionnaire par instance : les pools de dizaines de milliers de clips
+    prennent nettement moins de mémoire et les accès aux attributs sont plus rapides que des .get().
+    """
+    __slots__ = (
+        "id", "url", "embed_url", "thumbnail_url", "title", "viewer_count", "broadcaster_id",
+        "broadcaster_name", "game_name", "created_at", "duration", "language", "video_id", "vod_offset"
+    )
+
+    def __init__(self, id, url=None, embed_url=None, thumbnail_url=None, title=None, viewer_count=0,
+                 broadcaster_id=None, broadcaster_name=None, game_name=None, created_at=None, duration=0.0,
+                 language=None, video_id=None, vod_offset=None):
+        self.id = id
+        self.url = url
+        self.embed_url = embed_url
+        self.thumbnail_url = thumbnail_url
+        self.title = title
+        self.viewer_count = viewer_count
+        self.broadcaster_id = broadcaster_id
+        self.broadcaster_name = broadcaster_name
+        self.game_name = game_name
+        self.created_at = created_at
+        self.duration = duration
+        self.language = language
+        self.video_id = video_id # VOD d'origine (None si la VOD n'est pas disponible)
+        self.vod_offset = vod_offset # Début du clip dans la VOD, en secondes
+
+    @classmethod
+    def from_helix(cls, data):
+        """Construit un clip à partir d'un élément de la réponse de l'endpoint Helix /clips."""
+        # Remplissage direct des slots, sans passer par __init__ (appelé des dizaines de milliers de fois)
+        get = data.get
+        clip = cls.__new__(cls)
+        clip.id = get("id")
+        clip.url = get("url")
+        clip.embed_url = get("embed_url")
+        clip.thumbnail_url = get("thumbnail_url")
+        clip.title = get("title")
+        clip.viewer_count = get("view_count") or 0
+        clip.broadcaster_id = get("broadcaster_id")
+        clip.broadcaster_name = get("broadcaster_name")
+        clip.game_name = get("game_name")
+        clip.created_at = get("created_at")
+        clip.duration = float(get("duration") or 0.0)
+        clip.language = get("language")
+        clip.video_id = get("video_id") or None
+        clip.vod_offset = get("vod_offset")
+        return clip
+
+    @classmethod
+    def from_dict(cls, data):
+        """Construit un clip à partir d'un enregistrement d'un fichier de passage (voir to_dict)."""
+        return cls(**{field: data[field] for field in cls.__slots__ if field in data})
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def __repr__(self):
+        return f"{type(self).__name__}(id={self.id!r}, title={self.title!r}, viewer_count={self.viewer_count!r})"
+
+class ProcessedClip:
+    """Clip téléchargé et prétraité par download_clips.py (contenu de downloaded_clip_paths.json)."""
+    __slots__ = (
+        "id", "path", "duration", "title", "broadcaster_name", "first_frame_path",
+        "best_frame_path", "best_frame_time", "preprocess_plan"
+    )
+
+    def __init__(self, id, path, duration, title=None, broadcaster_name=None, first_frame_path=None,
+                 best_frame_path=None, best_frame_time=None, preprocess_plan=None):
+        self.id = id
+        self.path = path
+        self.duration = duration
+        self.title = title
+        self.broadcaster_name = broadcaster_name
+        self.first_frame_path = first_frame_path
+        self.best_frame_path = best_frame_path
+        self.best_frame_time = best_frame_time
+        self.preprocess_plan = preprocess_plan
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{field: data[field] for field in cls.__slots__ if field in data})
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def __repr__(self):
+        return f"{type(self).__name__}(id={self.id!r}, path={self.path!r}, duration={self.duration!r})"
+
+def dumps_records(records, use_msgpack=False):
+    """Sérialise une liste de dictionnaires en octets : msgpack, sinon JSON indenté (orjson si disponible)."""
+    if use_msgpack:
+        if msgpack is None:
+            raise RuntimeError("msgpack n'est pas installé (pip install msgpack).")
+        return msgpack.packb(records, use_bin_type=True)
+    if orjson is not None:
+        return orjson.dumps(records, option=orjson.OPT_INDENT_2)
+    return json.dumps(records, ensure_ascii=False, indent=2).encode("utf-8")
+
+def loads_records(data, use_msgpack=False):
+    if use_msgpack:
+        if msgpack is None:
+            raise RuntimeError("msgpack n'est pas installé (pip install msgpack).")
+        return msgpack.unpackb(data, raw=False)
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data.decode("utf-8"))
+
+def save_clips(path, clips):
+    """
+    Écrit une liste de Clip/ProcessedClip dans un fichier de passage entre étapes.
+    Le format dépend de l'extension : msgpack pour .msgpack, JSON sinon (lisible par tous les scripts).
+    """
+    data = dumps_records([clip.to_dict() for clip in clips], use_msgpack=path.endswith(MSGPACK_EXTENSION))
+    with open(path, "wb") as f:
+        f.write(data)
+
+def load_clips(path, clip_class=Clip):
+    """Relit un fichier écrit par save_clips (ou un ancien fichier JSON de dictionnaires)."""
+    with open(path, "rb") as f:
+        records = loads_records(f.read(), use_msgpack=path.endswith(MSGPACK_EXTENSION))
+    return [clip_class.from_dict(record) for record in records]
+
+def stream_path(path):
+    """Chemin du flux JSON Lines associé à un fichier de passage (top_clips.json -> top_clips.jsonl)."""
+    return os.path.splitext(path)[0] + STREAM_EXTENSION
+
+class ClipStreamWriter:
+    """
+    Publie les clips d'une étape dans un flux JSON Lines (voir STREAM_EXTENSION). Le flux est recréé à
+    l'ouverture, en-tête compris, par renommage atomique : un lecteur ne voit jamais l'ancien flux tronqué.
+    Chaque enregistrement est ensuite écrit en une seule fois puis vidé, pour être visible aussitôt.
+    token: jeton de l'exécution, par défaut STREAM_TOKEN (un jeton aléatoire sinon).
+    """
+
+    def __init__(self, path, token=None):
+        self.path = path
+        self.token = token or os.getenv(STREAM_TOKEN_ENV_VAR) or uuid.uuid4().hex
+        self.count = 0
+        self.completed = False
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        header = {"event": "start", "token": self.token, "pid": os.getpid()}
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(header) + "\n")
+        os.replace(temp_path, path)
+        self.file = open(path, "a", encoding="utf-8")
+
+    def _write(self, record):
+        self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.file.flush()
+
+    def provisional(self, clip):
+        self._write({"event": "provisional", "clip": clip.to_dict()})
+
+    def append(self, clip):
+        self._write({"event": "clip", "clip": clip.to_dict()})
+        self.count += 1
+
+    def complete(self, status="ok"):
+        """Écrit le marqueur de fin (une seule fois) et ferme le flux."""
+        if self.completed:
+            return
+        self.completed = True
+        self._write({"event": "complete", "status": status, "count": self.count})
+        self.file.close()
+
+def process_alive(pid):
+    """Vrai si le processus pid tourne encore (toujours vrai sous Windows, où la vérification n'est pas faite)."""
+    if os.name == "nt":
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    # Processus terminé mais pas encore attendu par son parent (zombie, Linux) : considéré comme terminé
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            return f.read().rsplit(b")", 1)[1].split()[0] != b"Z"
+    except (OSError, IndexError):
+        return True
+
+class ClipStreamReader:
+    """
+    Suit un flux écrit par ClipStreamWriter pendant que l'étape précédente tourne encore.
+    poll() retourne les nouveaux enregistrements terminés : [(événement, clip)] ; après le marqueur de fin,
+    status vaut "ok" ou "failed" et clips contient la liste définitive.
+    token: jeton attendu dans l'en-tête, par défaut STREAM_TOKEN ; un flux d'un autre jeton est ignoré.
+    producer_pid: PID du processus qui doit écrire le flux (sinon celui de l'en-tête) ; s'il se termine
+    sans marqueur de fin, wait() abandonne au lieu d'attendre jusqu'au délai maximal.
+    """
+
+    def __init__(self, path, clip_class=Clip, token=None, producer_pid=None):
+        self.path = path
+        self.clip_class = clip_class
+        self.token = token or os.getenv(STREAM_TOKEN_ENV_VAR)
+        self.producer_pid = producer_pid
+        self.offset = 0
+        self.status = None
+        self.clips = []
+
+    @property
+    def complete(self):
+        return self.status is not None
+
+    def poll(self):
+        if self.complete or not os.path.exists(self.path):
+            return []
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1
+        lines = data[:end].splitlines()
+        if self.offset == 0 and lines:
+            # En-tête : un flux d'une autre exécution est ignoré (sans avancer) jusqu'à ce qu'il soit recréé
+            header = json.loads(lines[0])
+            if header.get("event") != "start" or (self.token and header.get("token") != self.token):
+                return []
+            if self.producer_pid is None:
+                self.producer_pid = header.get("pid")
+            lines = lines[1:]
+        self.offset += end
+        events = []
+        for line in lines:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record["event"] == "complete":
+                self.status = record.get("status", "ok")
+                break
+            clip = self.clip_class.from_dict(record["clip"])
+            if record["event"] == "clip":
+                self.clips.append(clip)
+            events.append((record["event"], clip))
+        return events
+
+    def wait(self, timeout_seconds, on_event=None):
+        """
+        Lit le flux jusqu'au marqueur de fin, en appelant on_event(événement, clip) pour chaque enregistrement.
+        Retourne la liste définitive, ou None si le flux a échoué, si son processus s'est terminé sans
+        marqueur de fin ou s'il n'est pas terminé après timeout_seconds.
+        """
+        deadline = time.monotonic() + timeout_seconds
+        while True:
+            producer_alive = self.producer_pid is None or process_alive(self.producer_pid)
+            # Le processus peut avoir écrit ses dernières lignes juste avant de se terminer : lues avant d'abandonner
+            for event, clip in self.poll():
+                if on_event is not None:
+                    on_event(event, clip)
+            if self.complete:
+                return self.clips if self.status == "ok" else None
+            if not producer_alive:
+                print(f"❌ Le processus {self.producer_pid} qui écrit {self.path} s'est terminé sans marqueur de fin.")
+                return None
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(STREAM_POLL_SECONDS)
+
+def build_helix_payloads(count):
+    """Génère des éléments de réponse Helix synthétiques (pour le benchmark)."""
+    return [
+        {
+            "id": f"Clip{i:07d}AwesomeSlug", "url": f"https://clips.twitch.tv/Clip{i:07d}",
+            "embed_url": f"https://clips.twitch.tv/embed?clip=Clip{i:07d}", "broadcaster_id": str(100000 + i % 500),
+            "broadcaster_name": f"streamer_{i % 500}", "creator_id": str(i), "creator_name": f"viewer_{i}",
+            "video_id": str(2000000 + i // 40), "game_id": "509658", "language": "fr", "title": f"Moment incroyable n°{i}",
+            "view_count": (i * 7919) % 50000, "created_at": "2026-10-18T20:15:00Z",
+            "thumbnail_url": f"https://clips-media-assets2.twitch.tv/Clip{i:07d}-preview-480x272.jpg",
+            "duration": 12.5 + i % 40, "vod_offset": (i % 40) * 60, "is_featured": False, "game_name": "Just Chatting"
+        }
+        for i in range(count)
+    ]
+
+def dict_from_helix(data):
+    """Ancienne représentation (dictionnaire reconstruit champ par champ), gardée comme référence du benchmark."""
+    return {
+        "id": data.get("id"), "url": data.get("url"), "embed_url": data.get("embed_url"),
+        "thumbnail_url": data.get("thumbnail_url"), "title": data.get("title"),
+        "viewer_count": data.get("view_count", 0), "broadcaster_id": data.get("broadcaster_id"),
+        "broadcaster_name": data.get("broadcaster_name"), "game_name": data.get("game_name"),
+        "created_at": data.get("created_at"), "duration": float(data.get("duration", 0.0)),
+        "language": data.get("language"), "video_id": data.get("video_id") or None, "vod_offset": data.get("vod_offset")
+    }
+
+def measure(build):
+    """
+    Retourne (résultat, secondes, octets conservés). Le temps est mesuré sur une première construction
+    sans tracemalloc (qui ralentit fortement les allocations), la mémoire sur une seconde.
+    """
+    start = time.perf_counter()
+    build()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    result = build()
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, allocated
+
+def run_benchmark(count):
+    """Compare dictionnaires et Clip sur un pool synthétique : mémoire, parsing, accès et sérialisation."""
+    payloads = build_helix_payloads(count)
+    print(f"🧪 Pool synthétique de {count} clips Helix")
+
+    dicts, dict_seconds, dict_bytes = measure(lambda: [dict_from_helix(item) for item in payloads])
+    clips, clip_seconds, clip_bytes = measure(lambda: [Clip.from_helix(item) for item in payloads])
+    print(f"{'':24}{'dict':>14}{'Clip':>14}")
+    print(f"{'Mémoire (Mo)':<24}{dict_bytes / 1e6:>14.1f}{clip_bytes / 1e6:>14.1f}")
+    print(f"{'Parsing (ms)':<24}{dict_seconds * 1000:>14.1f}{clip_seconds * 1000:>14.1f}")
+
+    start = time.perf_counter()
+    sorted(dicts, key=lambda x: x.get('viewer_count', 0), reverse=True)
+    sum(float(x.get('duration', 0.0)) for x in dicts)
+    dict_access = time.perf_counter() - start
+    start = time.perf_counter()
+    sorted(clips, key=lambda clip: clip.viewer_count, reverse=True)
+    sum(clip.duration for clip in clips)
+    clip_access = time.perf_counter() - start
+    print(f"{'Tri + somme (ms)':<24}{dict_access * 1000:>14.1f}{clip_access * 1000:>14.1f}")
+
+    records = [clip.to_dict() for clip in clips]
+    encoders = [("json", lambda: json.dumps(records, ensure_ascii=False, indent=2).encode("utf-8"), lambda data: json.loads(data))]
+    if orjson is not None:
+        encoders.append(("orjson", lambda: orjson.dumps(records, option=orjson.OPT_INDENT_2), orjson.loads))
+    if msgpack is not None:
+        encoders.append(("msgpack", lambda: msgpack.packb(records, use_bin_type=True), lambda data: msgpack.unpackb(data, raw=False)))
+    print(f"\n{'Format':<12}{'Taille (Mo)':>14}{'Écriture (ms)':>16}{'Lecture (ms)':>16}")
+    for name, encode, decode in encoders:
+        start = time.perf_counter()
+        data = encode()
+        write_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        decode(data)
+        read_seconds = time.perf_counter() - start
+        print(f"{name:<12}{len(data) / 1e6:>14.1f}{write_seconds * 1000:>16.1f}{read_seconds * 1000:>16.1f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark du modèle Clip face aux dictionnaires.")
+    parser.add_argument("--benchmark", type=int, default=100000, metavar="N", help="Taille du pool synthétique.")
+    args = parser.parse_args(argv)
+    if args.benchmark <= 0:
+        return
+    run_benchmark(args.benchmark)
+
+if __name__ == "__main__":
+    main()
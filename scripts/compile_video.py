@@ -1,272 +1,700 @@
-import subprocess
-import os
-import json
-import sys
-from datetime import datetime, timedelta
-
-# --- Chemins des fichiers ---
-INPUT_PATHS_JSON = os.path.join("data", "downloaded_clip_paths.json")
-OUTPUT_VIDEO_PATH = os.path.join("output", "compiled_video.mp4")
-CLIPS_LIST_TXT = os.path.join("data", "clips_list.txt") # Utilisé pour concaténation initiale
-
-# --- Chemins pour les frames des vignettes ---
-THUMBNAIL_FRAMES_DIR = os.path.join("data", "thumbnail_frames") # Nouveau dossier pour stocker les frames
-
-# --- PARAMÈTRES FFmpeg ---
-# ... (votre code existant pour FONT_PATH_FFMPEG et get_ffmpeg_font_path())
-# Obtenir le chemin de la police pour FFmpeg (comme défini précédemment)
-def get_ffmpeg_font_path():
-    """Tente de trouver un chemin de police fiable pour FFmpeg."""
-    font_paths = [
-        "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf", # Common on Linux
-        "/usr/share/fonts/truetype/dejavu/DejaVuSans-Regular.ttf",        # Common on Linux
-        "/System/Library/Fonts/Supplemental/Arial.ttf",                  # macOS
-        "C:/Windows/Fonts/arial.ttf"                                     # Windows
-    ]
-    for path in font_paths:
-        if os.path.exists(path):
-            print(f"✅ Police trouvée et utilisée pour FFmpeg: {path}")
-            return path
-    print("⚠️ Aucune police TrueType spécifique trouvée. Utilisation d'une police générique 'sans-serif'.")
-    return "sans-serif" # Fallback to generic font family name for FFmpeg
-
-FONT_PATH_FFMPEG = get_ffmpeg_font_path()
-
-# --- NOUVEAU PARAMÈTRE : Limite le nombre total de clips dans la compilation finale ---
-MAX_TOTAL_CLIPS = 30
-
-# Obtenir le répertoire racine du dépôt (où se trouve .github/)
-REPO_ROOT = os.getcwd() 
-
-def format_duration(seconds):
-    """Formate une durée en secondes en HH:MM:SS."""
-    if seconds < 0:
-        seconds = 0
-    hours = int(seconds // 3600)
-    minutes = int((seconds % 3600) // 60)
-    seconds = int(seconds % 60)
-    return f"{hours:02}:{minutes:02}:{seconds:02}"
-
-def extract_first_frame(video_path, output_image_path):
-    """Extrait la première frame d'une vidéo et la sauvegarde comme image."""
-    output_dir = os.path.dirname(output_image_path)
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-        print(f"Dossier pour les frames de vignette créé : {output_dir}")
-
-    command = [
-        "ffmpeg",
-        "-i", video_path,
-        "-vf", "select='eq(n,0)'", # Sélectionne la première frame
-        "-vsync", "vfr",
-        "-q:v", "2", # Qualité élevée pour l'image
-        "-y",
-        output_image_path
-    ]
-    print(f"Extraction de la première frame de {os.path.basename(video_path)}: {' '.join(command)}")
-    try:
-        # Utiliser capture_output=True pour voir les erreurs de FFmpeg
-        subprocess.run(command, check=True, capture_output=True, text=True)
-        print(f"✅ Première frame extraite et sauvegardée : {output_image_path}")
-        return True
-    except subprocess.CalledProcessError as e:
-        print(f"❌ Erreur lors de l'extraction de la frame de {video_path}: {e.stderr}")
-        return False
-    except Exception as e:
-        print(f"❌ Erreur inattendue lors de l'extraction de la frame de {video_path}: {e}")
-        return False
-
-def compile_video():
-    print("🎬 Démarrage de la compilation des clips vidéo avec timecodes...")
-
-    output_dir = os.path.dirname(OUTPUT_VIDEO_PATH)
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-        print(f"Dossier de sortie créé : {output_dir}")
-        
-    if not os.path.exists(INPUT_PATHS_JSON):
-        print(f"❌ Fichier des chemins de clips téléchargés '{INPUT_PATHS_JSON}' introuvable.")
-        sys.exit(1)
-
-    # Lire les informations des clips téléchargés et prétraités (incluant la durée réelle)
-    with open(INPUT_PATHS_JSON, "r") as f:
-        downloaded_clip_info = json.load(f)
-
-    if not downloaded_clip_info:
-        print("⚠️ Aucune information de vidéo téléchargée à compiler. Fin de l'étape de compilation.")
-        sys.exit(0)
-
-    # Filtrer et limiter les clips à traiter
-    final_clips_to_process = []
-    # Créer une liste temporaire pour collecter les informations mises à jour
-    updated_downloaded_clip_info = []
-
-    for clip_data in downloaded_clip_info:
-        if clip_data.get("path") and clip_data.get("duration", 0.0) > 0:
-            final_clips_to_process.append(clip_data)
-        if len(final_clips_to_process) >= MAX_TOTAL_CLIPS:
-            break
-
-    # NOUVELLE LOGIQUE : Extraire la première frame pour les vignettes
-    print("\n🖼️ Extraction des premières frames des clips pour la miniature...")
-    for clip_info in final_clips_to_process:
-        clip_id = clip_info['id'] # Supposons que chaque clip a un ID
-        clip_path = clip_info['path']
-        frame_output_path = os.path.join(THUMBNAIL_FRAMES_DIR, f"{clip_id}_first_frame.jpg")
-        
-        if extract_first_frame(clip_path, frame_output_path):
-            # Mettre à jour l'information du clip avec le chemin de la frame
-            clip_info['first_frame_path'] = frame_output_path
-        else:
-            print(f"⚠️ Impossible d'extraire la frame pour le clip {clip_id}. La miniature pourrait être affectée.")
-            # Optionnel: Supprimer le clip de final_clips_to_process si la frame est critique
-            # Ou simplement ne pas ajouter 'first_frame_path' si l'extraction échoue
-
-        # Ajouter l'info du clip (modifiée ou non) à la liste mise à jour
-        updated_downloaded_clip_info.append(clip_info)
-    
-    # Écrire les informations de clips mises à jour (avec les chemins des frames)
-    with open(INPUT_PATHS_JSON, "w", encoding="utf-8") as f:
-        json.dump(updated_downloaded_clip_info, f, ensure_ascii=False, indent=2)
-    print("✅ Chemins des frames ajoutés à downloaded_clip_paths.json.")
-
-
-    if not final_clips_to_process:
-        print("⚠️ Après application des filtres et limites, aucune vidéo à compiler. Fin de l'étape.")
-        sys.exit(0)
-
-    print(f"Compilation de {len(final_clips_to_process)} clips (max {MAX_TOTAL_CLIPS} clips).")
-
-    # --- Étape 1: Concaténation initiale (rapide) sans réencodage ---
-    # ... (Le reste de votre code existant pour la concaténation vidéo et audio)
-    temp_concat_video_path = os.path.join(output_dir, "temp_concat_video_no_audio.mp4")
-    temp_concat_audio_path = os.path.join(output_dir, "temp_concat_audio.aac")
-
-    # Crée le fichier de liste pour la concaténation
-    with open(CLIPS_LIST_TXT, "w") as f:
-        for clip_info in final_clips_to_process:
-            absolute_clip_path = os.path.abspath(clip_info['path'])
-            f.write(f"file '{absolute_clip_path}'\n")
-
-    concat_video_command = [
-        "ffmpeg",
-        "-f", "concat",
-        "-safe", "0",
-        "-i", CLIPS_LIST_TXT,
-        "-c:v", "copy",
-        "-an",
-        "-y",
-        temp_concat_video_path
-    ]
-    print(f"Exécution de la commande FFmpeg (concaténation vidéo initiale sans audio): {' '.join(concat_video_command)}")
-    try:
-        subprocess.run(concat_video_command, check=True, capture_output=True, text=True)
-        print("✅ Concaténation vidéo initiale terminée.")
-    except subprocess.CalledProcessError as e:
-        print(f"❌ Erreur lors de la concaténation vidéo initiale : {e.stderr}")
-        sys.exit(1)
-
-    # --- Étape 2: Concaténation et Normalisation Audio ---
-    audio_inputs_cmd = []
-    for clip_info in final_clips_to_process:
-        absolute_clip_path = os.path.abspath(clip_info['path'])
-        audio_inputs_cmd.extend(["-i", absolute_clip_path])
-        
-    audio_filter_complex = ""
-    if len(final_clips_to_process) > 1:
-        audio_filter_complex = "".join([f"[{i}:a]" for i in range(len(final_clips_to_process))])
-        audio_filter_complex += f"concat=n={len(final_clips_to_process)}:v=0:a=1[aout];[aout]loudnorm=I=-16:TP=-1.5:LRA=11"
-    else:
-        audio_filter_complex = "[0:a]loudnorm=I=-16:TP=-1.5:LRA=11"
-
-    audio_command = [
-        "ffmpeg",
-        *audio_inputs_cmd,
-        "-filter_complex", audio_filter_complex,
-        "-c:a", "aac",
-        "-b:a", "192k",
-        "-ac", "2",
-        "-ar", "44100",
-        "-vn",
-        "-y",
-        temp_concat_audio_path
-    ]
-
-    print(f"\nExécution de la commande FFmpeg (extraction, concaténation et normalisation audio): {' '.join(audio_command)}")
-    try:
-        subprocess.run(audio_command, check=True, capture_output=True, text=True)
-        print("✅ Audio combiné et normalisé avec succès.")
-    except subprocess.CalledProcessError as e:
-        print(f"❌ Erreur lors du traitement audio : {e.stderr}")
-        sys.exit(1)
-
-    # --- Étape 3: Application des timecodes sur la vidéo concaténée et fusion avec l'audio ---
-    drawtext_filters = []
-    current_offset = 0.0
-    for clip_info in final_clips_to_process:
-        start_time_str = format_duration(current_offset)
-        clip_duration = clip_info.get('duration', 0.0) 
-        
-        text_content = f"{start_time_str} - {clip_info['title']} par {clip_info['broadcaster_name']}"
-        escaped_text = text_content.replace("'", "'\\''") 
-        
-        drawtext_filters.append(
-            f"drawtext="
-            f"fontfile='{FONT_PATH_FFMPEG}':"
-            f"text='{escaped_text}':"
-            f"x=(w-text_w)/2:"
-            f"y=h-th-20:"
-            f"fontsize=36:"
-            f"fontcolor=white:"
-            f"box=1:"
-            f"boxcolor=black@0.6:"
-            f"enable='between(t,{current_offset},{current_offset + min(clip_duration, 5)})'"
-        )
-        current_offset += clip_duration
-
-    video_filter_complex = ",".join(drawtext_filters)
-
-    final_command = [
-        "ffmpeg",
-        "-i", temp_concat_video_path,
-        "-i", temp_concat_audio_path,
-        "-filter_complex", video_filter_complex,
-        "-c:v", "libx264",
-        "-preset", "medium",
-        "-crf", "23",
-        "-map", "0:v:0",
-        "-map", "1:a:0",
-        "-y",
-        OUTPUT_VIDEO_PATH
-    ]
-    
-    print(f"\nExécution de la commande FFmpeg (ajout timecodes et fusion finale): {' '.join(final_command)}")
-    try:
-        process = subprocess.run(final_command, check=True, capture_output=True, text=True)
-        print(f"✅ Compilation vidéo finale terminée avec timecodes: {OUTPUT_VIDEO_PATH}")
-        if process.stdout: print("FFmpeg STDOUT (final):\n", process.stdout)
-        if process.stderr: print("FFmpeg STDERR (final):\n", process.stderr)
-
-        # Nettoyage des fichiers temporaires et des frames de vignette
-        os.remove(temp_concat_video_path)
-        os.remove(temp_concat_audio_path)
-        os.remove(CLIPS_LIST_TXT)
-        
-        # Supprimer les frames de vignette après usage (ou les garder si tu veux les inspecter)
-        # for clip_info in updated_downloaded_clip_info:
-        #     if 'first_frame_path' in clip_info and os.path.exists(clip_info['first_frame_path']):
-        #         os.remove(clip_info['first_frame_path'])
-        # if os.path.exists(THUMBNAIL_FRAMES_DIR) and not os.listdir(THUMBNAIL_FRAMES_DIR): # Supprime le dossier s'il est vide
-        #     os.rmdir(THUMBNAIL_FRAMES_DIR)
-
-        print("✅ Fichiers temporaires nettoyés.")
-
-    except subprocess.CalledProcessError as e:
-        print(f"❌ Erreur lors de la compilation vidéo finale : {e.stderr}")
-        sys.exit(1)
-    except Exception as e:
-        print(f"❌ Erreur inattendue lors de la compilation vidéo : {e}")
-        sys.exit(1)
-
-if __name__ == "__main__":
-    compile_video()
\ No newline at end of file
+import subprocess
+import os
+import json
+import sys
+import time
+import shutil
+import hashlib
+import argparse
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+from captions import build_caption_timeline, caption_strip_height
+from encode_scheduler import load_encoder_profile, x264_arguments
+from workspace import Workspace, scratch_path
+from cost_model import PCM_BYTES_PER_MEDIA_SECOND, record_costs, output_weight, encode_cost_key
+from rollup import ARCHIVE_DIR_ENV_VAR, ARCHIVE_ENCODER_SETTINGS, ARCHIVE_SEGMENT_FORMAT, archive_daily_segments
+from mezzanine import SEGMENT_FPS, SEGMENT_TIMESCALE, segment_format, get_branding_segment, conform_for_concat, concat_copy
+from run_context import run_path, target_path, atomic_write_json
+from media_probe import TIMELINE_JSON, probe_key, probe_duration, probe_video_duration, probe_has_audio
+
+# --- Chemins des fichiers ---
+INPUT_PATHS_JSON = target_path("data", "downloaded_clip_paths.json")
+OUTPUT_VIDEO_PATH = target_path("output", "compiled_video.mp4")
+# Parties encodées de chaque rendu, gardées pour les recompilations de la même exécution ou d'un dépôt local.
+# Volontairement hors de cache/ : sur GitHub Actions, data/ est supprimé à la fin du workflow et les parties d'un
+# jour (nouveaux clips) ne resserviraient pas le lendemain, alors que cache/ est limité à 10 Go.
+# L'audio PCM de chaque segment et les listes de concaténation sont sur l'espace scratch (voir workspace.py).
+COMPILE_SEGMENTS_DIR = run_path("data", "compile_segments")
+COMPILE_AUDIO_SCRATCH = "compile_audio" # Sous-dossier scratch de l'audio des segments, partagé par l'exécution
+
+# --- Chemins pour les frames des vignettes ---
+THUMBNAIL_FRAMES_DIR = target_path("data", "thumbnail_frames") # Nouveau dossier pour stocker les frames
+
+# --- NOUVEAU PARAMÈTRE : Limite le nombre total de clips dans la compilation finale ---
+MAX_TOTAL_CLIPS = 30
+
+# --- Profils de sortie (rendus) produits à partir d'un seul décodage de la vidéo concaténée ---
+# Chaque profil a son propre cadrage, sa propre mise en page des timecodes et son propre encodeur.
+#   crop: None (image entière) ou "center_9_16" (recadrage vertical au centre pour les Shorts)
+#   captions: incruste le timecode au début de chaque clip (vrai par défaut)
+#   caption_layout: "single_line" (timecode - titre par streamer) ou "stacked" (timecode + streamer, puis titre)
+#   caption_y: position verticale de la bande de légende (expression overlay : H = hauteur de la vidéo, h = hauteur de la bande)
+#   max_duration: durée maximale du rendu en secondes (None = compilation entière)
+#   branding: ajoute l'intro et l'outro (voir BRANDING) au rendu
+#   preset / crf / stitchable: réglages x264 fixes du rendu. Les parties, l'intro et l'outro d'un rendu sont concaténées
+#     sans réencodage et doivent partager le même SPS/PPS : ces réglages ne varient jamais en cours de compilation
+#     (pas d'ajustement à l'échéance), et stitchable=1 rend en plus le PPS indépendant du CRF.
+OUTPUT_PROFILES = {
+    "landscape": {
+        "path": OUTPUT_VIDEO_PATH, # Vidéo principale uploadée sur YouTube
+        "width": 1920, "height": 1080, "crop": None,
+        "caption_layout": "single_line", "font_size": 36, "caption_y": "H-h-20",
+        "preset": "medium", "crf": 23, "stitchable": True, "audio_bitrate": "192k", "max_duration": None, "branding": True
+    },
+    "landscape_720p": {
+        "path": target_path("output", "compiled_video_720p.mp4"),
+        "width": 1280, "height": 720, "crop": None,
+        "caption_layout": "single_line", "font_size": 24, "caption_y": "H-h-14",
+        "preset": "medium", "crf": 23, "stitchable": True, "audio_bitrate": "128k", "max_duration": None, "branding": True
+    },
+    "shorts": {
+        "path": target_path("output", "compiled_video_shorts.mp4"),
+        "width": 1080, "height": 1920, "crop": "center_9_16",
+        "caption_layout": "stacked", "font_size": 44, "caption_y": "H*0.72",
+        "preset": "medium", "crf": 23, "stitchable": True, "audio_bitrate": "128k", "max_duration": 60, "branding": False
+    }
+}
+# Rendu d'aperçu (--preview) : même chronologie (ordre des clips, habillage, légendes, normalisation audio),
+# en 480p avec le preset le plus rapide, pour vérifier une sélection avant (ou pendant) le rendu complet.
+# N'écrit que ce fichier : ni chronologie, ni mesures, ni archives, et les fichiers intermédiaires restent en place.
+PREVIEW_PROFILE = {
+    "path": target_path("output", "preview.mp4"),
+    "width": 854, "height": 480, "crop": None,
+    "caption_layout": "single_line", "font_size": 16, "caption_y": "H-h-9",
+    "preset": "ultrafast", "crf": 28, "stitchable": True, "audio_bitrate": "64k", "max_duration": None, "branding": True
+}
+
+# --- Recompilation incrémentale ---
+# Chaque clip est encodé, pour chaque rendu, en deux parties : la tête (pendant l'affichage de la légende, timecode
+# incrusté) et le corps (sans légende). Les rendus sont ensuite assemblés sans réencodage vidéo. Une partie est
+# identifiée par le fichier du clip, le texte incrusté, la position du clip et les réglages avec lesquels elle est
+# encodée : si un clip est retiré ou remplacé après relecture, seuls le nouveau clip et les têtes des clips décalés
+# sont réencodés. Une partie sans légende est partagée par tous les rendus qui l'encodent à l'identique (corps des
+# clips du rendu "landscape" et des segments archivés, voir ARCHIVE_PROFILE). L'audio de chaque segment est préparé (PCM, calé sur la vidéo) une fois par clip, puis normalisé
+# (loudnorm) en une seule passe sur l'ensemble du rendu à l'assemblage, comme une compilation encodée d'un bloc.
+COMPILE_SEGMENT_VERSION = 4 # À incrémenter si les commandes d'encodage changent (toutes les parties sont refaites)
+CAPTION_DISPLAY_SECONDS = 5 # Durée d'affichage du timecode au début de chaque clip
+SEGMENT_ENCODE_WORKERS = 2 # Parties encodées simultanément (x264 est déjà multithread)
+LOUDNORM_FILTER = "loudnorm=I=-16:TP=-1.5:LRA=11"
+CONCAT_AUDIO_SAMPLE_RATE = 44100
+
+# Segments d'habillage (voir BRANDING_SEGMENTS dans mezzanine.py), rendus une seule fois puis insérés sans réencodage :
+#   "intro" / "outro" au début / à la fin des rendus dont "branding" est vrai, "stinger" entre deux clips
+BRANDING = ["intro", "outro", "stinger"]
+# Réglages x264 des transitions, identiques à ceux des clips prétraités (DEFAULT_PRESET/DEFAULT_CRF de download_clips.py)
+CLIP_ENCODER_DEFAULTS = {"preset": "fast", "crf": 23}
+
+# Si TRUE, chaque clip compilé est aussi encodé au format fixe des archives (ARCHIVE_PROFILE : rendu sans légende,
+# "stitchable") et archivé avec ses métadonnées de sélection, pour assembler les best of hebdomadaires et mensuels
+# sans rien retélécharger ni réencoder (voir rollup.py). Activé quand ROLLUP_ARCHIVE_DIR désigne l'archive : elle
+# (~400 Mo par jour) doit être sur un disque persistant. Sur GitHub Actions, archive/ est perdu à la fin de chaque
+# exécution, et cache/ est limité à 10 Go par dépôt.
+ARCHIVE_DAILY_SEGMENTS = bool(os.getenv(ARCHIVE_DIR_ENV_VAR))
+# Rendu des segments archivés : aucun fichier assemblé, les parties de chaque clip sont archivées séparément
+ARCHIVE_PROFILE = {
+    "path": None,
+    "width": ARCHIVE_SEGMENT_FORMAT["width"], "height": ARCHIVE_SEGMENT_FORMAT["height"], "crop": None, "captions": False,
+    **ARCHIVE_ENCODER_SETTINGS, "audio_bitrate": ARCHIVE_SEGMENT_FORMAT["audio_bitrate"], "max_duration": None, "branding": False
+}
+
+# Profils rendus par défaut (le premier doit rester "landscape", utilisé par la suite du pipeline).
+# "landscape" et "shorts" sont uploadés (upload_youtube.py, puis upload_youtube.py --shorts), "landscape_720p" est
+# gardé comme artefact du workflow. Tous sont encodés dans la même passe (un seul décodage par partie) : le 720p
+# ajoute environ 44 % d'encodage et les Shorts 60 s au plus (voir output_weight dans cost_model.py), ce que
+# l'ordonnanceur du prétraitement prend en compte pour l'échéance. "--profiles landscape" pour le seul rendu principal.
+ACTIVE_OUTPUT_PROFILES = ["landscape", "landscape_720p", "shorts"]
+
+# Obtenir le répertoire racine du dépôt (où se trouve .github/)
+REPO_ROOT = os.getcwd() 
+
+def format_duration(seconds):
+    """Formate une durée en secondes en HH:MM:SS."""
+    if seconds < 0:
+        seconds = 0
+    hours = int(seconds // 3600)
+    minutes = int((seconds % 3600) // 60)
+    seconds = int(seconds % 60)
+    return f"{hours:02}:{minutes:02}:{seconds:02}"
+
+def extract_first_frame(video_path, output_image_path):
+    """Extrait la première frame d'une vidéo et la sauvegarde comme image."""
+    output_dir = os.path.dirname(output_image_path)
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+        print(f"Dossier pour les frames de vignette créé : {output_dir}")
+
+    command = [
+        "ffmpeg",
+        "-i", video_path,
+        "-vf", "select='eq(n,0)'", # Sélectionne la première frame
+        "-vsync", "vfr",
+        "-q:v", "2", # Qualité élevée pour l'image
+        "-y",
+        output_image_path
+    ]
+    print(f"Extraction de la première frame de {os.path.basename(video_path)}: {' '.join(command)}")
+    try:
+        # Utiliser capture_output=True pour voir les erreurs de FFmpeg
+        subprocess.run(command, check=True, capture_output=True, text=True)
+        print(f"✅ Première frame extraite et sauvegardée : {output_image_path}")
+        return True
+    except subprocess.CalledProcessError as e:
+        print(f"❌ Erreur lors de l'extraction de la frame de {video_path}: {e.stderr}")
+        return False
+    except Exception as e:
+        print(f"❌ Erreur inattendue lors de l'extraction de la frame de {video_path}: {e}")
+        return False
+
+def build_profile_captions(profile, captions):
+    """
+    Convertit les timecodes en légendes (lignes de texte) selon la mise en page du profil.
+    captions: liste de (début, durée d'affichage, timecode, titre, streamer).
+    Retourne (légendes pour build_caption_timeline, nombre de lignes par légende).
+    """
+    profile_captions = []
+    for start, display_duration, start_time_str, title, broadcaster_name in captions:
+        if profile["caption_layout"] == "stacked":
+            lines = [f"{start_time_str} - {broadcaster_name}", title]
+        else:
+            lines = [f"{start_time_str} - {title} par {broadcaster_name}"]
+        profile_captions.append((start, display_duration, lines))
+    line_count = 2 if profile["caption_layout"] == "stacked" else 1
+    return profile_captions, line_count
+
+def build_caption_inputs(profiles, captions, total_duration, list_dir, list_suffix=""):
+    """
+    Rend (ou reprend du cache) les légendes de chaque profil et écrit leur liste de concaténation.
+    Retourne {nom du profil: chemin de la liste}.
+    """
+    caption_lists = {}
+    for name, profile in profiles.items():
+        profile_captions, line_count = build_profile_captions(profile, captions)
+        list_path = os.path.join(list_dir, f"captions_{name}{list_suffix}.txt")
+        build_caption_timeline(
+            profile_captions,
+            profile["width"],
+            caption_strip_height(profile["font_size"], line_count),
+            profile["font_size"],
+            total_duration,
+            list_path
+        )
+        caption_lists[name] = list_path
+    return caption_lists
+
+def build_rendition_filter(profile):
+    """Filtres de cadrage/mise à l'échelle d'un rendu (vide si la vidéo est déjà au bon format)."""
+    filters = []
+    if profile["crop"] == "center_9_16":
+        filters.append("crop=ih*9/16:ih:(iw-ow)/2:0")
+    if (profile["width"], profile["height"]) != (1920, 1080) or profile["crop"]:
+        filters.append(f"scale={profile['width']}:{profile['height']}")
+        filters.append("setsar=1")
+    return filters
+
+def rendition_key(profile, captioned=True):
+    """
+    Réglages d'un profil qui déterminent l'image encodée (ni le chemin, ni l'audio, ni la durée maximale).
+    captioned: faux pour une partie sans légende, identique pour tous les profils de mêmes cadrage et encodeur.
+    """
+    keys = ("width", "height", "crop", "preset", "crf", "tune", "stitchable")
+    if captioned:
+        keys += ("caption_layout", "font_size", "caption_y")
+    return {key: profile.get(key) for key in keys}
+
+def rendition_format(profile):
+    """Format des segments d'un rendu (voir segment_format dans mezzanine.py) : intro, outro et vérification des parties."""
+    return segment_format(profile["width"], profile["height"], profile, profile["audio_bitrate"])
+
+def segment_path(label, kind, key_data, directory=COMPILE_SEGMENTS_DIR):
+    """Chemin d'une partie encodée (par défaut dans COMPILE_SEGMENTS_DIR), identifiée par un hash de tout ce qui détermine son contenu."""
+    digest = hashlib.sha1(json.dumps([COMPILE_SEGMENT_VERSION, key_data], sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(directory, f"{label}_{kind}_{digest}{'.wav' if kind == 'audio' else '.mp4'}")
+
+def temp_output_path(path):
+    # Une partie n'est visible dans le cache qu'une fois entièrement encodée
+    root, extension = os.path.splitext(path)
+    return f"{root}.tmp{extension}"
+
+def build_part_command(source, start, duration, outputs, caption_lists=None):
+    """
+    Construit une commande FFmpeg qui décode une seule fois [start, start + duration] du fichier source,
+    le duplique avec le filtre split, puis applique à chaque branche son cadrage, sa bande de légende
+    (si caption_lists est fourni : une liste d'images par sortie, ou None pour une sortie sans légende)
+    et son encodeur. Vidéo seule.
+    outputs: liste de (profil, chemin de sortie).
+    """
+    caption_lists = caption_lists or [None] * len(outputs)
+    command = ["ffmpeg"]
+    if start > 0:
+        command.extend(["-ss", f"{start:.3f}"]) # Recherche précise : la partie commence à la frame exacte
+    command.extend(["-i", source])
+    caption_inputs = {} # index de la sortie -> index de l'entrée de ses légendes
+    for i, caption_list in enumerate(caption_lists):
+        if caption_list:
+            caption_inputs[i] = 1 + len(caption_inputs)
+            command.extend(["-f", "concat", "-safe", "0", "-i", caption_list])
+
+    graph = []
+    if len(outputs) > 1:
+        graph.append("[0:v]split=" + str(len(outputs)) + "".join(f"[v{i}]" for i in range(len(outputs))))
+        branch_inputs = [f"[v{i}]" for i in range(len(outputs))]
+    else:
+        branch_inputs = ["[0:v]"]
+
+    for i, (profile, _) in enumerate(outputs):
+        branch = branch_inputs[i]
+        filters = build_rendition_filter(profile)
+        if i in caption_inputs:
+            if filters:
+                graph.append(f"{branch}{','.join(filters)}[base{i}]")
+                branch = f"[base{i}]"
+            graph.append(f"{branch}[{caption_inputs[i]}:v]overlay=x=0:y={profile['caption_y']}:format=auto[out{i}]")
+        else:
+            graph.append(f"{branch}{','.join(filters) or 'null'}[out{i}]")
+
+    command.extend(["-filter_complex", ";".join(graph)])
+    for i, (profile, path) in enumerate(outputs):
+        command.extend([
+            "-map", f"[out{i}]",
+            *x264_arguments(profile),
+            "-pix_fmt", "yuv420p",
+            "-video_track_timescale", str(SEGMENT_TIMESCALE), # Identique aux segments d'habillage
+            "-an",
+            "-t", f"{duration:.3f}",
+            "-y", temp_output_path(path)
+        ])
+    return command
+
+def build_audio_part_command(source, duration, output_path):
+    """
+    Commande FFmpeg de l'audio d'un segment : en PCM, complété par du silence ou coupé à exactement `duration`
+    secondes pour rester calé sur la vidéo une fois les segments assemblés (normalisé ensuite avec tout le rendu).
+    """
+    filters = [f"aresample={CONCAT_AUDIO_SAMPLE_RATE}", "apad", f"atrim=end_sample={round(duration * CONCAT_AUDIO_SAMPLE_RATE)}"]
+    if probe_has_audio(source):
+        command = ["ffmpeg", "-i", source, "-map", "0:a:0"]
+    else:
+        command = ["ffmpeg", "-f", "lavfi", "-i", f"anullsrc=r={CONCAT_AUDIO_SAMPLE_RATE}:cl=stereo"]
+    command.extend([
+        "-af", ",".join(filters),
+        "-ac", "2", "-ar", str(CONCAT_AUDIO_SAMPLE_RATE), "-c:a", "pcm_s16le",
+        "-y", temp_output_path(output_path)
+    ])
+    return command
+
+def run_segment_jobs(jobs):
+    """
+    Exécute les encodages de parties (en parallèle, SEGMENT_ENCODE_WORKERS à la fois).
+    jobs: liste de (commande, [chemins produits], [fichiers temporaires à supprimer ensuite]).
+    Lève subprocess.CalledProcessError au premier échec.
+    """
+    def run(job):
+        command, paths, temp_files = job
+        try:
+            subprocess.run(command, check=True, capture_output=True, text=True)
+            for path in paths:
+                os.replace(temp_output_path(path), path)
+        finally:
+            for temp_file in temp_files:
+                if os.path.exists(temp_file):
+                    os.remove(temp_file)
+
+    with ThreadPoolExecutor(max_workers=SEGMENT_ENCODE_WORKERS) as executor:
+        for _ in executor.map(run, jobs):
+            pass
+
+def plan_segments(sequence, timeline, profiles, audio_dir, list_dir):
+    """
+    Découpe chaque rendu en parties : pour chaque clip, la tête (durée d'affichage de la légende, timecode
+    incrusté si le profil a des légendes) puis le corps (sans légende) ; pour chaque transition, une seule partie.
+    Les clips au-delà de la durée maximale d'un rendu (Shorts) ne sont pas prévus pour ce rendu.
+    Retourne (parties de chaque rendu {nom: [[chemins] par segment de la séquence]}, audio de chaque rendu
+    {nom: [chemin par segment]}, travaux d'encodage des parties absentes, travaux audio, secondes de vidéo à encoder
+    en équivalent 1080p (chaque rendu pondéré par son nombre de pixels, voir output_weight dans cost_model.py)).
+    Les segments retenus pour un rendu sont toujours les premiers de la séquence.
+    audio_dir: dossier de l'audio des segments ; list_dir: dossier des listes de légendes des têtes (temporaires).
+    """
+    clip_entries = iter([entry for entry in timeline["segments"] if entry["kind"] in ("clip", "stinger")])
+    rendition_parts = {name: [] for name in profiles}
+    rendition_audio = {name: [] for name in profiles}
+    video_jobs, audio_jobs = [], []
+    planned = set()
+    missing_media_seconds = 0.0
+    position = 0.0 # Position dans la vidéo sans intro
+
+    for index, ((path, duration, clip_info), entry) in enumerate(zip(sequence, clip_entries)):
+        source_key = probe_key(path)
+        label = clip_info['id'] if clip_info else "stinger"
+        audio_path = segment_path(label, "audio", [source_key, round(duration, 3)], audio_dir)
+        if not os.path.exists(audio_path) and audio_path not in planned:
+            planned.add(audio_path)
+            audio_jobs.append((build_audio_part_command(path, duration, audio_path), [audio_path], []))
+
+        included = [name for name, profile in profiles.items() if not (profile.get("max_duration") and position >= profile["max_duration"])]
+        for name in included:
+            rendition_parts[name].append([])
+            rendition_audio[name].append(audio_path)
+
+        head_seconds = min(duration, CAPTION_DISPLAY_SECONDS) if clip_info else 0.0
+        parts = [] # (type, début, durée)
+        if head_seconds > 0:
+            parts.append(("head", 0.0, head_seconds))
+        if duration - head_seconds > 0.5 / SEGMENT_FPS:
+            parts.append(("body", head_seconds, duration - head_seconds))
+
+        for kind, start, part_duration in parts:
+            missing = [] # (nom du profil, chemin, avec légende)
+            caption = (0.0, head_seconds, format_duration(entry["start"]), clip_info['title'], clip_info['broadcaster_name']) if kind == "head" else None
+            for name in included:
+                profile = profiles[name]
+                captioned = kind == "head" and profile.get("captions", True)
+                caption_key = []
+                if captioned:
+                    # Texte incrusté et position du clip dans la vidéo : un timecode décalé réencode uniquement la tête
+                    caption_lines, _ = build_profile_captions(profile, [caption])
+                    caption_key = [caption_lines[0][2], round(entry["start"], 3)]
+                part_path = segment_path(label, kind, [source_key, kind, round(start, 3), round(part_duration, 3), rendition_key(profile, captioned)] + caption_key)
+                rendition_parts[name][-1].append(part_path)
+                if not os.path.exists(part_path) and part_path not in planned:
+                    planned.add(part_path)
+                    missing.append((name, part_path, captioned))
+            if not missing:
+                continue
+
+            missing_media_seconds += part_duration * sum(output_weight(profiles[name]) for name, _, _ in missing)
+            outputs = [(profiles[name], part_path) for name, part_path, _ in missing]
+            caption_lists = None
+            captioned_profiles = {name: profiles[name] for name, _, captioned in missing if captioned}
+            if captioned_profiles:
+                lists = build_caption_inputs(captioned_profiles, [caption], head_seconds, list_dir, list_suffix=f"_{index}")
+                caption_lists = [lists[name] if captioned else None for name, _, captioned in missing]
+            video_jobs.append((build_part_command(path, start, part_duration, outputs, caption_lists), [p for _, p, _ in missing], [p for p in caption_lists or [] if p]))
+
+        position += duration
+
+    return rendition_parts, rendition_audio, video_jobs, audio_jobs, missing_media_seconds
+
+def assemble_rendition(profile, part_paths, audio_paths, list_dir, list_prefix):
+    """
+    Assemble un rendu sans réencoder la vidéo : parties concaténées + audio des segments normalisé en une passe
+    (LOUDNORM_FILTER, sur tout le rendu) puis encodé en AAC. Une partie dont les en-têtes vidéo diffèrent de ceux
+    du profil (encodée par une autre version de x264, par exemple) est d'abord réencodée (voir conform_for_concat).
+    """
+    conform_for_concat(part_paths, rendition_format(profile))
+    video_list = os.path.join(list_dir, f"{list_prefix}_video.txt")
+    audio_list = os.path.join(list_dir, f"{list_prefix}_audio.txt")
+    for list_path, paths in ((video_list, part_paths), (audio_list, audio_paths)):
+        with open(list_path, "w", encoding="utf-8") as f:
+            for path in paths:
+                f.write(f"file '{os.path.abspath(path)}'\n")
+    command = [
+        "ffmpeg",
+        "-f", "concat", "-safe", "0", "-i", video_list,
+        "-f", "concat", "-safe", "0", "-i", audio_list,
+        "-map", "0:v", "-map", "1:a",
+        "-c:v", "copy",
+        "-video_track_timescale", str(SEGMENT_TIMESCALE), # Identique à l'intro et à l'outro
+        "-af", LOUDNORM_FILTER,
+        # loudnorm travaille à 192 kHz : l'audio est ramené au format de l'intro et de l'outro (voir segment_format)
+        "-c:a", "aac", "-b:a", profile["audio_bitrate"], "-ar", str(CONCAT_AUDIO_SAMPLE_RATE), "-ac", "2"
+    ]
+    if profile.get("max_duration"):
+        command.extend(["-t", str(profile["max_duration"])])
+    command.extend(["-movflags", "+faststart", "-y", profile["path"]])
+    try:
+        return subprocess.run(command, check=True, capture_output=True, text=True)
+    finally:
+        os.remove(video_list)
+        os.remove(audio_list)
+
+def build_timeline(sequence, intro=None, outro=None):
+    """
+    Chronologie de la vidéo principale : {"segments": [{"kind", "start", "duration", ...}], "duration"}.
+    sequence: (chemin, durée, infos du clip ou None) des fichiers concaténés ; intro / outro: (chemin, durée) ou None.
+    """
+    segments = []
+    offset = 0.0
+    if intro:
+        segments.append({"kind": "intro", "start": 0.0, "duration": round(intro[1], 3)})
+        offset = intro[1]
+    for _, duration, clip_info in sequence:
+        entry = {"kind": "clip" if clip_info else "stinger", "start": round(offset, 3), "duration": round(duration, 3)}
+        if clip_info:
+            entry.update({"id": clip_info['id'], "title": clip_info['title'], "broadcaster_name": clip_info['broadcaster_name']})
+        segments.append(entry)
+        offset += duration
+    if outro:
+        segments.append({"kind": "outro", "start": round(offset, 3), "duration": round(outro[1], 3)})
+        offset += outro[1]
+    return {"segments": segments, "duration": round(offset, 3)}
+
+def compile_video(profile_names=None, preview=False):
+    """
+    Compile les clips prétraités en un rendu par profil.
+    preview: produit uniquement l'aperçu basse résolution (PREVIEW_PROFILE), sans effet de bord sur le
+    reste du pipeline : il peut être lancé avant le rendu complet ou en parallèle (autre processus).
+    """
+    print("🎬 Démarrage de la compilation des clips vidéo avec timecodes" + (" (aperçu)..." if preview else "..."))
+
+    if preview:
+        profiles = {"preview": dict(PREVIEW_PROFILE)}
+    else:
+        if profile_names is None:
+            profile_names = ACTIVE_OUTPUT_PROFILES
+        # Réglages x264 recommandés par encoder_benchmark.py (config/encoder_profile.json), s'il a été exécuté
+        encoder_profile = load_encoder_profile("compile")
+        profiles = {name: dict(OUTPUT_PROFILES[name], **encoder_profile) for name in profile_names}
+        if ARCHIVE_DAILY_SEGMENTS:
+            # Format fixe, sans les réglages du benchmark : les segments de jours différents restent concaténables
+            profiles["archive"] = dict(ARCHIVE_PROFILE)
+    print(f"Rendus demandés (un seul décodage) : {', '.join(profiles)}")
+    stage = "preview" if preview else "compile"
+
+    output_dir = os.path.dirname(OUTPUT_VIDEO_PATH)
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+        print(f"Dossier de sortie créé : {output_dir}")
+        
+    if not os.path.exists(INPUT_PATHS_JSON):
+        print(f"❌ Fichier des chemins de clips téléchargés '{INPUT_PATHS_JSON}' introuvable.")
+        sys.exit(1)
+
+    # Lire les informations des clips téléchargés et prétraités (incluant la durée réelle)
+    with open(INPUT_PATHS_JSON, "r") as f:
+        downloaded_clip_info = json.load(f)
+
+    if not downloaded_clip_info:
+        print("⚠️ Aucune information de vidéo téléchargée à compiler. Fin de l'étape de compilation.")
+        sys.exit(0)
+
+    # Filtrer et limiter les clips à traiter
+    final_clips_to_process = []
+    # Créer une liste temporaire pour collecter les informations mises à jour
+    updated_downloaded_clip_info = []
+
+    for clip_data in downloaded_clip_info:
+        if clip_data.get("path") and not os.path.exists(clip_data["path"]):
+            print(f"⚠️ Clip prétraité introuvable (supprimé pour respecter le budget disque ?), ignoré : {clip_data['path']}")
+            continue
+        if clip_data.get("path") and clip_data.get("duration", 0.0) > 0:
+            final_clips_to_process.append(clip_data)
+        if len(final_clips_to_process) >= MAX_TOTAL_CLIPS:
+            break
+
+    # Fichiers intermédiaires suivis (voir workspace.py)
+    workspace = Workspace()
+
+    # NOUVELLE LOGIQUE : Extraire la première frame pour les vignettes (inutile pour un aperçu)
+    if not preview:
+        print("\n🖼️ Extraction des premières frames des clips pour la miniature...")
+    for clip_info in ([] if preview else final_clips_to_process):
+        clip_id = clip_info['id'] # Supposons que chaque clip a un ID
+        clip_path = clip_info['path']
+        frame_output_path = os.path.join(THUMBNAIL_FRAMES_DIR, f"{clip_id}_first_frame.jpg")
+        
+        if extract_first_frame(clip_path, frame_output_path):
+            # Mettre à jour l'information du clip avec le chemin de la frame
+            workspace.register(frame_output_path, "thumbnail_frames", ["thumbnail"])
+            if clip_info.get('first_frame_path') != frame_output_path:
+                # La frame extraite par download_clips.py est remplacée : la miniature ne l'utilisera plus
+                workspace.release(clip_info.get('first_frame_path'), "thumbnail")
+            clip_info['first_frame_path'] = frame_output_path
+        else:
+            print(f"⚠️ Impossible d'extraire la frame pour le clip {clip_id}. La miniature pourrait être affectée.")
+            # Optionnel: Supprimer le clip de final_clips_to_process si la frame est critique
+            # Ou simplement ne pas ajouter 'first_frame_path' si l'extraction échoue
+
+        # Ajouter l'info du clip (modifiée ou non) à la liste mise à jour
+        updated_downloaded_clip_info.append(clip_info)
+    
+    # Écrire les informations de clips mises à jour (avec les chemins des frames)
+    if not preview:
+        with open(INPUT_PATHS_JSON, "w", encoding="utf-8") as f:
+            json.dump(updated_downloaded_clip_info, f, ensure_ascii=False, indent=2)
+        print("✅ Chemins des frames ajoutés à downloaded_clip_paths.json.")
+
+
+    if not final_clips_to_process:
+        print("⚠️ Après application des filtres et limites, aucune vidéo à compiler. Fin de l'étape.")
+        sys.exit(0)
+
+    print(f"Compilation de {len(final_clips_to_process)} clips (max {MAX_TOTAL_CLIPS} clips).")
+    os.makedirs(COMPILE_SEGMENTS_DIR, exist_ok=True)
+
+    # Séquence assemblée : les clips, séparés par la transition si elle existe (au format des clips prétraités)
+    stinger = None
+    if "stinger" in BRANDING:
+        clip_encoder_settings = dict(CLIP_ENCODER_DEFAULTS, **load_encoder_profile("preprocess"))
+        stinger = get_branding_segment("stinger", segment_format(1920, 1080, clip_encoder_settings, "192k"))
+    # Durées réelles des flux vidéo assemblés (analyses ffprobe en cache), et non les durées annoncées ou additionnées ailleurs
+    sequence = [] # (chemin, durée, infos du clip ou None pour une transition)
+    for i, clip_info in enumerate(final_clips_to_process):
+        if stinger and i > 0:
+            sequence.append((stinger[0], stinger[1], None))
+        sequence.append((clip_info['path'], probe_video_duration(clip_info['path']) or clip_info.get('duration', 0.0), clip_info))
+    current_offset = sum(duration for _, duration, _ in sequence)
+
+    # Fichiers propres à l'exécution sur l'espace scratch (tmpfs s'il a la place) : l'audio PCM des segments, repris
+    # par une recompilation de la même exécution, et les listes de concaténation de ce processus (supprimées à la fin)
+    audio_dir = scratch_path(COMPILE_AUDIO_SCRATCH, PCM_BYTES_PER_MEDIA_SECOND * current_offset)
+    list_dir = scratch_path(f"compile_lists_{os.getpid()}")
+    os.makedirs(audio_dir, exist_ok=True)
+    os.makedirs(list_dir, exist_ok=True)
+
+    def branding_segments(profiles):
+        # Intro et outro rendus (ou repris du cache) avec les réglages exacts de chaque rendu, pour être ajoutés sans réencodage
+        branding = {}
+        for name, profile in profiles.items():
+            if profile.get("branding"):
+                fmt = rendition_format(profile)
+                branding[name] = [get_branding_segment(kind, fmt) if kind in BRANDING else None for kind in ("intro", "outro")]
+        return branding
+
+    def plan(profiles):
+        # Chronologie de la vidéo principale : début de chaque segment, intro et transitions comprises.
+        # Les timecodes incrustés et les chapitres de generate_metadata.py en sont tous deux dérivés.
+        branding = branding_segments(profiles)
+        main_intro, main_outro = branding.get(next(iter(profiles)), [None, None])
+        timeline = build_timeline(sequence, main_intro, main_outro)
+        return branding, timeline, plan_segments(sequence, timeline, profiles, audio_dir, list_dir)
+
+    # --- Étape 1: Parties à encoder ---
+    # Les parties déjà encodées (même clip, même texte incrusté, même position, mêmes cadrage et encodeur) sont reprises :
+    # après un changement de sélection, seuls les nouveaux clips et les têtes dont le timecode a changé sont encodés.
+    branding, timeline, (rendition_parts, rendition_audio, video_jobs, audio_jobs, missing_media_seconds) = plan(profiles)
+
+    # Réglages x264 fixes (ceux de chaque profil) même avec une échéance de publication : changer le CRF d'une partie
+    # changerait ses en-têtes, et les rendus sont assemblés sans réencodage. Seul le prétraitement s'adapte à l'échéance.
+    main_profile = next(iter(profiles.values()))
+
+    # Parties de chaque rendu dans l'ordre de la séquence ; seuls les profils avec un chemin sont assemblés
+    part_paths = {name: [path for entry_parts in parts for path in entry_parts] for name, parts in rendition_parts.items()}
+    renditions = {name: profile for name, profile in profiles.items() if profile["path"]}
+    part_count = sum(len(paths) for paths in part_paths.values())
+    new_part_count = sum(len(paths) for _, paths, _ in video_jobs)
+    print(f"♻️ Parties vidéo : {part_count - new_part_count}/{part_count} reprises, {new_part_count} à encoder ({missing_media_seconds:.0f}s de vidéo en équivalent 1080p) ; audio : {len(audio_jobs)} segment(s) à préparer.")
+
+    for profile in renditions.values():
+        rendition_dir = os.path.dirname(profile["path"])
+        if rendition_dir:
+            os.makedirs(rendition_dir, exist_ok=True)
+
+    # Parties reprises du cache : protégées du budget disque le temps de la compilation
+    for name, paths in part_paths.items():
+        for part_path in paths + rendition_audio[name]:
+            workspace.register(part_path, "compile_segments", [stage])
+
+    try:
+        # --- Étape 2: Audio de chaque segment (uniquement les segments nouveaux ou modifiés) ---
+        prepare_start = time.monotonic()
+        run_segment_jobs(audio_jobs)
+        prepare_seconds = time.monotonic() - prepare_start
+        if audio_jobs:
+            print("✅ Audio des segments préparé.")
+
+        # --- Étape 3: Encodage des parties manquantes (tous les rendus d'une partie en un seul décodage) ---
+        encode_start = time.monotonic()
+        run_segment_jobs(video_jobs)
+        encode_seconds = time.monotonic() - encode_start
+        if video_jobs and not preview and missing_media_seconds > 0:
+            record_costs({encode_cost_key("compile", main_profile): encode_seconds / missing_media_seconds})
+        for _, paths, _ in audio_jobs + video_jobs:
+            for path in paths:
+                workspace.register(path, "compile_segments", [stage])
+
+        # --- Étape 4: Assemblage de chaque rendu sans réencodage vidéo ---
+        for name, profile in renditions.items():
+            process = assemble_rendition(profile, part_paths[name], rendition_audio[name], list_dir, name)
+            print(f"✅ Compilation vidéo finale terminée avec timecodes ({name}): {profile['path']}")
+            if process.stderr: print(f"FFmpeg STDERR (assemblage {name}):\n", process.stderr)
+        if current_offset > 0 and not preview:
+            # Mesures du modèle de coût (voir cost_model.py)
+            record_costs({
+                "compile_prepare_seconds_per_media_second": prepare_seconds / current_offset,
+                "output_bytes_per_media_second": os.path.getsize(main_profile["path"]) / current_offset,
+                "renditions_bytes_per_media_second": sum(os.path.getsize(p["path"]) for p in renditions.values()) / current_offset
+            })
+
+        for name, (intro, outro) in branding.items():
+            if not intro and not outro:
+                continue
+            rendition_path = profiles[name]["path"]
+            branded_path = f"{os.path.splitext(rendition_path)[0]}_branded.mp4"
+            parts = ([intro[0]] if intro else []) + [rendition_path] + ([outro[0]] if outro else [])
+            concat_copy(parts, branded_path, os.path.join(list_dir, f"branding_{name}.txt"), rendition_format(profiles[name]))
+            os.replace(branded_path, rendition_path)
+            print(f"✅ Intro/outro ajoutés sans réencodage ({name}).")
+
+        if "archive" in profiles:
+            # Un segment archivé par clip : ses parties au format des archives et l'audio de son segment
+            archive_daily_segments([
+                dict(clip_info, duration=duration, parts=parts, audio=audio_path)
+                for (_, duration, clip_info), parts, audio_path in zip(sequence, rendition_parts["archive"], rendition_audio["archive"])
+                if clip_info
+            ])
+
+        # Les parties restent disponibles pour une recompilation, tant que le budget disque le permet
+        for name, paths in part_paths.items():
+            for part_path in paths + rendition_audio[name]:
+                workspace.release(part_path, stage, keep=True)
+
+        if preview:
+            # Les clips et la chronologie restent ceux du rendu complet, qui n'a pas encore eu lieu
+            print(f"👀 Aperçu prêt en {encode_seconds:.0f}s ({current_offset:.0f}s de vidéo, {len(final_clips_to_process)} clips) : {main_profile['path']}")
+            for entry in timeline["segments"]:
+                if entry["kind"] == "clip":
+                    print(f"  {format_duration(entry['start'])} - {entry['title']} par {entry['broadcaster_name']}")
+            return
+
+        # Chronologie vérifiée sur la vidéo produite : un écart signale une dérive entre durées analysées et PTS réels
+        timeline["output_duration"] = probe_duration(main_profile["path"])
+        if abs(timeline["output_duration"] - timeline["duration"]) > 1.0 / 30:
+            print(f"⚠️ Durée de la vidéo ({timeline['output_duration']:.3f}s) différente de la chronologie ({timeline['duration']:.3f}s).")
+        atomic_write_json(TIMELINE_JSON, timeline, ensure_ascii=False, indent=2)
+        print(f"✅ Chronologie de la vidéo enregistrée dans {TIMELINE_JSON}.")
+
+        # Les clips prétraités sont gardés tant que le budget disque le permet : une recompilation après
+        # un changement de sélection peut devoir réencoder la tête d'un clip dont le timecode a changé
+        for clip_info in final_clips_to_process:
+            workspace.release(clip_info['path'], "compile", keep=True)
+        
+        # Supprimer les frames de vignette après usage (ou les garder si tu veux les inspecter)
+        # for clip_info in updated_downloaded_clip_info:
+        #     if 'first_frame_path' in clip_info and os.path.exists(clip_info['first_frame_path']):
+        #         os.remove(clip_info['first_frame_path'])
+        # if os.path.exists(THUMBNAIL_FRAMES_DIR) and not os.listdir(THUMBNAIL_FRAMES_DIR): # Supprime le dossier s'il est vide
+        #     os.rmdir(THUMBNAIL_FRAMES_DIR)
+
+        workspace.report()
+
+    except subprocess.CalledProcessError as e:
+        print(f"❌ Erreur lors de la compilation vidéo finale : {e.stderr}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"❌ Erreur inattendue lors de la compilation vidéo : {e}")
+        sys.exit(1)
+    finally:
+        shutil.rmtree(list_dir, ignore_errors=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile les clips prétraités en une vidéo avec timecodes (un rendu par profil).")
+    parser.add_argument("--profiles", nargs="+", choices=list(OUTPUT_PROFILES), default=ACTIVE_OUTPUT_PROFILES,
+                        help="Profils de sortie à rendre (le premier doit rester 'landscape').")
+    parser.add_argument("--preview", action="store_true",
+                        help="Rendu d'aperçu rapide en 480p (output/preview.mp4) pour vérifier la sélection avant le rendu complet.")
+    args = parser.parse_args(argv)
+    compile_video(args.profiles, preview=args.preview)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,243 @@
+import os
+import json
+import math
+
+from run_context import file_lock, atomic_write_json, read_json
+
+# --- Chemins des fichiers ---
+# Coûts mesurés lors des exécutions précédentes (débits réseau, tailles des fichiers, temps d'encodage),
+# persistants entre les exécutions (voir l'étape de cache du workflow)
+PIPELINE_COSTS_JSON = os.path.join("cache", "metrics", "pipeline_costs.json")
+
+# --- Valeurs par défaut du modèle de coût (avant toute mesure, runner GitHub à 2 cœurs) ---
+DEFAULT_COSTS = {
+    "download_bytes_per_second": 15e6, # Débit de téléchargement des clips (yt-dlp)
+    "upload_bytes_per_second": 8e6, # Débit de l'upload YouTube
+    "processed_bytes_per_media_second": 650e3, # Clip prétraité 1080p30 CRF 23
+    "output_bytes_per_media_second": 650e3, # Vidéo principale uploadée
+    "renditions_bytes_per_media_second": 1000e3, # Tous les rendus de compile_video.py
+    "clip_overhead_seconds": 6.0, # Par clip : lancement de yt-dlp, analyses ffprobe, extraction des frames
+    "compile_prepare_seconds_per_media_second": 0.15 # Audio de chaque clip (PCM) avant l'encodage des parties
+}
+# Débit des clips Twitch selon leur résolution (octets par seconde de vidéo), utilisé tant qu'aucune
+# mesure n'existe pour cette résolution. L'API Helix ne donne pas la résolution : SOURCE_HEIGHT est supposée.
+SOURCE_BYTES_PER_MEDIA_SECOND = {1080: 750e3, 720: 430e3, 480: 190e3, 360: 110e3}
+SOURCE_HEIGHT = 1080
+# Temps d'encodage par seconde de vidéo (temps réel, encodages simultanés compris) en "medium" CRF 23, tant qu'aucune
+# mesure n'existe : "preprocess" (clip 1080p, décodage de la source compris), "compile" (rendu 1080p).
+# Les mesures sont enregistrées par preset et par CRF (voir encode_cost_key).
+DEFAULT_ENCODE_SECONDS_PER_MEDIA_SECOND = {"preprocess": 2.1, "compile": 2.5}
+# Coût relatif d'encodage de chaque preset x264 par rapport à "medium" (mesures typiques de x264 en 1080p), et
+# surcoût de chaque point de CRF sous ENCODE_REFERENCE_CRF (plus de coefficients à coder) : un réglage jamais mesuré
+# est estimé à partir de la mesure la plus proche, ramenée à ce réglage par ces facteurs.
+ENCODE_PRESET_FACTORS = {
+    "ultrafast": 0.15, "superfast": 0.2, "veryfast": 0.3, "faster": 0.5, "fast": 0.7,
+    "medium": 1.0, "slow": 1.7, "slower": 2.8, "veryslow": 5.5
+}
+ENCODE_CRF_STEP_FACTOR = 1.05
+ENCODE_REFERENCE_CRF = 23
+# Le travail de compilation est compté en secondes de vidéo "équivalent 1080p" : chaque rendu pèse son nombre
+# de pixels rapporté à celui-ci (720p : 0,44 ; Shorts 1080x1920 : 1,0)
+REFERENCE_OUTPUT_PIXELS = 1920 * 1080
+# Audio des segments de compile_video.py (PCM 16 bits stéréo à 44,1 kHz)
+PCM_BYTES_PER_MEDIA_SECOND = 44100 * 2 * 2
+# Poids des nouvelles mesures dans la moyenne glissante
+MEASUREMENT_WEIGHT = 0.3
+# Nombre de clips les plus coûteux affichés par le plan
+TOP_COSTLY_CLIPS = 5
+
+def source_cost_key(height):
+    return f"source_{height}p_bytes_per_media_second"
+
+def load_costs(path=PIPELINE_COSTS_JSON):
+    """Coûts calibrés : valeurs par défaut mises à jour par les mesures des exécutions précédentes."""
+    costs = dict(DEFAULT_COSTS)
+    for height, value in SOURCE_BYTES_PER_MEDIA_SECOND.items():
+        costs[source_cost_key(height)] = value
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                costs.update(json.load(f))
+        except (IOError, json.JSONDecodeError) as e:
+            print(f"⚠️ Coûts mesurés illisibles ({e}), valeurs par défaut utilisées.")
+    return costs
+
+def record_costs(measurements, path=PIPELINE_COSTS_JSON):
+    """
+    Intègre des mesures ({nom: valeur}) dans la moyenne glissante des coûts. Appelé par chaque étape
+    (depuis plusieurs threads, voire plusieurs exécutions) ; le fichier est relu et réécrit sous verrou.
+    """
+    measurements = {name: value for name, value in measurements.items() if value and value > 0}
+    if not measurements:
+        return
+    with file_lock(path):
+        recorded = read_json(path, {})
+        for name, value in measurements.items():
+            previous = recorded.get(name, value)
+            recorded[name] = (1 - MEASUREMENT_WEIGHT) * previous + MEASUREMENT_WEIGHT * value
+        atomic_write_json(path, recorded, indent=2)
+
+def encode_cost_key(kind, settings):
+    return f"{kind}_{settings['preset']}_crf{settings['crf']}_seconds_per_media_second"
+
+def relative_encode_cost(settings):
+    """Coût d'encodage d'un réglage x264 ({"preset", "crf"}) par rapport à "medium" CRF 23 (voir ENCODE_PRESET_FACTORS)."""
+    return ENCODE_PRESET_FACTORS.get(settings["preset"], 1.0) * ENCODE_CRF_STEP_FACTOR ** (ENCODE_REFERENCE_CRF - float(settings["crf"]))
+
+def encode_seconds_per_media_second(costs, kind, settings):
+    """
+    Temps d'encodage par seconde de vidéo pour un type de tâche ("preprocess", "compile") et un réglage x264
+    ({"preset", "crf"}) : la mesure de ce réglage, sinon la mesure la plus proche (même preset en priorité, puis
+    coût relatif le plus proche) ramenée à ce réglage par relative_encode_cost ; sans aucune mesure pour ce type
+    de tâche, DEFAULT_ENCODE_SECONDS_PER_MEDIA_SECOND ramené de même. Chaque réglage a ainsi son propre coût,
+    même quand un seul a été mesuré.
+    """
+    measured = costs.get(encode_cost_key(kind, settings))
+    if measured:
+        return measured
+    target_cost = relative_encode_cost(settings)
+    prefix, suffix = f"{kind}_", "_seconds_per_media_second"
+    candidates = [] # (même preset ?, écart de coût relatif, secondes ramenées au réglage demandé)
+    for name, value in costs.items():
+        if not (name.startswith(prefix) and name.endswith(suffix) and value):
+            continue
+        # Les autres coûts du même préfixe ("compile_prepare_...") n'ont pas de preset connu
+        preset, _, crf = name[len(prefix):-len(suffix)].rpartition("_crf")
+        if preset not in ENCODE_PRESET_FACTORS:
+            continue
+        try:
+            measured_cost = relative_encode_cost({"preset": preset, "crf": float(crf)})
+        except ValueError:
+            continue
+        candidates.append((preset != settings["preset"], abs(math.log(measured_cost / target_cost)), value * target_cost / measured_cost))
+    if candidates:
+        return min(candidates)[2]
+    return DEFAULT_ENCODE_SECONDS_PER_MEDIA_SECOND.get(kind, 1.0) * target_cost
+
+def output_weight(profile):
+    """Poids d'un rendu dans le travail de compilation (voir REFERENCE_OUTPUT_PIXELS)."""
+    return profile["width"] * profile["height"] / REFERENCE_OUTPUT_PIXELS
+
+def compile_media_seconds(start, duration, profiles):
+    """Secondes "équivalent 1080p" à encoder pour [start, start + duration] dans tous les rendus (durée maximale comprise)."""
+    total = 0.0
+    for profile in profiles:
+        end = start + duration
+        if profile.get("max_duration"):
+            end = min(end, profile["max_duration"])
+        total += max(0.0, end - start) * output_weight(profile)
+    return total
+
+def select_like_download(clips, target_duration_seconds, max_clips, min_clips):
+    """Clips que download_clips.py prendrait, dans l'ordre du classement (durées annoncées par l'API)."""
+    selected = []
+    total = 0.0
+    for clip in clips:
+        if len(selected) >= max_clips or (total >= target_duration_seconds and len(selected) >= min_clips):
+            break
+        selected.append(clip)
+        total += clip.duration
+    return selected
+
+def estimate_run(clips, preprocess_settings, compile_profiles, parallelism=1, cached_ids=(), source_height=SOURCE_HEIGHT, costs=None):
+    """
+    Estime le coût de chaque étape pour une sélection de clips, sans rien télécharger ni encoder.
+    preprocess_settings: réglages x264 ({"preset", "crf"}) du prétraitement.
+    compile_profiles: rendus produits par compile_video.py (profils de OUTPUT_PROFILES : résolution, durée maximale,
+        preset et CRF) ; le travail de compilation est la somme de celui de chaque rendu.
+    parallelism: nombre de clips traités simultanément par download_clips.py (seuls les téléchargements en profitent :
+        les encodages simultanés se partagent les mêmes cœurs, et leurs temps mesurés le reflètent déjà).
+    cached_ids: clips déjà prétraités (aucun téléchargement ni encodage).
+    Retourne {"clips": [coût par clip], "stages": {étape: secondes}, "total_seconds", "disk_peak_bytes", ...}.
+    """
+    costs = costs or load_costs()
+    source_rate = costs.get(source_cost_key(source_height), SOURCE_BYTES_PER_MEDIA_SECOND.get(source_height, SOURCE_BYTES_PER_MEDIA_SECOND[SOURCE_HEIGHT]))
+    preprocess_rate = encode_seconds_per_media_second(costs, "preprocess", preprocess_settings)
+    # Tous les rendus sont encodés dans la même passe (un seul décodage) : temps mesuré par seconde "équivalent 1080p"
+    compile_rate = encode_seconds_per_media_second(costs, "compile", compile_profiles[0])
+
+    clip_costs = []
+    position = 0.0
+    for clip in clips:
+        cached = clip.id in cached_ids
+        download_bytes = 0.0 if cached else clip.duration * source_rate
+        download_seconds = 0.0 if cached else download_bytes / costs["download_bytes_per_second"] + costs["clip_overhead_seconds"]
+        preprocess_seconds = 0.0 if cached else clip.duration * preprocess_rate
+        compile_seconds = (
+            compile_media_seconds(position, clip.duration, compile_profiles) * compile_rate
+            + clip.duration * costs["compile_prepare_seconds_per_media_second"]
+        )
+        position += clip.duration
+        clip_costs.append({
+            "id": clip.id, "title": clip.title, "duration": clip.duration, "cached": cached,
+            "download_bytes": download_bytes, "download_seconds": download_seconds,
+            "preprocess_seconds": preprocess_seconds, "compile_seconds": compile_seconds,
+            "total_seconds": download_seconds + preprocess_seconds + compile_seconds
+        })
+
+    media_seconds = sum(clip.duration for clip in clips)
+    output_bytes = media_seconds * costs["output_bytes_per_media_second"]
+    stages = {
+        "download": sum(c["download_seconds"] for c in clip_costs) / max(1, parallelism),
+        "preprocess": sum(c["preprocess_seconds"] for c in clip_costs),
+        "compile": sum(c["compile_seconds"] for c in clip_costs),
+        "upload": output_bytes / costs["upload_bytes_per_second"]
+    }
+
+    # Pic d'occupation disque : pendant le téléchargement, clips prétraités + clips bruts en cours ;
+    # pendant la compilation, clips prétraités + parties encodées et audio PCM des segments + rendus
+    processed_bytes = media_seconds * costs["processed_bytes_per_media_second"]
+    largest_raw = max((c["download_bytes"] for c in clip_costs), default=0.0)
+    disk_phases = {
+        "download": processed_bytes + largest_raw * max(1, parallelism),
+        "compile": processed_bytes + media_seconds * (2 * costs["renditions_bytes_per_media_second"] + PCM_BYTES_PER_MEDIA_SECOND)
+    }
+    peak_phase = max(disk_phases, key=disk_phases.get)
+
+    return {
+        "clips": clip_costs,
+        "stages": stages,
+        "total_seconds": sum(stages.values()),
+        "media_seconds": media_seconds,
+        "download_bytes": sum(c["download_bytes"] for c in clip_costs),
+        "upload_bytes": output_bytes,
+        "disk_peak_bytes": disk_phases[peak_phase],
+        "disk_peak_phase": peak_phase
+    }
+
+def trim_to_budget(clips, budget_seconds, min_clips, estimate):
+    """
+    Retire les clips les moins bien classés jusqu'à ce que l'estimation tienne dans le budget
+    (sans descendre sous min_clips). estimate: fonction liste de clips -> estimation (voir estimate_run).
+    Retourne (clips conservés, estimation).
+    """
+    kept = list(clips)
+    plan = estimate(kept)
+    while plan["total_seconds"] > budget_seconds and len(kept) > min_clips:
+        kept.pop()
+        plan = estimate(kept)
+    return kept, plan
+
+def format_size(size):
+    return f"{size / 1e6:.0f} Mo" if size < 1e9 else f"{size / 1e9:.2f} Go"
+
+def print_plan(plan, budget_seconds=None):
+    """Affiche le coût prévu par étape et les clips qui pèsent le plus."""
+    total = plan["total_seconds"]
+    print(f"🧮 Plan d'exécution : {len(plan['clips'])} clips, {plan['media_seconds']:.0f}s de vidéo")
+    print(f"{'Étape':<14}{'Durée (min)':>13}{'Part':>8}")
+    for stage, seconds in plan["stages"].items():
+        print(f"{stage:<14}{seconds / 60:>13.1f}{seconds / total if total else 0:>8.0%}")
+    print(f"{'total':<14}{total / 60:>13.1f}")
+    print(f"Téléchargement : {format_size(plan['download_bytes'])}, upload : {format_size(plan['upload_bytes'])}, "
+          f"pic disque : {format_size(plan['disk_peak_bytes'])} (pendant {plan['disk_peak_phase']}).")
+
+    costly = sorted(plan["clips"], key=lambda c: c["total_seconds"], reverse=True)[:TOP_COSTLY_CLIPS]
+    if costly:
+        print("Clips les plus coûteux :")
+        for c in costly:
+            status = " (déjà prétraité)" if c["cached"] else ""
+            print(f"  {c['total_seconds'] / 60:5.1f} min  {c['duration']:5.1f}s  {c['id']}  {c['title']}{status}")
+    if budget_seconds is not None:
+        verdict = "✅ dans le budget" if total <= budget_seconds else "⚠️ hors budget"
+        print(f"{verdict} ({total / 60:.1f} min prévues pour {budget_seconds / 60:.1f} min disponibles).")
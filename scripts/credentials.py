@@ -0,0 +1,260 @@
+import os
+import sys
+import json
+import time
+import hmac
+import base64
+import hashlib
+import threading
+from datetime import datetime, timezone
+
+import requests
+
+from run_context import file_lock, atomic_write_bytes, read_json
+
+# --- Chemins des fichiers ---
+# Jetons d'accès en cache (persistant entre les exécutions, voir l'étape de cache du workflow).
+# Seuls les jetons d'accès y sont écrits, jamais les secrets : chaque entrée est chiffrée et authentifiée avec
+# des clés dérivées du secret du fournisseur, si bien qu'un cache lu sans les secrets (ou après leur
+# renouvellement) est inutilisable et simplement ignoré. Le fichier n'est lisible que par son propriétaire.
+CREDENTIALS_CACHE_JSON = os.path.join("cache", "credentials.json")
+CREDENTIALS_CACHE_MODE = 0o600
+
+# --- FOURNISSEURS ---
+#   env: variables d'environnement requises (ID client, secret, puis jeton de rafraîchissement pour YouTube)
+#   refresh_ahead: un jeton encore valide mais qui expire dans moins de X secondes est renouvelé en
+#                  arrière-plan (les jetons d'application Twitch durent environ 60 jours, ceux de YouTube 1 heure)
+PROVIDERS = {
+    "twitch": {
+        "env": ("TWITCH_CLIENT_ID", "TWITCH_CLIENT_SECRET"),
+        "token_url": "https://id.twitch.tv/oauth2/token",
+        "refresh_ahead": 7 * 24 * 3600
+    },
+    "youtube": {
+        "env": ("YOUTUBE_CLIENT_ID", "YOUTUBE_CLIENT_SECRET", "YOUTUBE_REFRESH_TOKEN"),
+        "token_url": "https://oauth2.googleapis.com/token",
+        "refresh_ahead": 15 * 60
+    }
+}
+# Un jeton qui expire dans moins de X secondes n'est plus servi (il pourrait expirer pendant la requête)
+MIN_TOKEN_VALIDITY_SECONDS = 5 * 60
+TOKEN_REQUEST_TIMEOUT_SECONDS = 15
+API_REQUEST_TIMEOUT_SECONDS = 15 # Requêtes Helix de twitch_get
+
+_tokens = {} # Cache en mémoire : fournisseur -> {"access_token", "expires_at"}
+_locks = {provider: threading.Lock() for provider in PROVIDERS}
+_background = {} # Fournisseur -> thread de renouvellement en cours
+
+class CredentialError(Exception):
+    """Identifiants absents ou refusés par le fournisseur."""
+
+def provider_credentials(provider):
+    """Valeurs des variables d'environnement du fournisseur, ou None s'il en manque une."""
+    values = [os.getenv(name) for name in PROVIDERS[provider]["env"]]
+    return values if all(values) else None
+
+def _cache_key(provider, credentials):
+    # Identifiée par l'ID client : changer d'application n'utilise jamais le jeton de la précédente
+    return f"{provider}:{hashlib.sha256(credentials[0].encode('utf-8')).hexdigest()[:16]}"
+
+def _hkdf(secret, info, length=32):
+    """HKDF-SHA256 (RFC 5869), sel fixe : dérive des clés indépendantes d'un même secret."""
+    prk = hmac.new(b"lctdj-credentials", secret, hashlib.sha256).digest()
+    output, block = b"", b""
+    for counter in range(1, (length + 31) // 32 + 1):
+        block = hmac.new(prk, block + info + bytes([counter]), hashlib.sha256).digest()
+        output += block
+    return output[:length]
+
+def _sealing_keys(credentials):
+    """Clé de chiffrement et clé d'authentification (distinctes), dérivées des secrets du fournisseur."""
+    secret = "\0".join(credentials[1:]).encode("utf-8")
+    return _hkdf(secret, b"encryption"), _hkdf(secret, b"authentication")
+
+def _keystream(key, nonce, length):
+    blocks = (hmac.new(key, nonce + counter.to_bytes(4, "big"), hashlib.sha256).digest() for counter in range((length + 31) // 32))
+    return b"".join(blocks)[:length]
+
+def seal(credentials, entry):
+    """
+    Chiffre une entrée du cache (flux HMAC-SHA256) et l'authentifie (HMAC sur nonce + texte chiffré),
+    avec deux clés distinctes (voir _sealing_keys).
+    """
+    encryption_key, mac_key = _sealing_keys(credentials)
+    nonce = os.urandom(16)
+    plaintext = json.dumps(entry).encode("utf-8")
+    ciphertext = bytes(a ^ b for a, b in zip(plaintext, _keystream(encryption_key, nonce, len(plaintext))))
+    tag = hmac.new(mac_key, nonce + ciphertext, hashlib.sha256).digest()
+    return base64.b64encode(nonce + tag + ciphertext).decode("ascii")
+
+def unseal(credentials, sealed):
+    """Déchiffre une entrée du cache ; retourne None si elle a été modifiée ou scellée avec d'autres secrets."""
+    try:
+        raw = base64.b64decode(sealed)
+    except (TypeError, ValueError):
+        return None
+    nonce, tag, ciphertext = raw[:16], raw[16:48], raw[48:]
+    encryption_key, mac_key = _sealing_keys(credentials)
+    if not hmac.compare_digest(tag, hmac.new(mac_key, nonce + ciphertext, hashlib.sha256).digest()):
+        return None
+    plaintext = bytes(a ^ b for a, b in zip(ciphertext, _keystream(encryption_key, nonce, len(ciphertext))))
+    try:
+        return json.loads(plaintext)
+    except ValueError:
+        return None
+
+def _remaining_seconds(entry):
+    return (entry or {}).get("expires_at", 0) - time.time()
+
+def _cached_entry(provider, credentials):
+    """Jeton en mémoire, sinon repris du cache sur disque."""
+    entry = _tokens.get(provider)
+    if entry is None:
+        sealed = read_json(CREDENTIALS_CACHE_JSON, {}).get(_cache_key(provider, credentials))
+        entry = unseal(credentials, sealed) if sealed else None
+        if entry is not None:
+            _tokens[provider] = entry
+    return entry
+
+def _store_entry(provider, credentials, entry):
+    _tokens[provider] = entry
+    # Fusion sous verrou avec les jetons enregistrés entre-temps par une autre exécution
+    with file_lock(CREDENTIALS_CACHE_JSON):
+        cache = read_json(CREDENTIALS_CACHE_JSON, {})
+        cache[_cache_key(provider, credentials)] = seal(credentials, entry)
+        atomic_write_bytes(CREDENTIALS_CACHE_JSON, json.dumps(cache).encode("utf-8"), mode=CREDENTIALS_CACHE_MODE)
+
+def _request_token(provider, credentials):
+    """Demande un nouveau jeton d'accès au fournisseur (une seule requête HTTP)."""
+    if provider == "twitch":
+        client_id, client_secret = credentials
+        payload = {"client_id": client_id, "client_secret": client_secret, "grant_type": "client_credentials"}
+    else:
+        client_id, client_secret, refresh_token = credentials
+        payload = {"client_id": client_id, "client_secret": client_secret, "refresh_token": refresh_token, "grant_type": "refresh_token"}
+    try:
+        response = requests.post(PROVIDERS[provider]["token_url"], data=payload, timeout=TOKEN_REQUEST_TIMEOUT_SECONDS)
+        response.raise_for_status()
+        token_data = response.json()
+        return {"access_token": token_data["access_token"], "expires_at": time.time() + float(token_data.get("expires_in", 3600))}
+    except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+        raise CredentialError(f"jeton d'accès {provider} non obtenu : {e}") from e
+
+def get_access_token(provider, rejected_token=None):
+    """
+    Retourne un jeton d'accès valide pour le fournisseur ("twitch" ou "youtube"), repris du cache (mémoire
+    puis disque) tant qu'il n'approche pas de son expiration ; un jeton proche de l'expiration est servi
+    pendant que son remplaçant est demandé en arrière-plan.
+    rejected_token: jeton refusé par l'API (réponse 401) ; il n'est plus servi et un nouveau est demandé,
+    sauf si un autre thread l'a déjà remplacé.
+    Lève CredentialError si les identifiants sont absents ou refusés.
+    """
+    credentials = provider_credentials(provider)
+    if credentials is None:
+        raise CredentialError(f"variables d'environnement manquantes : {', '.join(PROVIDERS[provider]['env'])}")
+
+    entry = _cached_entry(provider, credentials)
+    remaining = _remaining_seconds(entry)
+    if remaining > MIN_TOKEN_VALIDITY_SECONDS and entry["access_token"] != rejected_token:
+        if remaining < PROVIDERS[provider]["refresh_ahead"]:
+            refresh_in_background(provider)
+        return entry["access_token"]
+
+    with _locks[provider]:
+        # Un renouvellement (arrière-plan ou autre thread) a pu aboutir pendant l'attente du verrou
+        entry = _tokens.get(provider)
+        if _remaining_seconds(entry) > MIN_TOKEN_VALIDITY_SECONDS and entry["access_token"] != rejected_token:
+            return entry["access_token"]
+        print(f"🔑 Récupération d'un jeton d'accès {provider}...")
+        entry = _request_token(provider, credentials)
+        _store_entry(provider, credentials, entry)
+        print(f"✅ Jeton d'accès {provider} récupéré (valide {_remaining_seconds(entry) / 3600:.1f} h).")
+        return entry["access_token"]
+
+def refresh_in_background(provider):
+    """
+    Renouvelle le jeton du fournisseur dans un thread, sans attendre : un appel à get_access_token qui a
+    besoin d'un nouveau jeton attend la fin de ce renouvellement au lieu d'en demander un second.
+    """
+    credentials = provider_credentials(provider)
+    thread = _background.get(provider)
+    if credentials is None or (thread is not None and thread.is_alive()):
+        return
+
+    def refresh():
+        with _locks[provider]:
+            entry = _tokens.get(provider)
+            if _remaining_seconds(entry) > PROVIDERS[provider]["refresh_ahead"]:
+                return
+            try:
+                _store_entry(provider, credentials, _request_token(provider, credentials))
+            except CredentialError as e:
+                print(f"  ⚠️ Renouvellement en arrière-plan impossible ({e}), le jeton actuel reste utilisé.")
+
+    thread = threading.Thread(target=refresh, name=f"credentials-{provider}", daemon=True)
+    _background[provider] = thread
+    thread.start()
+
+def prefetch(provider):
+    """
+    Prépare le jeton d'une étape pendant l'import de son module : rien à faire s'il est en cache et loin
+    de son expiration, sinon il est demandé en arrière-plan.
+    """
+    credentials = provider_credentials(provider)
+    if credentials is None:
+        return
+    if _remaining_seconds(_cached_entry(provider, credentials)) < PROVIDERS[provider]["refresh_ahead"]:
+        refresh_in_background(provider)
+
+def require_access_token(provider):
+    """get_access_token pour le point d'entrée d'une étape : arrête le script si aucun jeton n'est obtenu."""
+    try:
+        return get_access_token(provider)
+    except CredentialError as e:
+        print(f"❌ ERREUR: {e}")
+        sys.exit(1)
+
+def twitch_get(url, params=None):
+    """
+    Requête GET sur l'API Helix avec le jeton d'application en cache. Si l'API refuse le jeton (401 : jeton
+    révoqué ou expiré plus tôt que prévu), un nouveau jeton est demandé et la requête réessayée une fois.
+    Retourne la réponse (à vérifier avec raise_for_status), ou lève CredentialError.
+    """
+    client_id = os.getenv(PROVIDERS["twitch"]["env"][0])
+    access_token = get_access_token("twitch")
+    response = requests.get(url, headers={"Client-ID": client_id, "Authorization": f"Bearer {access_token}"}, params=params, timeout=API_REQUEST_TIMEOUT_SECONDS)
+    if response.status_code == 401:
+        print("  🔑 Jeton Twitch refusé (401), nouvelle authentification...")
+        access_token = get_access_token("twitch", rejected_token=access_token)
+        response = requests.get(url, headers={"Client-ID": client_id, "Authorization": f"Bearer {access_token}"}, params=params, timeout=API_REQUEST_TIMEOUT_SECONDS)
+    return response
+
+def youtube_credentials(scopes):
+    """
+    Identifiants google-auth prêts à l'emploi : le jeton d'accès en cache est fourni avec son expiration,
+    si bien qu'aucun rafraîchissement n'a lieu avant l'upload. La bibliothèque le rafraîchit d'elle-même
+    (une fois) si l'API le refuse ; le jeton obtenu est alors enregistré par save_youtube_credentials.
+    """
+    from google.oauth2.credentials import Credentials
+
+    access_token = get_access_token("youtube")
+    client_id, client_secret, refresh_token = provider_credentials("youtube")
+    expiry = datetime.fromtimestamp(_tokens["youtube"]["expires_at"], timezone.utc).replace(tzinfo=None) # google-auth attend de l'UTC naïf
+    return Credentials(
+        token=access_token,
+        expiry=expiry,
+        refresh_token=refresh_token,
+        token_uri=PROVIDERS["youtube"]["token_url"],
+        client_id=client_id,
+        client_secret=client_secret,
+        scopes=scopes
+    )
+
+def save_youtube_credentials(creds):
+    """Enregistre le jeton si google-auth l'a rafraîchi pendant l'upload."""
+    credentials = provider_credentials("youtube")
+    if credentials is None or not creds.token or creds.expiry is None:
+        return
+    if creds.token != (_tokens.get("youtube") or {}).get("access_token"):
+        expires_at = creds.expiry.replace(tzinfo=timezone.utc).timestamp()
+        _store_entry("youtube", credentials, {"access_token": creds.token, "expires_at": expires_at})
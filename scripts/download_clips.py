@@ -1,207 +1,756 @@
-import subprocess
-import os
-import json
-import sys
-import re # Importation pour les expressions régulières
-
-INPUT_CLIPS_JSON = os.path.join("data", "top_clips.json")
-RAW_CLIPS_DIR = os.path.join("data", "raw_clips") # Keep original downloads here
-PROCESSED_CLIPS_DIR = os.path.join("data", "processed_clips") # New directory for consistent clips
-CLIP_FRAMES_DIR = os.path.join("data", "clip_frames") # Nouveau dossier pour les frames extraites
-
-def get_video_duration(filepath):
-    """
-    Obtient la durée d'une vidéo en secondes en utilisant ffprobe.
-    Retourne 0.0 si la durée ne peut pas être déterminée.
-    """
-    try:
-        cmd = [
-            "ffprobe",
-            "-v", "error",
-            "-show_entries", "format=duration",
-            "-of", "default=noprint_wrappers=1:nokey=1",
-            filepath
-        ]
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        return float(result.stdout.strip())
-    except (subprocess.CalledProcessError, ValueError) as e:
-        print(f"  ⚠️ Impossible d'obtenir la durée de {filepath} avec ffprobe: {e}")
-        return 0.0
-
-def ffmpeg_escape_string(text):
-    """
-    Escapes characters in a string for FFmpeg drawtext filter to prevent syntax errors.
-    Handles backslashes, single quotes, colons, and square brackets.
-    """
-    # Escape backslashes first, then single quotes, then colons
-    text = text.replace('\\', '\\\\')
-    text = text.replace("'", "\\'")
-    text = text.replace(':', '\\:')
-    text = text.replace('[', '\\[')
-    text = text.replace(']', '\\]')
-    # Commas can also be an issue if they're not intended as separators
-    text = text.replace(',', '\\,')
-    return text
-
-def download_clips():
-    print("📥 Démarrage du téléchargement et du prétraitement des clips Twitch individuels...")
-    os.makedirs(RAW_CLIPS_DIR, exist_ok=True)
-    os.makedirs(PROCESSED_CLIPS_DIR, exist_ok=True) # Create the new processed clips directory
-    os.makedirs(CLIP_FRAMES_DIR, exist_ok=True) # Créer le nouveau dossier pour les frames
-
-    if not os.path.exists(INPUT_CLIPS_JSON):
-        print(f"❌ Fichier des clips '{INPUT_CLIPS_JSON}' introuvable.")
-        # Écrire un fichier JSON vide pour downloaded_clip_paths.json
-        with open(os.path.join("data", "downloaded_clip_paths.json"), "w") as f:
-            json.dump([], f)
-        sys.exit(1)
-
-    with open(INPUT_CLIPS_JSON, "r", encoding="utf-8") as f:
-        clips = json.load(f)
-
-    # --- DÉBOGAGE : Aperçu des données lues depuis top_clips.json ---
-    if clips:
-        print("\n--- Aperçu des données lues depuis top_clips.json dans download_clips.py ---")
-        for i, clip_data in enumerate(clips[:3]): # Affiche les 3 premiers clips pour vérification
-            print(f"Clip {i+1}:")
-            print(f"  ID: {clip_data.get('id', 'N/A')}")
-            print(f"  Title: {clip_data.get('title', 'N/A')}")
-            print(f"  Broadcaster Name: {clip_data.get('broadcaster_name', 'N/A')}")
-            print(f"  URL: {clip_data.get('url', 'N/A')}")
-        print("----------------------------------------------------------------------\n")
-    # --- FIN DÉBOGAGE ---
-
-    if not clips:
-        print("⚠️ Aucun clip à télécharger. La liste des clips est vide.")
-        with open(os.path.join("data", "downloaded_clip_paths.json"), "w") as f:
-            json.dump([], f)
-        return
-
-    downloaded_and_processed_info = [] # Will store dicts with path, id, and actual duration
-    for i, clip in enumerate(clips):
-        clip_url = clip["url"]
-
-        clip_id = clip.get("id", f"unknown_id_{i}")
-        clip_title_raw = clip.get("title", "Titre inconnu")
-        broadcaster_name_raw = clip.get("broadcaster_name", "Streamer inconnu")
-
-        clip_title_escaped = ffmpeg_escape_string(clip_title_raw)
-        broadcaster_name_escaped = ffmpeg_escape_string(broadcaster_name_raw)
-
-        raw_output_filename = os.path.join(RAW_CLIPS_DIR, f"{clip_id}_raw.mp4")
-        processed_output_filename = os.path.join(PROCESSED_CLIPS_DIR, f"{clip_id}_processed.mp4")
-        first_frame_output_path = os.path.join(CLIP_FRAMES_DIR, f"{clip_id}_first_frame.jpg") # Chemin de la frame
-
-        print(f"Téléchargement du clip {i+1}/{len(clips)}: {clip_title_raw} par {broadcaster_name_raw} (ID: {clip_id})...")
-        try:
-            # 1. Téléchargement avec yt-dlp
-            yt_dlp_command = [
-                "yt-dlp",
-                "--output", raw_output_filename,
-                "--format", "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best",
-                clip_url
-            ]
-            subprocess.run(yt_dlp_command, check=True)
-            print(f"  ✅ Clip téléchargé: {raw_output_filename}")
-
-            # 2. Prétraitement avec FFmpeg pour normaliser le format, les codecs et ajouter du texte
-            print(f"  Prétraitement du clip {i+1}/{len(clips)}: {clip_title_raw} (ajout du texte)...")
-
-            title_display = clip_title_escaped
-            broadcaster_display = broadcaster_name_escaped
-
-            font_path = "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf"
-            if not os.path.exists(font_path):
-                font_path = "/usr/share/fonts/truetype/dejavu/DejaVuSans-Regular.ttf"
-                if not os.path.exists(font_path):
-                    font_path = "sans-serif" # Generic font family name for FFmpeg
-                    print(f"⚠️ Police spécifique non trouvée. Utilisation d'une police générique '{font_path}'.")
-
-            font_size = 36
-            text_color = "white"
-            border_color = "black"
-            border_width = 2
-
-            title_filter = (
-                f"drawtext=fontfile='{font_path}':"
-                f"text='{title_display}':"
-                f"x=(w-text_w)/2:y=H*0.04:"
-                f"fontcolor={text_color}:fontsize={font_size}:"
-                f"bordercolor={border_color}:borderw={border_width}"
-            )
-
-            broadcaster_filter = (
-                f"drawtext=fontfile='{font_path}':"
-                f"text='{broadcaster_display}':"
-                f"x=(w-text_w)/2:y=H*0.04+text_h+5:"
-                f"fontcolor={text_color}:fontsize={font_size}:"
-                f"bordercolor={border_color}:borderw={border_width}"
-            )
-
-            video_filters = (
-                "scale=1920:1080:force_original_aspect_ratio=decrease,"
-                "pad=1920:1080:(ow-iw)/2:(oh-ih)/2,"
-                "setsar=1,fps=30,"
-                f"{title_filter},"
-                f"{broadcaster_filter}"
-            )
-
-            ffmpeg_preprocess_command = [
-                "ffmpeg",
-                "-i", raw_output_filename,
-                "-vf", video_filters,
-                "-c:v", "libx264",
-                "-preset", "fast",
-                "-crf", "23",
-                "-pix_fmt", "yuv420p",
-                "-c:a", "aac",
-                "-b:a", "192k",
-                "-ac", "2",
-                "-ar", "44100",
-                "-loglevel", "error",
-                "-y",
-                processed_output_filename
-            ]
-            subprocess.run(ffmpeg_preprocess_command, check=True, capture_output=True, text=True)
-            print(f"  ✅ Clip prétraité avec texte: {processed_output_filename}")
-
-            # --- NOUVEAU : Extraire la première frame du clip traité ---
-            print(f"  Extraction de la première frame pour {clip_id}...")
-            ffmpeg_extract_frame_command = [
-                "ffmpeg",
-                "-i", processed_output_filename,
-                "-vframes", "1",
-                "-q:v", "2", # Qualité de sortie (1-31, 1 est le meilleur)
-                "-y",
-                first_frame_output_path
-            ]
-            subprocess.run(ffmpeg_extract_frame_command, check=True, capture_output=True, text=True)
-            print(f"  ✅ Première frame extraite: {first_frame_output_path}")
-            # --- FIN NOUVEAU ---
-
-            actual_duration = get_video_duration(processed_output_filename)
-            print(f"  Durée réelle du clip traité: {actual_duration:.2f} secondes.")
-
-            downloaded_and_processed_info.append({
-                "id": clip_id,
-                "path": processed_output_filename,
-                "duration": actual_duration,
-                "title": clip_title_raw,
-                "broadcaster_name": broadcaster_name_raw,
-                "first_frame_path": first_frame_output_path # Ajoute le chemin de la frame
-            })
-
-        except subprocess.CalledProcessError as e:
-            print(f"  ❌ Erreur lors du traitement du clip {clip_url} (téléchargement ou prétraitement/extraction frame): {e}")
-            if e.stdout: print(f"    STDOUT: {e.stdout}")
-            if e.stderr: print(f"    STDERR: {e.stderr}")
-        except Exception as e:
-            print(f"  ❌ Erreur inattendue lors du traitement du clip {clip_url}: {e}")
-
-    with open(os.path.join("data", "downloaded_clip_paths.json"), "w", encoding="utf-8") as f:
-        json.dump(downloaded_and_processed_info, f, ensure_ascii=False, indent=2)
-
-    print("✅ Téléchargement et prétraitement des clips terminé.")
-
-if __name__ == "__main__":
-    download_clips()
\ No newline at end of file
+import subprocess
+import os
+import argparse
+import json
+import sys
+import re # Importation pour les expressions régulières
+import time
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from captions import render_caption, caption_strip_height
+from frame_selection import select_best_frame
+from clip_model import Clip, ProcessedClip, load_clips, save_clips, ClipStreamReader, ClipStreamWriter, stream_path, STREAM_TOKEN_ENV_VAR
+from workspace import Workspace
+from encode_scheduler import EncodeScheduler, load_encoder_profile, x264_arguments
+from cost_model import record_costs, source_cost_key, select_like_download, estimate_run, trim_to_budget, print_plan, compile_media_seconds
+from run_context import run_path, target_path
+from media_probe import probe_media, probe_duration, probe_video_signature
+from mezzanine import SEGMENT_TIMESCALE, segment_format, encoder_reference_signature
+
+DATA_DIR = target_path("data") # Dossier de données de la cible (cli.py --target, voir COMPILATION_TARGETS dans get_top_clips.py)
+# Fichiers propres à une cible, lus et écrits dans son dossier de données
+INPUT_CLIPS_FILENAME = "top_clips.json"
+CANDIDATE_CLIPS_FILENAME = "candidate_clips.json" # Liste classée (sélection + clips de remplacement) écrite par get_top_clips.py
+DOWNLOADED_CLIP_PATHS_FILENAME = "downloaded_clip_paths.json" # Aussi publié clip par clip dans downloaded_clip_paths.jsonl
+PREPROCESS_PLANS_FILENAME = "preprocess_plans.json" # Plan de prétraitement choisi pour chaque clip
+
+# Dossiers partagés par toutes les cibles : chaque clip n'est téléchargé et normalisé qu'une seule fois
+RAW_CLIPS_DIR = run_path("data", "raw_clips") # Keep original downloads here
+PROCESSED_CLIPS_DIR = run_path("data", "processed_clips") # New directory for consistent clips
+CLIP_FRAMES_DIR = run_path("data", "clip_frames") # Nouveau dossier pour les frames extraites
+
+# --- Objectif de téléchargement ---
+# Durée cumulée visée (mêmes valeurs que MIN_VIDEO_DURATION_SECONDS dans get_top_clips.py et MAX_TOTAL_CLIPS dans compile_video.py)
+TARGET_VIDEO_DURATION_SECONDS = 630
+MAX_TOTAL_CLIPS = 30
+MIN_CLIPS = 3 # Nombre minimal de clips, comme lors de la sélection
+# Nombre de clips supplémentaires téléchargés par anticipation, pour remplacer immédiatement un clip en échec
+SPECULATIVE_DOWNLOADS = 2
+# --follow : attente maximale de la fin du flux des candidats (candidate_clips.jsonl) écrit par get_top_clips.py.
+# Le flux n'est lu que s'il porte le jeton STREAM_TOKEN de l'exécution (voir clip_model.py), et l'attente
+# s'arrête dès que le processus de get_top_clips.py (--producer-pid, sinon celui du flux) se termine.
+CANDIDATE_STREAM_TIMEOUT_SECONDS = 30 * 60
+
+# --- Format cible des clips prétraités (doit rester identique pour la concaténation dans compile_video.py) ---
+TARGET_WIDTH = 1920
+TARGET_HEIGHT = 1080
+TARGET_FPS = 30
+TARGET_VIDEO_CODEC = "h264"
+TARGET_PIX_FMT = "yuv420p"
+TARGET_AUDIO_CODEC = "aac"
+TARGET_AUDIO_CHANNELS = 2
+TARGET_AUDIO_SAMPLE_RATE = 44100
+
+# Choix par exécution (--burn-in-text / --no-burn-in-text), désactivé par défaut : compile_video.py incruste déjà
+# le titre et le streamer avec le timecode au début de chaque clip.
+# Si TRUE, le titre et le nom du streamer sont incrustés dans chaque clip (réencodage vidéo obligatoire).
+# Si FALSE, la vidéo d'un clip peut être copiée telle quelle (stream copy), mais seulement si son flux H.264
+# a exactement les paramètres de la sortie de libx264 avec les réglages du prétraitement (SPS/PPS, profil,
+# niveau, base de temps ; voir encoder_reference_signature) : tous les clips prétraités gardent ainsi les mêmes
+# paramètres de flux. Les clips encodés par Twitch ne remplissent souvent pas cette condition et sont réencodés.
+BURN_IN_CLIP_TEXT = False
+CLIP_CAPTION_FONT_SIZE = 36
+
+# Réglages x264 par défaut du prétraitement, remplacés par ceux de config/encoder_profile.json s'il existe
+# (voir encoder_benchmark.py), puis ajustés par l'ordonnanceur si PUBLISH_DEADLINE est défini
+DEFAULT_PRESET = "fast"
+DEFAULT_CRF = 23
+CLIP_CAPTION_Y = int(TARGET_HEIGHT * 0.04) - int(CLIP_CAPTION_FONT_SIZE * 0.3) # Haut de la bande titre + streamer
+# Un clip prétraité est identifié par les réglages demandés (format cible et x264, avant ajustement à l'échéance)
+# et par le texte incrusté : il n'est réutilisé que par une exécution qui le produirait à l'identique.
+# À incrémenter si la commande de prétraitement change (tous les clips sont alors prétraités à nouveau).
+PROCESSED_CLIP_VERSION = 1
+
+def parse_frame_rate(rate):
+    """Convertit un débit d'images ffprobe ("30000/1001", "30/1") en float. Retourne 0.0 si invalide."""
+    try:
+        num, _, den = (rate or "0/1").partition("/")
+        den = float(den or 1)
+        return float(num) / den if den else 0.0
+    except ValueError:
+        return 0.0
+
+def preprocess_segment_format(encoder_settings):
+    """Format des clips prétraités, au sens de mezzanine.segment_format (paramètres qui définissent le flux vidéo)."""
+    return segment_format(TARGET_WIDTH, TARGET_HEIGHT, encoder_settings, "192k")
+
+def clip_caption_lines(clip, burn_in_text):
+    """Texte incrusté dans un clip prétraité (titre, streamer), ou None sans incrustation."""
+    if not burn_in_text:
+        return None
+    return [clip.title or "Titre inconnu", clip.broadcaster_name or "Streamer inconnu"]
+
+def processed_clip_path(clip_id, encoder_settings, caption_lines):
+    """Chemin du clip prétraité pour ces réglages x264 demandés et ce texte incrusté (voir PROCESSED_CLIP_VERSION)."""
+    key_data = [PROCESSED_CLIP_VERSION, preprocess_segment_format(encoder_settings), caption_lines, CLIP_CAPTION_FONT_SIZE if caption_lines else None]
+    digest = hashlib.sha1(json.dumps(key_data, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(PROCESSED_CLIPS_DIR, f"{clip_id}_processed_{digest}.mp4")
+
+def stream_copy_mismatch(input_path, encoder_settings):
+    """
+    Compare le flux vidéo d'un clip à la sortie de libx264 avec ces réglages (voir encoder_reference_signature).
+    Retourne None si la copie est sans risque pour la concaténation, sinon la raison du réencodage.
+    """
+    reference = encoder_reference_signature(preprocess_segment_format(encoder_settings))
+    if reference is None:
+        return "paramètres de l'encodeur inconnus"
+    signature = probe_video_signature(input_path)
+    if signature is None:
+        return "paramètres du flux inconnus"
+    differences = [key for key in reference if signature.get(key) != reference[key]]
+    if differences:
+        return f"flux H.264 différent de la sortie de l'encodeur ({', '.join(differences)})"
+    return None
+
+def plan_preprocessing(probe, burn_in_text=BURN_IN_CLIP_TEXT, copy_check=None):
+    """
+    Choisit le chemin de prétraitement le moins coûteux pour un clip à partir de son analyse ffprobe.
+
+    Le plan retourné indique si la vidéo peut être copiée telle quelle ("copy") ou doit être
+    réencodée ("encode") avec uniquement les filtres nécessaires, et si l'audio peut être copié
+    ("copy"), seulement rééchantillonné ("resample") ou entièrement réencodé ("encode").
+    copy_check: fonction sans argument appelée avant de retenir la copie vidéo ; retourne None si la copie
+    est permise, sinon la raison du réencodage (voir stream_copy_mismatch). Sans copy_check, pas de copie.
+    """
+    streams = (probe or {}).get("streams", [])
+    video = next((st for st in streams if st.get("codec_type") == "video"), None)
+    audio = next((st for st in streams if st.get("codec_type") == "audio"), None)
+
+    if video is None:
+        # Analyse impossible ou sans flux vidéo : on garde la chaîne complète, comme avant
+        return {
+            "mode": "full",
+            "video": "encode",
+            "video_filters": ["scale", "pad", "setsar", "fps"],
+            "audio": "encode",
+            "reasons": ["analyse ffprobe indisponible"]
+        }
+
+    reasons = []
+    video_filters = []
+    width = int(video.get("width") or 0)
+    height = int(video.get("height") or 0)
+    if (width, height) != (TARGET_WIDTH, TARGET_HEIGHT):
+        video_filters.append("scale")
+        reasons.append(f"résolution {width}x{height}")
+        if width * TARGET_HEIGHT != height * TARGET_WIDTH:
+            video_filters.append("pad")
+            reasons.append("ratio d'aspect différent de 16:9")
+    sar = video.get("sample_aspect_ratio")
+    if video_filters or sar not in (None, "1:1", "0:1", "N/A"):
+        video_filters.append("setsar")
+        if sar not in (None, "1:1", "0:1", "N/A"):
+            reasons.append(f"SAR {sar}")
+
+    r_fps = parse_frame_rate(video.get("r_frame_rate"))
+    avg_fps = parse_frame_rate(video.get("avg_frame_rate"))
+    if abs(r_fps - TARGET_FPS) > 0.01 or (avg_fps and abs(avg_fps - r_fps) > 0.01):
+        video_filters.append("fps")
+        reasons.append(f"{avg_fps or r_fps:.2f} fps")
+
+    codec_ok = video.get("codec_name") == TARGET_VIDEO_CODEC and video.get("pix_fmt") == TARGET_PIX_FMT
+    if not codec_ok:
+        reasons.append(f"vidéo {video.get('codec_name')}/{video.get('pix_fmt')}")
+    if burn_in_text:
+        reasons.append("incrustation du texte")
+
+    video_plan = "encode"
+    if codec_ok and not video_filters and not burn_in_text:
+        mismatch = copy_check() if copy_check is not None else "compatibilité du flux non vérifiée"
+        if mismatch is None:
+            video_plan = "copy"
+        else:
+            reasons.append(mismatch)
+
+    if audio is None:
+        audio_plan = "none"
+        reasons.append("pas de piste audio")
+    elif audio.get("codec_name") != TARGET_AUDIO_CODEC:
+        audio_plan = "encode"
+        reasons.append(f"audio {audio.get('codec_name')}")
+    elif int(audio.get("channels") or 0) != TARGET_AUDIO_CHANNELS or int(audio.get("sample_rate") or 0) != TARGET_AUDIO_SAMPLE_RATE:
+        audio_plan = "resample"
+        reasons.append(f"audio {audio.get('sample_rate')} Hz / {audio.get('channels')} canaux")
+    else:
+        audio_plan = "copy"
+
+    if video_plan == "copy":
+        mode = "copy" if audio_plan in ("copy", "none") else "remux_audio"
+    elif len(video_filters) == 4:
+        mode = "full"
+    else:
+        mode = "targeted"
+
+    return {
+        "mode": mode,
+        "video": video_plan,
+        "video_filters": video_filters,
+        "audio": audio_plan,
+        "reasons": reasons
+    }
+
+def build_video_filters(plan):
+    """Construit la liste des filtres vidéo retenus par le plan."""
+    available_filters = {
+        "scale": f"scale={TARGET_WIDTH}:{TARGET_HEIGHT}:force_original_aspect_ratio=decrease",
+        "pad": f"pad={TARGET_WIDTH}:{TARGET_HEIGHT}:(ow-iw)/2:(oh-ih)/2",
+        "setsar": "setsar=1",
+        "fps": f"fps={TARGET_FPS}"
+    }
+    return [available_filters[name] for name in plan["video_filters"]]
+
+def build_preprocess_command(input_path, output_path, plan, caption_path=None, encoder_settings=None):
+    """
+    Construit la commande FFmpeg de prétraitement correspondant au plan.
+    caption_path: image RGBA (titre + streamer) incrustée par un overlay, ou None.
+    encoder_settings: réglages x264 {"preset", "crf", "tune", "threads"} (utilisés seulement si la vidéo est réencodée).
+    """
+    if encoder_settings is None:
+        encoder_settings = {"preset": DEFAULT_PRESET, "crf": DEFAULT_CRF}
+    command = ["ffmpeg", "-i", input_path]
+
+    if plan["video"] == "copy":
+        command.extend(["-c:v", "copy"])
+    else:
+        video_filters = build_video_filters(plan)
+        if caption_path:
+            command.extend(["-i", caption_path])
+            command.extend([
+                "-filter_complex",
+                f"[0:v]{','.join(video_filters) or 'null'}[base];[base][1:v]overlay=x=0:y={CLIP_CAPTION_Y}:format=auto[v]",
+                "-map", "[v]",
+                "-map", "0:a?"
+            ])
+        elif video_filters:
+            command.extend(["-vf", ",".join(video_filters)])
+        command.extend(x264_arguments(encoder_settings))
+        command.extend(["-pix_fmt", TARGET_PIX_FMT])
+    # Même base de temps que les segments d'habillage et la référence de l'encodeur (voir mezzanine.py)
+    command.extend(["-video_track_timescale", str(SEGMENT_TIMESCALE)])
+
+    if plan["audio"] == "copy":
+        command.extend(["-c:a", "copy"])
+    elif plan["audio"] != "none":
+        command.extend([
+            "-c:a", "aac",
+            "-b:a", "192k",
+            "-ac", str(TARGET_AUDIO_CHANNELS),
+            "-ar", str(TARGET_AUDIO_SAMPLE_RATE)
+        ])
+
+    command.extend(["-loglevel", "error", "-y", output_path])
+    return command
+
+def summarize_preprocess_plans(plans):
+    """
+    Affiche la répartition des plans et estime le temps d'encodage économisé.
+    L'estimation se base sur la vitesse mesurée des clips ayant suivi la chaîne complète dans ce lot.
+    """
+    if not plans:
+        return None
+
+    counts = {}
+    for plan in plans:
+        counts[plan["mode"]] = counts.get(plan["mode"], 0) + 1
+
+    full_plans = [p for p in plans if p["mode"] == "full" and p.get("media_seconds", 0) > 0]
+    full_cost_per_second = None
+    if full_plans:
+        full_cost_per_second = sum(p["encode_seconds"] for p in full_plans) / sum(p["media_seconds"] for p in full_plans)
+
+    estimated_saved_seconds = None
+    if full_cost_per_second is not None:
+        estimated_saved_seconds = sum(
+            max(0.0, p["media_seconds"] * full_cost_per_second - p["encode_seconds"])
+            for p in plans if p["mode"] != "full"
+        )
+
+    print("\n--- Plans de prétraitement ---")
+    for mode, count in sorted(counts.items()):
+        print(f"  {mode}: {count} clip(s)")
+    print(f"  Temps total de prétraitement: {sum(p['encode_seconds'] for p in plans):.1f}s")
+    if estimated_saved_seconds is not None:
+        print(f"  Temps d'encodage économisé (estimation): {estimated_saved_seconds:.1f}s")
+    else:
+        print("  Temps économisé non estimable (aucun clip en chaîne complète dans ce lot pour servir de référence).")
+
+    return {
+        "counts": counts,
+        "full_encode_seconds_per_media_second": full_cost_per_second,
+        "estimated_saved_seconds": estimated_saved_seconds
+    }
+
+def clip_artifacts(info):
+    """Fichiers produits pour un clip traité et leur classe d'artefact (voir workspace.py)."""
+    return [(info.path, "processed_clips"), (info.first_frame_path, "clip_frames"), (info.best_frame_path, "clip_frames")]
+
+def process_clip(clip, rank, total, scheduler=None, encoder_profile=None, workspace=None, burn_in_text=BURN_IN_CLIP_TEXT):
+    """
+    Télécharge, prétraite et extrait la première frame d'un clip.
+    scheduler: EncodeScheduler qui choisit le preset/CRF selon l'échéance de publication (optionnel).
+    encoder_profile: réglages x264 recommandés par encoder_benchmark.py (optionnel).
+    workspace: Workspace qui supprime le clip brut dès qu'il n'est plus utile (optionnel).
+    burn_in_text: incruste le titre et le streamer dans le clip (voir BURN_IN_CLIP_TEXT).
+    Retourne (infos du clip traité, plan de prétraitement), ou (None, None) en cas d'échec.
+    """
+    clip_url = clip.url
+
+    clip_id = clip.id or f"unknown_id_{rank}"
+    clip_title_raw = clip.title or "Titre inconnu"
+    broadcaster_name_raw = clip.broadcaster_name or "Streamer inconnu"
+
+    encoder_settings = {"preset": DEFAULT_PRESET, "crf": DEFAULT_CRF}
+    encoder_settings.update(encoder_profile or {})
+    caption_lines = clip_caption_lines(clip, burn_in_text)
+
+    raw_output_filename = os.path.join(RAW_CLIPS_DIR, f"{clip_id}_raw.mp4")
+    processed_output_filename = processed_clip_path(clip_id, encoder_settings, caption_lines)
+    first_frame_output_path = os.path.join(CLIP_FRAMES_DIR, f"{clip_id}_first_frame.jpg") # Chemin de la frame
+    best_frame_output_path = os.path.join(CLIP_FRAMES_DIR, f"{clip_id}_best_frame.jpg") # Meilleure frame pour la miniature
+
+    # Clip déjà traité pour une autre cible (ou une exécution précédente), mêmes réglages et même texte : réutilisé tel quel
+    if os.path.exists(processed_output_filename) and os.path.exists(first_frame_output_path):
+        actual_duration = probe_duration(processed_output_filename)
+        if actual_duration > 0:
+            print(f"♻️ Clip {rank+1}/{total} déjà prétraité, réutilisé: {processed_output_filename} ({actual_duration:.2f}s)")
+            plan = {"mode": "cached", "video": "none", "video_filters": [], "audio": "none", "reasons": ["clip déjà prétraité"],
+                    "encode_seconds": 0.0, "id": clip_id, "media_seconds": actual_duration}
+            return ProcessedClip(
+                clip_id,
+                processed_output_filename,
+                actual_duration,
+                title=clip_title_raw,
+                broadcaster_name=broadcaster_name_raw,
+                first_frame_path=first_frame_output_path,
+                best_frame_path=best_frame_output_path if os.path.exists(best_frame_output_path) else None,
+                preprocess_plan=plan["mode"]
+            ), plan
+
+    print(f"Téléchargement du clip {rank+1}/{total}: {clip_title_raw} par {broadcaster_name_raw} (ID: {clip_id})...")
+    clip_start = time.monotonic()
+    try:
+        # 1. Téléchargement avec yt-dlp
+        yt_dlp_command = [
+            "yt-dlp",
+            "--output", raw_output_filename,
+            "--format", "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best",
+            clip_url
+        ]
+        subprocess.run(yt_dlp_command, check=True)
+        download_seconds = time.monotonic() - clip_start
+        print(f"  ✅ Clip téléchargé: {raw_output_filename}")
+        if workspace is not None:
+            workspace.register(raw_output_filename, "raw_clips", ["preprocess"])
+
+        # 2. Prétraitement avec FFmpeg : analyse du clip brut puis choix du chemin le moins coûteux
+        raw_probe = probe_media(raw_output_filename)
+        plan = plan_preprocessing(raw_probe, burn_in_text=bool(caption_lines), copy_check=lambda: stream_copy_mismatch(raw_output_filename, encoder_settings))
+        raw_bytes = os.path.getsize(raw_output_filename)
+        raw_video = next((st for st in (raw_probe or {}).get("streams", []) if st.get("codec_type") == "video"), {})
+        raw_duration = float((raw_probe or {}).get("format", {}).get("duration") or clip.duration or 0.0)
+        print(f"  Prétraitement du clip {rank+1}/{total}: {clip_title_raw} (plan: {plan['mode']}, vidéo: {plan['video']}, audio: {plan['audio']})...")
+
+        caption_path = None
+        if caption_lines:
+            # Titre et streamer rendus une seule fois en image (cache partagé avec les légendes de compile_video.py)
+            caption_path = render_caption(
+                caption_lines,
+                TARGET_WIDTH,
+                caption_strip_height(CLIP_CAPTION_FONT_SIZE, 2),
+                CLIP_CAPTION_FONT_SIZE,
+                style="outline"
+            )
+
+        if scheduler is not None and plan["video"] == "encode":
+            encoder_settings.update(scheduler.choose("preprocess"))
+        plan.update(encoder_settings)
+
+        ffmpeg_preprocess_command = build_preprocess_command(
+            raw_output_filename, processed_output_filename, plan, caption_path, encoder_settings
+        )
+        preprocess_start = time.monotonic()
+        subprocess.run(ffmpeg_preprocess_command, check=True, capture_output=True, text=True)
+        plan["encode_seconds"] = round(time.monotonic() - preprocess_start, 3)
+        print(f"  ✅ Clip prétraité ({plan['mode']}, {plan['encode_seconds']:.1f}s): {processed_output_filename}")
+
+        # --- NOUVEAU : Extraire la première frame du clip traité ---
+        print(f"  Extraction de la première frame pour {clip_id}...")
+        ffmpeg_extract_frame_command = [
+            "ffmpeg",
+            "-i", processed_output_filename,
+            "-vframes", "1",
+            "-q:v", "2", # Qualité de sortie (1-31, 1 est le meilleur)
+            "-y",
+            first_frame_output_path
+        ]
+        subprocess.run(ffmpeg_extract_frame_command, check=True, capture_output=True, text=True)
+        print(f"  ✅ Première frame extraite: {first_frame_output_path}")
+        # --- FIN NOUVEAU ---
+
+        # Meilleure frame pour la miniature : choisie parmi les images clés du clip brut (sans texte incrusté),
+        # décodées à basse résolution ; seule la frame gagnante est extraite en pleine résolution
+        best_frame_time = select_best_frame(raw_output_filename, best_frame_output_path)
+        if best_frame_time is not None:
+            print(f"  ✅ Meilleure frame extraite ({best_frame_time:.2f}s): {best_frame_output_path}")
+
+        actual_duration = probe_duration(processed_output_filename)
+        print(f"  Durée réelle du clip traité: {actual_duration:.2f} secondes.")
+
+        plan["id"] = clip_id
+        plan["media_seconds"] = actual_duration
+        if scheduler is not None and plan["video"] == "encode":
+            scheduler.record("preprocess", plan["preset"], plan["crf"], actual_duration, plan["encode_seconds"])
+        # Mesures du modèle de coût utilisé par --plan (voir cost_model.py)
+        measurements = {
+            "download_bytes_per_second": raw_bytes / download_seconds if download_seconds > 0 else 0,
+            "clip_overhead_seconds": time.monotonic() - clip_start - download_seconds - plan["encode_seconds"]
+        }
+        if actual_duration > 0:
+            measurements["processed_bytes_per_media_second"] = os.path.getsize(processed_output_filename) / actual_duration
+        if raw_video.get("height") and raw_duration > 0:
+            measurements[source_cost_key(raw_video["height"])] = raw_bytes / raw_duration
+        record_costs(measurements)
+
+        if actual_duration <= 0:
+            print(f"  ❌ Durée invalide pour le clip {clip_id}, il sera remplacé par le candidat suivant.")
+            return None, None
+
+        return ProcessedClip(
+            clip_id,
+            processed_output_filename,
+            actual_duration,
+            title=clip_title_raw,
+            broadcaster_name=broadcaster_name_raw,
+            first_frame_path=first_frame_output_path, # Ajoute le chemin de la frame
+            best_frame_path=best_frame_output_path if best_frame_time is not None else None,
+            best_frame_time=best_frame_time,
+            preprocess_plan=plan["mode"]
+        ), plan
+
+    except subprocess.CalledProcessError as e:
+        print(f"  ❌ Erreur lors du traitement du clip {clip_url} (téléchargement ou prétraitement/extraction frame): {e}")
+        if e.stdout: print(f"    STDOUT: {e.stdout}")
+        if e.stderr: print(f"    STDERR: {e.stderr}")
+    except Exception as e:
+        print(f"  ❌ Erreur inattendue lors du traitement du clip {clip_url}: {e}")
+    finally:
+        # Le clip brut n'est plus utile après le prétraitement et le choix de la meilleure frame (ou après un échec)
+        if workspace is not None:
+            workspace.release(raw_output_filename, "preprocess")
+    return None, None
+
+def load_candidate_clips(data_dir=DATA_DIR):
+    """
+    Charge la liste classée des candidats : candidate_clips.json (sélection suivie des clips de remplacement)
+    si get_top_clips.py l'a écrite, sinon top_clips.json. Retourne None si aucun fichier n'existe.
+    """
+    for filename in (CANDIDATE_CLIPS_FILENAME, INPUT_CLIPS_FILENAME):
+        path = os.path.join(data_dir, filename)
+        if os.path.exists(path):
+            print(f"📄 Candidats lus depuis {path}")
+            return load_clips(path, Clip)
+    return None
+
+def follow_candidate_stream(data_dir, submit, target_duration_seconds, timeout_seconds=CANDIDATE_STREAM_TIMEOUT_SECONDS, producer_pid=None):
+    """
+    Suit le flux des candidats (candidate_clips.jsonl) pendant que get_top_clips.py collecte encore les clips.
+    Chaque clip provisoire est lancé aussitôt via submit(clip, numéro), jusqu'à target_duration_seconds de clips.
+    producer_pid: PID de get_top_clips.py, pour ne pas attendre un processus déjà terminé (voir ClipStreamReader).
+    Retourne (liste définitive des candidats, ou None si le flux a échoué ou n'est pas terminé ;
+    {ID: future des clips provisoires lancés}).
+    """
+    path = stream_path(os.path.join(data_dir, CANDIDATE_CLIPS_FILENAME))
+    print(f"📡 Lecture du flux des candidats {path} (jusqu'à {timeout_seconds / 60:.0f} min d'attente)...")
+    reader = ClipStreamReader(path, Clip, producer_pid=producer_pid)
+    prefetched = {}
+    prefetched_seconds = 0.0
+
+    def on_event(event, clip):
+        nonlocal prefetched_seconds
+        if event != "provisional" or clip.id in prefetched or prefetched_seconds >= target_duration_seconds:
+            return
+        print(f"  ⚡ Clip provisoire lancé avant la fin de la sélection : '{clip.title}' par {clip.broadcaster_name}.")
+        prefetched[clip.id] = submit(clip, len(prefetched))
+        prefetched_seconds += clip.duration
+
+    candidates = reader.wait(timeout_seconds, on_event)
+    if candidates is None:
+        print(f"❌ Flux des candidats {'en échec' if reader.complete else 'incomplet'} : {path}")
+    else:
+        print(f"📄 {len(candidates)} candidats définitifs lus depuis {path} ({len(prefetched)} clip(s) provisoire(s) déjà lancé(s)).")
+    return candidates, prefetched
+
+def download_clips(candidates=None, target_duration_seconds=TARGET_VIDEO_DURATION_SECONDS, max_clips=MAX_TOTAL_CLIPS, data_dir=DATA_DIR, follow=False,
+                   producer_pid=None, runtime_budget_seconds=None, burn_in_text=BURN_IN_CLIP_TEXT):
+    """
+    Télécharge et prétraite les candidats dans l'ordre de leur classement, jusqu'à ce que la durée réelle
+    cumulée atteigne target_duration_seconds (avec au moins MIN_CLIPS clips) ou que max_clips soit atteint.
+
+    SPECULATIVE_DOWNLOADS clips supplémentaires sont traités en parallèle par anticipation : si un clip
+    échoue, le candidat suivant est déjà en cours et le remplace sans rallonger la durée du job.
+
+    follow: les candidats sont lus dans le flux de get_top_clips.py pendant la collecte (voir follow_candidate_stream) ;
+    les clips provisoires sont téléchargés avant que la liste définitive ne soit connue. Le coût prévu est
+    alors estimé sur la liste définitive avant les autres téléchargements (voir plan_download), réduit
+    si besoin à runtime_budget_seconds ; producer_pid : voir follow_candidate_stream.
+
+    burn_in_text: incruste le titre et le streamer dans chaque clip (voir BURN_IN_CLIP_TEXT).
+    data_dir est le dossier de données de la cible ; les clips prétraités sont partagés entre cibles.
+    Les clips validés sont aussi publiés un par un dans downloaded_clip_paths.jsonl (voir ClipStreamWriter).
+    """
+    downloaded_clip_paths_json = os.path.join(data_dir, DOWNLOADED_CLIP_PATHS_FILENAME)
+    preprocess_plans_json = os.path.join(data_dir, PREPROCESS_PLANS_FILENAME)
+    print("📥 Démarrage du téléchargement et du prétraitement des clips Twitch individuels...")
+    os.makedirs(RAW_CLIPS_DIR, exist_ok=True)
+    os.makedirs(PROCESSED_CLIPS_DIR, exist_ok=True) # Create the new processed clips directory
+    os.makedirs(CLIP_FRAMES_DIR, exist_ok=True) # Créer le nouveau dossier pour les frames
+
+    os.makedirs(data_dir, exist_ok=True)
+    downloaded_stream = ClipStreamWriter(stream_path(downloaded_clip_paths_json))
+
+    # Fichiers intermédiaires suivis : le clip brut est supprimé après son prétraitement, les clips validés
+    # et leurs frames restent réservés à compile_video.py et generate_thumbnail.py
+    workspace = Workspace()
+
+    # Ordonnanceur du prétraitement : travail restant = clips à prétraiter + passe finale de compile_video.py (réglages fixes)
+    encoder_profile = load_encoder_profile("preprocess")
+    scheduler = EncodeScheduler(encoder_profile.get("preset", DEFAULT_PRESET), encoder_profile.get("crf", DEFAULT_CRF))
+    scheduler.set_remaining("preprocess", target_duration_seconds)
+    compile_profiles = compile_encoder_profiles()
+    scheduler.set_remaining("compile", compile_media_seconds(0.0, target_duration_seconds, compile_profiles), settings=compile_profiles[0])
+
+    executor = ThreadPoolExecutor(max_workers=1 + SPECULATIVE_DOWNLOADS)
+    prefetched = {} # ID -> future des clips provisoires lancés avant la liste définitive
+    if candidates is None and follow:
+        candidates, prefetched = follow_candidate_stream(
+            data_dir,
+            lambda clip, number: executor.submit(process_clip, clip, number, "?", scheduler, encoder_profile, workspace, burn_in_text),
+            target_duration_seconds,
+            producer_pid=producer_pid
+        )
+    elif candidates is None:
+        candidates = load_candidate_clips(data_dir)
+
+    def keep_for_other_targets(infos):
+        """Clips traités mais non validés : conservés pour une autre cible, supprimables si le budget l'exige."""
+        for info in infos:
+            if info is None:
+                continue
+            for path, artifact_class in clip_artifacts(info):
+                workspace.register(path, artifact_class)
+                workspace.release(path, "download", keep=True)
+
+    def discard_prefetched():
+        executor.shutdown(wait=True, cancel_futures=True)
+        keep_for_other_targets(future.result()[0] for future in prefetched.values() if not future.cancelled())
+
+    if candidates is None:
+        print(f"❌ Fichier des clips '{os.path.join(data_dir, INPUT_CLIPS_FILENAME)}' introuvable.")
+        discard_prefetched()
+        # Écrire un fichier JSON vide pour downloaded_clip_paths.json
+        with open(downloaded_clip_paths_json, "w") as f:
+            json.dump([], f)
+        downloaded_stream.complete("failed")
+        sys.exit(1)
+
+    clips = candidates
+
+    # Clips provisoires écartés de la liste définitive : annulés s'ils n'ont pas encore démarré
+    candidate_ids = {clip.id for clip in clips}
+    for clip_id in [clip_id for clip_id in prefetched if clip_id not in candidate_ids]:
+        if prefetched[clip_id].cancel():
+            del prefetched[clip_id]
+
+    # --- DÉBOGAGE : Aperçu des candidats ---
+    if clips:
+        print("\n--- Aperçu des candidats lus dans download_clips.py ---")
+        for i, clip_data in enumerate(clips[:3]): # Affiche les 3 premiers clips pour vérification
+            print(f"Clip {i+1}:")
+            print(f"  ID: {clip_data.id}")
+            print(f"  Title: {clip_data.title}")
+            print(f"  Broadcaster Name: {clip_data.broadcaster_name}")
+            print(f"  URL: {clip_data.url}")
+        print("----------------------------------------------------------------------\n")
+    # --- FIN DÉBOGAGE ---
+
+    if not clips:
+        print("⚠️ Aucun clip à télécharger. La liste des clips est vide.")
+        discard_prefetched()
+        with open(downloaded_clip_paths_json, "w") as f:
+            json.dump([], f)
+        downloaded_stream.complete()
+        return
+
+    # --follow : coût prévu dès que la liste définitive est connue, avant de lancer les clips non provisoires
+    # (la sélection est réduite si elle dépasse runtime_budget_seconds, comme avec --runtime-budget sans --follow)
+    if follow:
+        target_duration_seconds, max_clips = plan_download(clips, runtime_budget_seconds, burn_in_text)
+        scheduler.set_remaining("preprocess", target_duration_seconds)
+        scheduler.set_remaining("compile", compile_media_seconds(0.0, target_duration_seconds, compile_profiles), settings=compile_profiles[0])
+
+    print(f"🎯 Objectif: {target_duration_seconds}s de clips réels (max {max_clips} clips), {len(clips)} candidats classés, {SPECULATIVE_DOWNLOADS} téléchargement(s) anticipé(s).")
+
+    downloaded_and_processed_info = [] # ProcessedClip (chemin, ID et durée réelle) des clips acceptés
+    preprocess_plans = [] # Plan choisi pour chaque clip (et temps passé), pour mesurer le gain
+    accepted_duration = 0.0
+
+    def target_reached():
+        if len(downloaded_and_processed_info) >= max_clips:
+            return True
+        return accepted_duration >= target_duration_seconds and len(downloaded_and_processed_info) >= MIN_CLIPS
+
+    results = {} # rang -> (infos, plan) des clips terminés mais pas encore validés
+    in_flight = {} # future -> rang
+    next_rank = 0 # prochain candidat à lancer
+    next_to_accept = 0 # prochain rang à valider (les clips sont validés dans l'ordre du classement)
+    failed_clips = 0
+
+    try:
+        while not target_reached():
+            # Le candidat attendu + au plus SPECULATIVE_DOWNLOADS candidats suivants (lancés ou terminés mais pas encore validés)
+            while next_rank - next_to_accept < 1 + SPECULATIVE_DOWNLOADS and next_rank < len(clips):
+                # Un clip provisoire déjà lancé pendant la collecte est repris tel quel
+                future = prefetched.pop(clips[next_rank].id, None) or executor.submit(
+                    process_clip, clips[next_rank], next_rank, len(clips), scheduler, encoder_profile, workspace, burn_in_text
+                )
+                in_flight[future] = next_rank
+                next_rank += 1
+
+            if not in_flight:
+                break # Plus aucun candidat disponible
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                info, plan = future.result()
+                if info is not None:
+                    # Réservé jusqu'à la décision de validation, pour ne pas être supprimé par le budget disque
+                    for path, artifact_class in clip_artifacts(info):
+                        workspace.register(path, artifact_class, ["download"])
+                results[in_flight.pop(future)] = (info, plan)
+
+            # Valide les clips terminés dans l'ordre du classement
+            while next_to_accept in results and not target_reached():
+                info, plan = results.pop(next_to_accept)
+                if info is None:
+                    failed_clips += 1
+                    print(f"  🔁 Candidat n°{next_to_accept+1} en échec, remplacé par le candidat suivant.")
+                else:
+                    downloaded_and_processed_info.append(info)
+                    preprocess_plans.append(plan)
+                    for path, artifact_class in clip_artifacts(info):
+                        workspace.register(path, artifact_class, ["compile" if artifact_class == "processed_clips" else "thumbnail"])
+                        workspace.release(path, "download")
+                    accepted_duration += info.duration
+                    downloaded_stream.append(info)
+                    scheduler.set_remaining("preprocess", target_duration_seconds - accepted_duration)
+                    print(f"  ➕ Clip validé ({len(downloaded_and_processed_info)}/{max_clips}), durée réelle cumulée: {accepted_duration:.1f}s/{target_duration_seconds}s.")
+                next_to_accept += 1
+    finally:
+        # Les candidats pas encore démarrés sont annulés ; ceux déjà lancés se terminent
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    # Clips traités par anticipation (ou provisoires) mais non validés
+    unused_futures = [future for future in list(in_flight) + list(prefetched.values()) if not future.cancelled()]
+    keep_for_other_targets([info for info, _ in results.values()] + [future.result()[0] for future in unused_futures])
+
+    unused = len(results) + len(unused_futures)
+    if unused:
+        print(f"ℹ️ {unused} clip(s) téléchargé(s) par anticipation non utilisé(s) : l'objectif était déjà atteint.")
+    if failed_clips:
+        print(f"ℹ️ {failed_clips} clip(s) en échec remplacé(s) par les candidats suivants.")
+    if not target_reached():
+        print(f"⚠️ ATTENTION: Candidats épuisés. Durée réelle cumulée: {accepted_duration:.1f}s (objectif {target_duration_seconds}s).")
+
+    save_clips(downloaded_clip_paths_json, downloaded_and_processed_info)
+    downloaded_stream.complete()
+
+    plans_summary = summarize_preprocess_plans(preprocess_plans)
+    with open(preprocess_plans_json, "w", encoding="utf-8") as f:
+        json.dump({"summary": plans_summary, "clips": preprocess_plans}, f, ensure_ascii=False, indent=2)
+
+    print(f"✅ Téléchargement et prétraitement des clips terminé : {len(downloaded_and_processed_info)} clips, {accepted_duration:.1f}s.")
+    workspace.report()
+
+def compile_encoder_profiles():
+    """Rendus produits par défaut par compile_video.py (ACTIVE_OUTPUT_PROFILES), réglages du benchmark compris."""
+    from compile_video import OUTPUT_PROFILES, ACTIVE_OUTPUT_PROFILES
+
+    encoder_profile = load_encoder_profile("compile")
+    return [dict(OUTPUT_PROFILES[name], **encoder_profile) for name in ACTIVE_OUTPUT_PROFILES]
+
+def plan_download(candidates, runtime_budget_seconds=None, burn_in_text=BURN_IN_CLIP_TEXT):
+    """
+    Estime le coût de l'exécution (téléchargement, prétraitement, compilation, upload) pour les clips que
+    download_clips() prendrait, à partir des coûts mesurés lors des exécutions précédentes.
+    Si runtime_budget_seconds est donné, la sélection est réduite pour tenir dans ce budget.
+    burn_in_text: incrustation du texte, qui fait partie de l'identité des clips déjà prétraités (voir processed_clip_path).
+    Retourne (durée cible, nombre maximal de clips) à passer à download_clips().
+    """
+    preprocess_settings = dict({"preset": DEFAULT_PRESET, "crf": DEFAULT_CRF}, **load_encoder_profile("preprocess"))
+    compile_profiles = compile_encoder_profiles()
+    cached_ids = {
+        clip.id for clip in candidates
+        if os.path.exists(processed_clip_path(clip.id, preprocess_settings, clip_caption_lines(clip, burn_in_text)))
+    }
+
+    def estimate(clips):
+        return estimate_run(clips, preprocess_settings, compile_profiles, 1 + SPECULATIVE_DOWNLOADS, cached_ids)
+
+    selected = select_like_download(candidates, TARGET_VIDEO_DURATION_SECONDS, MAX_TOTAL_CLIPS, MIN_CLIPS)
+    plan = estimate(selected)
+    print_plan(plan, runtime_budget_seconds)
+    if runtime_budget_seconds is None or plan["total_seconds"] <= runtime_budget_seconds:
+        return TARGET_VIDEO_DURATION_SECONDS, MAX_TOTAL_CLIPS
+
+    kept, plan = trim_to_budget(selected, runtime_budget_seconds, MIN_CLIPS, estimate)
+    print(f"\n✂️ Sélection réduite à {len(kept)}/{len(selected)} clips pour tenir dans le budget :")
+    print_plan(plan, runtime_budget_seconds)
+    return sum(clip.duration for clip in kept), len(kept)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Télécharge et prétraite les clips sélectionnés par get_top_clips.py.")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="Dossier de données de la cible (par défaut celui de cli.py --target, voir COMPILATION_TARGETS).")
+    parser.add_argument("--plan", action="store_true",
+                        help="Affiche le coût prévu (durée par étape, disque, upload) sans rien télécharger ni encoder.")
+    parser.add_argument("--runtime-budget", type=float, metavar="MINUTES",
+                        help="Réduit la sélection pour que l'exécution prévue tienne dans ce budget.")
+    parser.add_argument("--follow", action="store_true",
+                        help="Lit les candidats au fur et à mesure dans le flux de get_top_clips.py (lancé en parallèle avec le même "
+                             f"{STREAM_TOKEN_ENV_VAR}) ; le coût prévu est affiché dès que la liste définitive est connue.")
+    parser.add_argument("--producer-pid", type=int, metavar="PID",
+                        help="Avec --follow : PID de get_top_clips.py, pour arrêter l'attente s'il se termine sans écrire le flux.")
+    parser.add_argument("--burn-in-text", action=argparse.BooleanOptionalAction, default=BURN_IN_CLIP_TEXT,
+                        help="Incruste le titre et le streamer dans chaque clip (réencodage obligatoire, pas de copie du flux vidéo).")
+    args = parser.parse_args(argv)
+    if args.follow and args.plan:
+        parser.error("--follow ne peut pas être combiné avec --plan, qui a besoin de la liste complète.")
+    if args.follow and not os.getenv(STREAM_TOKEN_ENV_VAR):
+        parser.error(f"--follow a besoin de {STREAM_TOKEN_ENV_VAR}, défini aussi pour get_top_clips.py, pour ne pas lire le flux d'une exécution précédente.")
+    budget_seconds = args.runtime_budget * 60 if args.runtime_budget is not None else None
+
+    target_duration_seconds, max_clips = TARGET_VIDEO_DURATION_SECONDS, MAX_TOTAL_CLIPS
+    candidates = None
+    if not args.follow and (args.plan or budget_seconds is not None):
+        candidates = load_candidate_clips(args.data_dir)
+        if candidates is None:
+            print(f"❌ Fichier des clips '{os.path.join(args.data_dir, INPUT_CLIPS_FILENAME)}' introuvable.")
+            sys.exit(1)
+        target_duration_seconds, max_clips = plan_download(candidates, budget_seconds, args.burn_in_text)
+        if args.plan:
+            return
+    download_clips(candidates, target_duration_seconds, max_clips, data_dir=args.data_dir, follow=args.follow,
+                   producer_pid=args.producer_pid, runtime_budget_seconds=budget_seconds, burn_in_text=args.burn_in_text)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+import os
+import json
+import threading
+from datetime import datetime, timezone
+
+from cost_model import PIPELINE_COSTS_JSON, load_costs, record_costs, encode_cost_key, encode_seconds_per_media_second
+
+# --- Chemins des fichiers ---
+# Réglages x264 recommandés par encoder_benchmark.py, par étape ("preprocess", "compile")
+ENCODER_PROFILE_JSON = os.path.join("config", "encoder_profile.json")
+ENCODER_SETTING_KEYS = ("preset", "crf", "tune", "threads")
+
+# --- PARAMÈTRES DE L'ORDONNANCEUR ---
+# Échéance de publication : variable d'environnement PUBLISH_DEADLINE, au format ISO 8601
+# ("2026-10-19T16:45:00Z") ou "HH:MM" (UTC, aujourd'hui). Sans échéance, les réglages par défaut sont utilisés.
+DEADLINE_ENV_VAR = "PUBLISH_DEADLINE"
+# Temps réservé après les encodages (métadonnées, miniature, upload YouTube)
+RESERVED_SECONDS_AFTER_ENCODING = 10 * 60
+# Marge de sécurité appliquée au temps restant avant l'échéance
+SAFETY_MARGIN = 0.15
+
+# Réglages x264 essayés pour les encodages ajustables à l'échéance, du plus rapide au meilleur rapport qualité/taille
+# (coût relatif de chacun : voir ENCODE_PRESET_FACTORS dans cost_model.py). Le preset et le CRF changent tous deux les
+# en-têtes vidéo (le preset le SPS : références, B-frames ; le CRF le pic_init_qp du PPS). Seul le prétraitement est
+# donc ajusté, sa sortie étant de toute façon réencodée par compile_video.py ; les rendus de compile_video.py, assemblés
+# sans réencodage, gardent les réglages fixes de leur profil (voir EncodeScheduler.set_remaining).
+QUALITY_LADDER = [
+    {"preset": "ultrafast", "crf": 23},
+    {"preset": "superfast", "crf": 23},
+    {"preset": "veryfast", "crf": 23},
+    {"preset": "faster", "crf": 23},
+    {"preset": "fast", "crf": 23},
+    {"preset": "medium", "crf": 23},
+    {"preset": "medium", "crf": 21},
+    {"preset": "slow", "crf": 21},
+    {"preset": "slow", "crf": 20}
+]
+
+def load_encoder_profile(stage, path=ENCODER_PROFILE_JSON):
+    """
+    Retourne les réglages x264 recommandés pour une étape ({"preset", "crf", "tune", "threads"}),
+    ou {} si aucun benchmark n'a été enregistré : les valeurs par défaut des scripts s'appliquent alors.
+    """
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            settings = json.load(f).get(stage, {})
+    except (IOError, json.JSONDecodeError) as e:
+        print(f"⚠️ Profil d'encodage '{path}' illisible ({e}). Réglages par défaut utilisés.")
+        return {}
+    return {key: settings[key] for key in ENCODER_SETTING_KEYS if settings.get(key) is not None}
+
+def x264_arguments(settings):
+    """
+    Arguments FFmpeg de l'encodeur libx264 pour des réglages {"preset", "crf", "tune", "threads", "stitchable"}.
+    stitchable: en-têtes (SPS/PPS) indépendants du CRF, pour des fichiers destinés à être concaténés sans réencodage.
+    """
+    arguments = ["-c:v", "libx264", "-preset", settings["preset"], "-crf", str(settings["crf"])]
+    if settings.get("tune"):
+        arguments.extend(["-tune", settings["tune"]])
+    if settings.get("stitchable"):
+        arguments.extend(["-x264-params", "stitchable=1"])
+    if settings.get("threads"):
+        arguments.extend(["-threads", str(settings["threads"])])
+    return arguments
+
+def parse_deadline(value):
+    """Convertit PUBLISH_DEADLINE en datetime UTC. Retourne None si la valeur est absente ou invalide."""
+    if not value:
+        return None
+    try:
+        if len(value) <= 5 and ":" in value:
+            hours, minutes = (int(part) for part in value.split(":"))
+            now = datetime.now(timezone.utc)
+            return now.replace(hour=hours, minute=minutes, second=0, microsecond=0)
+        deadline = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        return deadline if deadline.tzinfo else deadline.replace(tzinfo=timezone.utc)
+    except ValueError:
+        print(f"⚠️ {DEADLINE_ENV_VAR} invalide ('{value}'). Les presets par défaut seront utilisés.")
+        return None
+
+class EncodeScheduler:
+    """
+    Choisit le preset et le CRF x264 des encodages ajustables (prétraitement) pour finir avant l'échéance de
+    publication avec la meilleure qualité possible (voir QUALITY_LADDER). Le travail restant (secondes de vidéo par
+    type de tâche, y compris celles encodées avec des réglages fixes) est estimé à partir des temps d'encodage
+    mesurés par cost_model.py, et le choix est réévalué avant chaque encodage.
+    """
+
+    def __init__(self, default_preset, default_crf, deadline=None, costs_path=PIPELINE_COSTS_JSON):
+        self.default = {"preset": default_preset, "crf": default_crf}
+        self.deadline = deadline if deadline is not None else parse_deadline(os.getenv(DEADLINE_ENV_VAR))
+        self.costs_path = costs_path
+        self.remaining_media_seconds = {} # type de tâche -> secondes de vidéo restant à encoder
+        self.fixed_settings = {} # type de tâche -> {"preset", "crf"} jamais ajustés
+        self.lock = threading.Lock()
+        self.costs = load_costs(costs_path)
+
+    def set_remaining(self, kind, media_seconds, settings=None):
+        """
+        Met à jour le travail restant pour un type de tâche ("preprocess" ou "compile").
+        settings: réglages x264 fixes de ce type de tâche ({"preset", "crf"}, ex. le premier rendu de compile_video.py) ;
+        sans réglages fixes, le type de tâche est ajusté selon QUALITY_LADDER.
+        """
+        with self.lock:
+            self.remaining_media_seconds[kind] = max(0.0, media_seconds)
+            if settings is not None:
+                self.fixed_settings[kind] = {"preset": settings["preset"], "crf": settings["crf"]}
+
+    def predicted_seconds(self, step):
+        """
+        Durée prévue du travail restant si les encodages ajustables utilisent ce réglage ({"preset", "crf"}). Les
+        encodages simultanés se partagent les mêmes cœurs : le temps mesuré par seconde de vidéo n'est pas divisé
+        par le nombre d'encodages en cours.
+        """
+        return sum(
+            media_seconds * encode_seconds_per_media_second(self.costs, kind, self.fixed_settings.get(kind, step))
+            for kind, media_seconds in self.remaining_media_seconds.items()
+        )
+
+    def choose(self, kind):
+        """Retourne {"preset", "crf"} pour le prochain encodage de ce type (ses réglages fixes s'il en a)."""
+        with self.lock:
+            if kind in self.fixed_settings:
+                return dict(self.fixed_settings[kind])
+            if self.deadline is None:
+                return dict(self.default)
+
+            time_left = (self.deadline - datetime.now(timezone.utc)).total_seconds() - RESERVED_SECONDS_AFTER_ENCODING
+            budget = time_left * (1 - SAFETY_MARGIN)
+            chosen = QUALITY_LADDER[0]
+            for step in QUALITY_LADDER:
+                if self.predicted_seconds(step) <= budget:
+                    chosen = step
+            print(f"  ⏱️ Échéance dans {time_left / 60:.1f} min (hors upload) : {kind} en -preset {chosen['preset']} -crf {chosen['crf']} (durée prévue {self.predicted_seconds(chosen) / 60:.1f} min).")
+            return dict(chosen)
+
+    def record(self, kind, preset, crf, media_seconds, wall_seconds):
+        """Enregistre le temps d'encodage mesuré par seconde de vidéo pour ce réglage (voir cost_model.py)."""
+        if media_seconds <= 0 or wall_seconds <= 0:
+            return
+        record_costs({encode_cost_key(kind, {"preset": preset, "crf": crf}): wall_seconds / media_seconds}, path=self.costs_path)
+        with self.lock:
+            # Relu après l'enregistrement : d'autres exécutions peuvent avoir enregistré des mesures entre-temps
+            self.costs = load_costs(self.costs_path)
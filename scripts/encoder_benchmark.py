@@ -0,0 +1,241 @@
+import os
+import re
+import json
+import time
+import argparse
+import itertools
+import subprocess
+import sys
+
+from encode_scheduler import ENCODER_PROFILE_JSON, x264_arguments
+from run_context import run_path, target_path, atomic_write_json
+
+# --- Chemins des fichiers ---
+INPUT_PATHS_JSON = target_path("data", "downloaded_clip_paths.json") # Clips prétraités par download_clips.py
+BENCHMARK_DIR = run_path("data", "encoder_benchmark") # Encodages d'essai (supprimés après mesure)
+BENCHMARK_RESULTS_JSON = run_path("output", "encoder_benchmark.json")
+
+# --- Grille de réglages x264 testés ---
+BENCHMARK_PRESETS = ["ultrafast", "veryfast", "faster", "fast", "medium", "slow"]
+BENCHMARK_CRFS = [20, 23, 26]
+BENCHMARK_TUNES = [None, "film", "animation"] # None = pas de -tune
+BENCHMARK_THREADS = [0] # 0 = choix automatique de x264
+# Nombre de clips encodés pour chaque réglage, et durée encodée par clip (secondes)
+BENCHMARK_SAMPLE_CLIPS = 3
+BENCHMARK_SAMPLE_SECONDS = 20
+SAMPLE_FPS = 30 # Les clips prétraités sont au débit d'images cible de download_clips.py
+
+# --- Critères de recommandation ---
+# Qualité minimale acceptable (SSIM moyen, ou VMAF si libvmaf est disponible)
+MIN_SSIM = 0.97
+MIN_VMAF = 93.0
+# Vitesse minimale (fps) de la passe finale de compile_video.py, qui encode plusieurs rendus en parallèle
+MIN_COMPILE_FPS = 60.0
+
+def ffmpeg_has_filter(name):
+    """Indique si le FFmpeg installé fournit ce filtre (libvmaf n'est pas présent dans toutes les versions)."""
+    try:
+        result = subprocess.run(["ffmpeg", "-hide_banner", "-filters"], capture_output=True, text=True, check=True)
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return False
+    return re.search(rf"\s{re.escape(name)}\s", result.stdout) is not None
+
+def build_grid(presets, crfs, tunes, threads):
+    """Produit toutes les combinaisons de réglages x264 de la grille."""
+    return [
+        {"preset": preset, "crf": crf, "tune": tune, "threads": thread_count}
+        for preset, crf, tune, thread_count in itertools.product(presets, crfs, tunes, threads)
+    ]
+
+def settings_label(settings):
+    label = f"{settings['preset']}/crf{settings['crf']}"
+    if settings.get("tune"):
+        label += f"/{settings['tune']}"
+    if settings.get("threads"):
+        label += f"/t{settings['threads']}"
+    return label
+
+def encode_sample(clip_path, output_path, settings, duration):
+    """
+    Encode les premières secondes d'un clip (vidéo seule) avec ces réglages.
+    Retourne (durée d'encodage en secondes, nombre de frames encodées).
+    """
+    command = ["ffmpeg", "-i", clip_path, "-t", str(duration), "-an"]
+    command.extend(x264_arguments(settings))
+    command.extend(["-pix_fmt", "yuv420p", "-progress", "pipe:1", "-nostats", "-loglevel", "error", "-y", output_path])
+    start = time.monotonic()
+    result = subprocess.run(command, capture_output=True, text=True, check=True)
+    elapsed = time.monotonic() - start
+    frames = re.findall(r"^frame=(\d+)", result.stdout, re.MULTILINE)
+    return elapsed, int(frames[-1]) if frames else 0
+
+def measure_quality(encoded_path, reference_path, duration, use_vmaf):
+    """
+    Compare l'encodage au clip de référence avec les filtres ssim et psnr de FFmpeg (et libvmaf si demandé).
+    Retourne {"ssim", "psnr", "vmaf"} (None pour une métrique non mesurée).
+    """
+    graph = "[0:v][1:v]ssim;[0:v][1:v]psnr"
+    if use_vmaf:
+        graph = "[0:v]split[a][b];[1:v]split[c][d];[a][c]ssim;[b][d]libvmaf"
+    command = [
+        "ffmpeg", "-i", encoded_path, "-t", str(duration), "-i", reference_path,
+        "-lavfi", graph, "-f", "null", "-"
+    ]
+    result = subprocess.run(command, capture_output=True, text=True, check=True)
+    ssim = re.search(r"SSIM .*All:([0-9.]+)", result.stderr)
+    psnr = re.search(r"PSNR .*average:([0-9.]+|inf)", result.stderr)
+    vmaf = re.search(r"VMAF score:\s*([0-9.]+)", result.stderr)
+    return {
+        "ssim": float(ssim.group(1)) if ssim else None,
+        "psnr": float(psnr.group(1)) if psnr else None,
+        "vmaf": float(vmaf.group(1)) if vmaf else None
+    }
+
+def benchmark_settings(settings, clip_paths, duration, use_vmaf):
+    """Encode chaque clip de l'échantillon avec ces réglages et agrège vitesse, débit et qualité."""
+    os.makedirs(BENCHMARK_DIR, exist_ok=True)
+    total_seconds = 0.0
+    total_frames = 0
+    total_bits = 0
+    total_media_seconds = 0.0
+    scores = {"ssim": [], "psnr": [], "vmaf": []}
+    for i, clip_path in enumerate(clip_paths):
+        output_path = os.path.join(BENCHMARK_DIR, f"sample_{i}.mp4")
+        elapsed, frames = encode_sample(clip_path, output_path, settings, duration)
+        total_seconds += elapsed
+        total_frames += frames
+        total_bits += os.path.getsize(output_path) * 8
+        total_media_seconds += frames / SAMPLE_FPS if frames else duration
+        for metric, value in measure_quality(output_path, clip_path, duration, use_vmaf).items():
+            if value is not None:
+                scores[metric].append(value)
+        os.remove(output_path)
+
+    result = dict(settings)
+    result["fps"] = round(total_frames / total_seconds, 1) if total_seconds > 0 else 0.0
+    result["kbps"] = round(total_bits / total_media_seconds / 1000, 1) if total_media_seconds > 0 else 0.0
+    for metric, values in scores.items():
+        result[metric] = round(sum(values) / len(values), 4) if values else None
+    return result
+
+def quality_of(result):
+    """Score de qualité utilisé pour comparer les réglages : VMAF s'il a été mesuré, sinon SSIM."""
+    return result["vmaf"] if result.get("vmaf") is not None else result.get("ssim") or 0.0
+
+def pareto_front(results):
+    """
+    Retourne les réglages non dominés : aucun autre réglage n'est à la fois au moins aussi rapide,
+    au moins aussi compact et au moins d'aussi bonne qualité (et strictement meilleur sur un critère).
+    """
+    front = []
+    for candidate in results:
+        dominated = any(
+            other["fps"] >= candidate["fps"]
+            and other["kbps"] <= candidate["kbps"]
+            and quality_of(other) >= quality_of(candidate)
+            and (other["fps"] > candidate["fps"] or other["kbps"] < candidate["kbps"] or quality_of(other) > quality_of(candidate))
+            for other in results
+        )
+        if not dominated:
+            front.append(candidate)
+    return sorted(front, key=lambda result: result["fps"], reverse=True)
+
+def recommend_profiles(front, min_quality):
+    """
+    Choisit sur le front de Pareto :
+      preprocess: le réglage le plus rapide qui atteint la qualité minimale (fichiers intermédiaires)
+      compile: le réglage le plus compact qui atteint la qualité minimale et la vitesse minimale (vidéo publiée)
+    """
+    acceptable = [result for result in front if quality_of(result) >= min_quality] or front
+    preprocess = max(acceptable, key=lambda result: result["fps"])
+    fast_enough = [result for result in acceptable if result["fps"] >= MIN_COMPILE_FPS] or [preprocess]
+    compile_profile = min(fast_enough, key=lambda result: result["kbps"])
+    return {
+        stage: {key: result[key] for key in ("preset", "crf", "tune", "threads")}
+        for stage, result in (("preprocess", preprocess), ("compile", compile_profile))
+    }
+
+def print_table(results, front):
+    """Affiche les résultats, les réglages du front de Pareto étant marqués d'une étoile."""
+    front_labels = {settings_label(result) for result in front}
+    print(f"\n{'':2}{'Réglage':<28}{'fps':>8}{'kbps':>10}{'SSIM':>9}{'PSNR':>8}{'VMAF':>8}")
+    for result in sorted(results, key=lambda result: result["fps"], reverse=True):
+        label = settings_label(result)
+        marker = "★ " if label in front_labels else "  "
+        ssim = f"{result['ssim']:.4f}" if result["ssim"] is not None else "-"
+        psnr = f"{result['psnr']:.2f}" if result["psnr"] is not None else "-"
+        vmaf = f"{result['vmaf']:.2f}" if result["vmaf"] is not None else "-"
+        print(f"{marker}{label:<28}{result['fps']:>8.1f}{result['kbps']:>10.1f}{ssim:>9}{psnr:>8}{vmaf:>8}")
+
+def load_sample_clips(sample_size):
+    """Prend les premiers clips prétraités listés par download_clips.py."""
+    if not os.path.exists(INPUT_PATHS_JSON):
+        print(f"❌ Fichier '{INPUT_PATHS_JSON}' introuvable. Exécutez d'abord download_clips.py.")
+        sys.exit(1)
+    with open(INPUT_PATHS_JSON, "r", encoding="utf-8") as f:
+        clips = json.load(f)
+    paths = [clip["path"] for clip in clips if clip.get("path") and os.path.exists(clip["path"])]
+    return paths[:sample_size]
+
+def run_benchmark(clip_paths, grid, duration=BENCHMARK_SAMPLE_SECONDS, write_config=True):
+    """Mesure toute la grille, affiche le tableau de Pareto et enregistre le profil recommandé."""
+    use_vmaf = ffmpeg_has_filter("libvmaf")
+    print(f"🧪 Benchmark x264 : {len(grid)} réglages x {len(clip_paths)} clips ({duration}s chacun), qualité mesurée par {'VMAF + SSIM' if use_vmaf else 'SSIM + PSNR'}.")
+
+    results = []
+    for i, settings in enumerate(grid, start=1):
+        try:
+            result = benchmark_settings(settings, clip_paths, duration, use_vmaf)
+        except subprocess.CalledProcessError as e:
+            print(f"  ⚠️ [{i}/{len(grid)}] {settings_label(settings)} ignoré : {e.stderr}")
+            continue
+        print(f"  [{i}/{len(grid)}] {settings_label(settings)} : {result['fps']:.1f} fps, {result['kbps']:.0f} kbps, qualité {quality_of(result):.4f}")
+        results.append(result)
+
+    if not results:
+        print("❌ Aucun réglage n'a pu être mesuré.")
+        sys.exit(1)
+
+    front = pareto_front(results)
+    print_table(results, front)
+    recommended = recommend_profiles(front, MIN_VMAF if use_vmaf else MIN_SSIM)
+    for stage, settings in recommended.items():
+        print(f"\n✅ Réglage recommandé pour {stage} : {settings_label(settings)}")
+
+    os.makedirs(os.path.dirname(BENCHMARK_RESULTS_JSON), exist_ok=True)
+    with open(BENCHMARK_RESULTS_JSON, "w", encoding="utf-8") as f:
+        json.dump({"results": results, "pareto": front, "recommended": recommended}, f, indent=2)
+    print(f"Résultats détaillés enregistrés dans {BENCHMARK_RESULTS_JSON}")
+
+    if write_config:
+        # Configuration partagée par toutes les exécutions : jamais lue à moitié écrite
+        atomic_write_json(ENCODER_PROFILE_JSON, recommended, indent=2)
+        print(f"Profil recommandé enregistré dans {ENCODER_PROFILE_JSON} (utilisé par download_clips.py et compile_video.py).")
+    return recommended
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare des réglages x264 (vitesse, débit, qualité) sur des clips prétraités.")
+    parser.add_argument("clips", nargs="*", help=f"Clips à encoder (par défaut : les premiers clips de {INPUT_PATHS_JSON}).")
+    parser.add_argument("--sample", type=int, default=BENCHMARK_SAMPLE_CLIPS, help="Nombre de clips de l'échantillon.")
+    parser.add_argument("--duration", type=float, default=BENCHMARK_SAMPLE_SECONDS, help="Secondes encodées par clip.")
+    parser.add_argument("--presets", nargs="+", default=BENCHMARK_PRESETS)
+    parser.add_argument("--crfs", nargs="+", type=int, default=BENCHMARK_CRFS)
+    parser.add_argument("--tunes", nargs="+", default=BENCHMARK_TUNES, help="Valeurs de -tune ('none' pour aucune).")
+    parser.add_argument("--threads", nargs="+", type=int, default=BENCHMARK_THREADS)
+    parser.add_argument("--no-write-config", action="store_true", help=f"N'écrit pas {ENCODER_PROFILE_JSON}.")
+    args = parser.parse_args(argv)
+
+    sample_paths = args.clips[:args.sample] if args.clips else load_sample_clips(args.sample)
+    if not sample_paths:
+        print("❌ Aucun clip à encoder.")
+        sys.exit(1)
+    tunes = [None if tune in (None, "none") else tune for tune in args.tunes]
+    run_benchmark(
+        sample_paths,
+        build_grid(args.presets, args.crfs, tunes, args.threads),
+        duration=args.duration,
+        write_config=not args.no_write_config
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import re
+import subprocess
+
+from media_probe import probe_duration
+
+# numpy n'est importé que pour noter les frames : importer ce module (download_clips.py) ne le charge pas.
+
+# --- PARAMÈTRES DE SÉLECTION DES FRAMES ---
+# Résolution de décodage des candidats : assez pour juger la netteté et les couleurs, négligeable à décoder
+CANDIDATE_WIDTH = 160
+CANDIDATE_HEIGHT = 90
+# Les frames de la première demi-seconde sont souvent une transition : elles ne sont retenues qu'en dernier recours
+MIN_CANDIDATE_TIME = 0.5
+# Poids des métriques (chacune normalisée entre 0 et 1 sur les candidats du clip)
+SCORE_WEIGHTS = {
+    "sharpness": 0.35,
+    "contrast": 0.2,
+    "colorfulness": 0.25,
+    "center_detail": 0.2
+}
+# Luminance moyenne (0-255) en dehors de laquelle une frame est considérée noire ou blanche
+MIN_MEAN_LUMA = 30
+MAX_MEAN_LUMA = 235
+
+def decode_keyframes(video_path):
+    """
+    Décode uniquement les images clés (-skip_frame nokey) à basse résolution, en RGB brut via un pipe.
+    Retourne (tableau (N, H, W, 3) uint8, liste des instants en secondes).
+    Lève ValueError si le nombre d'instants lus ne correspond pas au nombre de frames décodées.
+    """
+    import numpy as np
+
+    command = [
+        "ffmpeg",
+        "-skip_frame", "nokey",
+        "-i", video_path,
+        "-vf", f"scale={CANDIDATE_WIDTH}:{CANDIDATE_HEIGHT},showinfo",
+        "-fps_mode", "passthrough",
+        "-an",
+        "-f", "rawvideo",
+        "-pix_fmt", "rgb24",
+        "pipe:1"
+    ]
+    result = subprocess.run(command, capture_output=True, check=True)
+    frame_size = CANDIDATE_WIDTH * CANDIDATE_HEIGHT * 3
+    frame_count = len(result.stdout) // frame_size
+    frames = np.frombuffer(result.stdout[:frame_count * frame_size], dtype=np.uint8)
+    frames = frames.reshape(frame_count, CANDIDATE_HEIGHT, CANDIDATE_WIDTH, 3)
+
+    # showinfo écrit l'instant de chaque frame sur stderr (négatif si le flux commence avant zéro)
+    times = [float(t) for t in re.findall(r"pts_time:\s*(-?[0-9.]+)", result.stderr.decode("utf-8", errors="replace"))]
+    if len(times) != frame_count:
+        raise ValueError(f"{frame_count} frames décodées mais {len(times)} instants lus")
+    return frames, times
+
+def normalize(values):
+    """Ramène une métrique entre 0 et 1 sur l'ensemble des candidats."""
+    import numpy as np
+
+    span = values.max() - values.min()
+    if span <= 0:
+        return np.zeros_like(values)
+    return (values - values.min()) / span
+
+def score_frames(frames):
+    """
+    Note toutes les frames d'un coup (calcul vectorisé sur le lot) :
+    netteté (variance du laplacien), contraste (écart-type de la luminance), colorfulness (Hasler-Süsstrunk)
+    et détail au centre de l'image (le sujet est rarement sur les bords). Les frames noires ou blanches
+    (transitions, fondus) sont pénalisées.
+    """
+    import numpy as np
+
+    rgb = frames.astype(np.float32)
+    red, green, blue = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    luma = 0.299 * red + 0.587 * green + 0.114 * blue # (N, H, W)
+
+    laplacian = (
+        luma[:, :-2, 1:-1] + luma[:, 2:, 1:-1] + luma[:, 1:-1, :-2] + luma[:, 1:-1, 2:]
+        - 4 * luma[:, 1:-1, 1:-1]
+    )
+    sharpness = laplacian.var(axis=(1, 2))
+    contrast = luma.std(axis=(1, 2))
+
+    rg = red - green
+    yb = 0.5 * (red + green) - blue
+    colorfulness = (
+        np.sqrt(rg.std(axis=(1, 2)) ** 2 + yb.std(axis=(1, 2)) ** 2)
+        + 0.3 * np.sqrt(rg.mean(axis=(1, 2)) ** 2 + yb.mean(axis=(1, 2)) ** 2)
+    )
+
+    # Part de l'énergie des contours située dans le tiers central de l'image
+    edges = np.abs(laplacian)
+    h, w = edges.shape[1:]
+    center = edges[:, h // 3: 2 * h // 3, w // 3: 2 * w // 3].sum(axis=(1, 2))
+    center_detail = center / (edges.sum(axis=(1, 2)) + 1e-6)
+
+    scores = (
+        SCORE_WEIGHTS["sharpness"] * normalize(sharpness)
+        + SCORE_WEIGHTS["contrast"] * normalize(contrast)
+        + SCORE_WEIGHTS["colorfulness"] * normalize(colorfulness)
+        + SCORE_WEIGHTS["center_detail"] * normalize(center_detail)
+    )
+    mean_luma = luma.mean(axis=(1, 2))
+    scores[(mean_luma < MIN_MEAN_LUMA) | (mean_luma > MAX_MEAN_LUMA)] -= 1.0
+    return scores
+
+def extract_frame(video_path, timestamp, output_image_path):
+    """Extrait une seule frame en pleine résolution à l'instant donné."""
+    command = [
+        "ffmpeg",
+        "-ss", f"{max(timestamp, 0.0):.3f}", # Instant négatif : première frame
+        "-i", video_path,
+        "-frames:v", "1",
+        "-q:v", "2", # Qualité élevée pour l'image
+        "-y",
+        output_image_path
+    ]
+    subprocess.run(command, check=True, capture_output=True, text=True)
+
+def select_best_frame(video_path, output_image_path):
+    """
+    Choisit la meilleure image clé d'une vidéo et l'extrait en pleine résolution.
+    Si les instants des images clés ne peuvent pas être associés aux frames, la frame du milieu du clip est extraite.
+    Retourne l'instant retenu (en secondes), ou None si aucune frame n'a pu être choisie.
+    """
+    import numpy as np
+
+    try:
+        try:
+            frames, times = decode_keyframes(video_path)
+        except ValueError as e:
+            timestamp = probe_duration(video_path) / 2
+            print(f"  ⚠️ Images clés inutilisables pour {video_path} ({e}), frame du milieu extraite.")
+            extract_frame(video_path, timestamp, output_image_path)
+            return timestamp
+        if len(frames) == 0:
+            return None
+
+        scores = score_frames(frames)
+        # Les frames du tout début ne sont choisies que si le clip n'a pas d'autre image clé
+        late = np.array([t >= MIN_CANDIDATE_TIME for t in times])
+        if late.any():
+            scores = np.where(late, scores, -np.inf)
+        best = int(np.argmax(scores))
+
+        extract_frame(video_path, times[best], output_image_path)
+        return times[best]
+    except subprocess.CalledProcessError as e:
+        stderr = e.stderr.decode("utf-8", errors="replace") if isinstance(e.stderr, bytes) else e.stderr
+        print(f"  ⚠️ Sélection de la meilleure frame impossible pour {video_path}: {stderr}")
+        return None
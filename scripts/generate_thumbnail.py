@@ -1,151 +1,255 @@
-import os
-import json
-from PIL import Image, ImageDraw, ImageFont, UnidentifiedImageError # requests et BytesIO ne sont plus nécessaires
-from datetime import datetime
-
-# Chemins des fichiers
-# INPUT_CLIPS_JSON n'est plus la source directe, on utilise downloaded_clip_paths.json
-DOWNLOADED_CLIPS_INFO_JSON = os.path.join("data", "downloaded_clip_paths.json")
-OUTPUT_THUMBNAIL_PATH = os.path.join("data", "thumbnail.jpg") # Miniature finale
-LOGO_PATH = os.path.join("assets", "your_logo.png") # Chemin vers votre logo PNG
-
-# Dimensions de la miniature YouTube standard
-THUMBNAIL_WIDTH = 1280
-THUMBNAIL_HEIGHT = 720
-
-def get_font(size):
-    """Tente de charger une police TrueType ou utilise la police par défaut."""
-    font_paths = [
-        "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", # Linux (souvent sur GitHub Actions)
-        "/System/Library/Fonts/Supplemental/Arial Bold.ttf",    # macOS
-        "C:/Windows/Fonts/arialbd.ttf"                          # Windows
-    ]
-    for path in font_paths:
-        if os.path.exists(path):
-            try:
-                return ImageFont.truetype(path, size)
-            except IOError:
-                continue
-            
-    print("⚠️ Aucune police TrueType trouvée pour la miniature. Utilisation de la police par défaut de Pillow.")
-    return ImageFont.load_default()
-
-# La fonction download_image n'est plus nécessaire ici !
-# def download_image(url):
-#     # ... (supprimer cette fonction)
-
-def generate_thumbnail():
-    print("🏞️ Démarrage de la génération de la miniature personnalisée...")
-
-    data_dir = os.path.dirname(OUTPUT_THUMBNAIL_PATH)
-    if not os.path.exists(data_dir):
-        os.makedirs(data_dir)
-        print(f"Dossier de données créé : {data_dir}")
-
-    # Utiliser DOWNLOADED_CLIPS_INFO_JSON comme source
-    if not os.path.exists(DOWNLOADED_CLIPS_INFO_JSON):
-        print(f"❌ Erreur: Le fichier '{DOWNLOADED_CLIPS_INFO_JSON}' est introuvable. Assurez-vous que la compilation a réussi et a sauvegardé les chemins des frames.")
-        generate_default_thumbnail("Fichier de clips introuvable pour la miniature.")
-        return 
-
-    with open(DOWNLOADED_CLIPS_INFO_JSON, "r", encoding="utf-8") as f:
-        clips_data = json.load(f)
-
-    today_date = datetime.now()
-    date_str = today_date.strftime("%d/%m/%Y")
-
-    if not clips_data:
-        print("⚠️ Aucune donnée de clip à traiter. Le fichier downloaded_clip_paths.json est vide. Génération d'une miniature par défaut.")
-        generate_default_thumbnail(f"Aucun clip trouvé pour aujourd'hui ({date_str}).")
-        return 
-
-    # Sélectionner les chemins des 4 premières frames disponibles
-    selected_frame_paths = []
-    for clip in clips_data:
-        frame_path = clip.get("first_frame_path")
-        if frame_path and os.path.exists(frame_path): # Vérifier que le chemin existe bien sur le disque
-            selected_frame_paths.append(frame_path)
-        if len(selected_frame_paths) >= 4:
-            break
-
-    if not selected_frame_paths:
-        print("⚠️ Aucune frame de vignette disponible ou les chemins sont invalides. Impossible de créer la miniature basée sur les clips. Génération d'une miniature par défaut.")
-        generate_default_thumbnail(f"Aucune frame disponible pour la miniature ({date_str}).")
-        return 
-
-    # Créer l'image finale vide
-    final_image = Image.new('RGB', (THUMBNAIL_WIDTH, THUMBNAIL_HEIGHT), color=(0, 0, 0))
-
-    quadrant_width = THUMBNAIL_WIDTH // 2
-    quadrant_height = THUMBNAIL_HEIGHT // 2
-
-    positions = [
-        (0, 0),
-        (quadrant_width, 0),
-        (0, quadrant_height),
-        (quadrant_width, quadrant_height)
-    ]
-
-    loaded_images = []
-    for path in selected_frame_paths: # Itérer sur les chemins locaux des frames
-        try:
-            img = Image.open(path).convert("RGB")
-            loaded_images.append(img)
-        except (IOError, UnidentifiedImageError) as e:
-            print(f"  ❌ Échec de chargement de l'image locale {path}: {e}. Remplacement par une image noire.")
-            loaded_images.append(Image.new('RGB', (quadrant_width, quadrant_height), color='black'))
-
-    # S'assurer qu'il y a exactement 4 images (remplir avec du noir si moins de 4 ont été chargées)
-    while len(loaded_images) < 4:
-        loaded_images.append(Image.new('RGB', (quadrant_width, quadrant_height), color='black'))
-
-    # Coller les images dans les quadrants
-    for i, img in enumerate(loaded_images):
-        if i < len(positions):
-            img = img.resize((quadrant_width, quadrant_height), Image.Resampling.LANCZOS)
-            final_image.paste(img, positions[i])
-
-    # --- Superposer le logo au centre ---
-    if os.path.exists(LOGO_PATH):
-        try:
-            logo = Image.open(LOGO_PATH).convert("RGBA")
-            
-            # Calculer la position centrale du logo avec sa taille d'origine
-            logo_x = (THUMBNAIL_WIDTH - logo.width) // 2
-            logo_y = (THUMBNAIL_HEIGHT - logo.height) // 2
-            
-            final_image.paste(logo, (logo_x, logo_y), logo)
-            print("✅ Logo superposé.")
-        except Exception as e:
-            print(f"❌ Erreur lors de la superposition du logo : {e}")
-    else:
-        print(f"⚠️ Fichier logo introuvable à {LOGO_PATH}. La miniature sera générée sans logo.")
-
-    # Sauvegarder la miniature finale
-    try:
-        final_image.save(OUTPUT_THUMBNAIL_PATH)
-        print(f"✅ Miniature générée et sauvegardée avec succès dans {OUTPUT_THUMBNAIL_PATH}")
-    except Exception as e:
-        print(f"❌ Erreur lors de la sauvegarde de la miniature finale : {e}")
-
-def generate_default_thumbnail(message):
-    """Génère une miniature par défaut avec un message."""
-    print(f"Génération d'une miniature par défaut : {message}")
-    default_thumbnail = Image.new('RGB', (THUMBNAIL_WIDTH, THUMBNAIL_HEIGHT), color = 'black')
-    draw = ImageDraw.Draw(default_thumbnail)
-    
-    font = get_font(40)
-    bbox = draw.textbbox((0, 0), message, font=font)
-    text_width = bbox[2] - bbox[0]
-    text_height = bbox[3] - bbox[1]
-
-    draw.text(((THUMBNAIL_WIDTH - text_width) / 2, (THUMBNAIL_HEIGHT - text_height) / 2), message, font=font, fill=(255, 255, 255))
-    
-    try:
-        default_thumbnail.save(OUTPUT_THUMBNAIL_PATH)
-        print(f"✅ Miniature par défaut générée et sauvegardée dans {OUTPUT_THUMBNAIL_PATH}.")
-    except Exception as e:
-        print(f"❌ Erreur lors de la sauvegarde de la miniature par défaut : {e}")
-
-if __name__ == "__main__":
-    generate_thumbnail()
\ No newline at end of file
+import os
+import json
+import hashlib
+import argparse
+from PIL import Image, ImageDraw, ImageFont, ImageOps, UnidentifiedImageError # requests et BytesIO ne sont plus nécessaires
+from datetime import datetime
+from workspace import Workspace
+from run_context import target_path
+
+# Chemins des fichiers
+# INPUT_CLIPS_JSON n'est plus la source directe, on utilise downloaded_clip_paths.json
+DOWNLOADED_CLIPS_INFO_JSON = target_path("data", "downloaded_clip_paths.json")
+OUTPUT_THUMBNAIL_PATH = target_path("data", "thumbnail.jpg") # Miniature finale
+LOGO_PATH = os.path.join("assets", "your_logo.png") # Chemin vers votre logo PNG
+THUMBNAIL_VARIANTS_DIR = target_path("data", "thumbnail_variants") # Variantes A/B de la miniature
+LOGO_LAYER_CACHE_DIR = os.path.join("cache", "thumbnail") # Calque du logo déjà préparé (persistant entre les exécutions)
+
+# Dimensions de la miniature YouTube standard
+THUMBNAIL_WIDTH = 1280
+THUMBNAIL_HEIGHT = 720
+
+# Variantes de mise en page rendues en une seule passe à partir des mêmes frames décodées :
+#   "grid": grille 2x2 (miniature historique), "hero_strip": grande image + bandeau de 4 frames, "single": une seule frame
+THUMBNAIL_VARIANTS = ["grid", "hero_strip", "single"]
+MAIN_THUMBNAIL_VARIANT = "grid" # Variante sauvegardée dans OUTPUT_THUMBNAIL_PATH et uploadée sur YouTube
+
+def get_font(size):
+    """Tente de charger une police TrueType ou utilise la police par défaut."""
+    font_paths = [
+        "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", # Linux (souvent sur GitHub Actions)
+        "/System/Library/Fonts/Supplemental/Arial Bold.ttf",    # macOS
+        "C:/Windows/Fonts/arialbd.ttf"                          # Windows
+    ]
+    for path in font_paths:
+        if os.path.exists(path):
+            try:
+                return ImageFont.truetype(path, size)
+            except IOError:
+                continue
+            
+    print("⚠️ Aucune police TrueType trouvée pour la miniature. Utilisation de la police par défaut de Pillow.")
+    return ImageFont.load_default()
+
+def load_frame_tile(path, size):
+    """
+    Charge une frame directement à l'échelle de la tuile : draft() fait décoder le JPEG à 1/2, 1/4 ou 1/8
+    de sa taille, reduce() termine la réduction entière, et le LANCZOS final ne travaille que sur quelques pixels.
+    La meilleure frame vient du clip brut (format d'origine, parfois vertical ou recadré) : elle est recadrée
+    au centre aux proportions de la tuile plutôt qu'étirée.
+    """
+    img = Image.open(path)
+    if img.format == "JPEG":
+        img.draft("RGB", size)
+    img = img.convert("RGB")
+    factor = min(img.width // size[0], img.height // size[1])
+    if factor >= 2:
+        img = img.reduce(factor)
+    if img.size != size:
+        img = ImageOps.fit(img, size, Image.Resampling.LANCZOS)
+    return img
+
+def get_logo_layer():
+    """
+    Calque RGBA de la taille de la miniature avec le logo centré. Préparé une seule fois puis mis en cache
+    sur disque (clé: chemin, taille et date de modification du logo), et partagé par toutes les variantes.
+    Retourne None si le logo est introuvable ou illisible.
+    """
+    if not os.path.exists(LOGO_PATH):
+        print(f"⚠️ Fichier logo introuvable à {LOGO_PATH}. La miniature sera générée sans logo.")
+        return None
+
+    stat = os.stat(LOGO_PATH)
+    key_data = f"{os.path.abspath(LOGO_PATH)}:{stat.st_size}:{stat.st_mtime_ns}:{THUMBNAIL_WIDTH}x{THUMBNAIL_HEIGHT}"
+    layer_path = os.path.join(LOGO_LAYER_CACHE_DIR, f"logo_layer_{hashlib.sha1(key_data.encode('utf-8')).hexdigest()}.png")
+    try:
+        if os.path.exists(layer_path):
+            layer = Image.open(layer_path)
+            layer.load()
+            return layer
+
+        logo = Image.open(LOGO_PATH).convert("RGBA")
+        layer = Image.new("RGBA", (THUMBNAIL_WIDTH, THUMBNAIL_HEIGHT), (0, 0, 0, 0))
+        # Calculer la position centrale du logo avec sa taille d'origine
+        logo_x = (THUMBNAIL_WIDTH - logo.width) // 2
+        logo_y = (THUMBNAIL_HEIGHT - logo.height) // 2
+        layer.paste(logo, (logo_x, logo_y), logo)
+
+        os.makedirs(LOGO_LAYER_CACHE_DIR, exist_ok=True)
+        temp_path = f"{layer_path}.{os.getpid()}.tmp"
+        layer.save(temp_path, format="PNG")
+        os.replace(temp_path, layer_path)
+        return layer
+    except Exception as e:
+        print(f"❌ Erreur lors de la préparation du logo : {e}")
+        return None
+
+def render_variant(variant, tiles, hero_tile):
+    """Assemble une variante de miniature à partir des tuiles déjà décodées (aucun nouveau décodage)."""
+    final_image = Image.new('RGB', (THUMBNAIL_WIDTH, THUMBNAIL_HEIGHT), color=(0, 0, 0))
+
+    quadrant_width = THUMBNAIL_WIDTH // 2
+    quadrant_height = THUMBNAIL_HEIGHT // 2
+
+    if variant == "grid":
+        positions = [
+            (0, 0),
+            (quadrant_width, 0),
+            (0, quadrant_height),
+            (quadrant_width, quadrant_height)
+        ]
+        # Coller les images dans les quadrants
+        for img, position in zip(tiles, positions):
+            final_image.paste(img, position)
+    elif variant == "hero_strip":
+        strip_height = THUMBNAIL_HEIGHT // 4
+        hero_height = THUMBNAIL_HEIGHT - strip_height
+        crop_top = (THUMBNAIL_HEIGHT - hero_height) // 2
+        final_image.paste(hero_tile.crop((0, crop_top, THUMBNAIL_WIDTH, crop_top + hero_height)), (0, 0))
+        strip_tile_width = THUMBNAIL_WIDTH // 4
+        for i, img in enumerate(tiles):
+            # Les tuiles 640x360 se réduisent exactement de moitié en 320x180
+            final_image.paste(img.reduce(2), (i * strip_tile_width, hero_height))
+    elif variant == "single":
+        final_image.paste(hero_tile, (0, 0))
+    else:
+        raise ValueError(f"Variante de miniature inconnue : {variant}")
+
+    return final_image
+
+def generate_thumbnail(variants=None):
+    print("🏞️ Démarrage de la génération de la miniature personnalisée...")
+
+    if variants is None:
+        variants = THUMBNAIL_VARIANTS
+
+    data_dir = os.path.dirname(OUTPUT_THUMBNAIL_PATH)
+    if not os.path.exists(data_dir):
+        os.makedirs(data_dir)
+        print(f"Dossier de données créé : {data_dir}")
+
+    # Utiliser DOWNLOADED_CLIPS_INFO_JSON comme source
+    if not os.path.exists(DOWNLOADED_CLIPS_INFO_JSON):
+        print(f"❌ Erreur: Le fichier '{DOWNLOADED_CLIPS_INFO_JSON}' est introuvable. Assurez-vous que la compilation a réussi et a sauvegardé les chemins des frames.")
+        generate_default_thumbnail("Fichier de clips introuvable pour la miniature.")
+        return 
+
+    with open(DOWNLOADED_CLIPS_INFO_JSON, "r", encoding="utf-8") as f:
+        clips_data = json.load(f)
+
+    today_date = datetime.now()
+    date_str = today_date.strftime("%d/%m/%Y")
+
+    if not clips_data:
+        print("⚠️ Aucune donnée de clip à traiter. Le fichier downloaded_clip_paths.json est vide. Génération d'une miniature par défaut.")
+        generate_default_thumbnail(f"Aucun clip trouvé pour aujourd'hui ({date_str}).")
+        return 
+
+    # Sélectionner les chemins des 4 premières frames disponibles (la meilleure frame du clip si elle a été choisie)
+    selected_frame_paths = []
+    for clip in clips_data:
+        frame_path = next(
+            (path for path in (clip.get("best_frame_path"), clip.get("first_frame_path")) if path and os.path.exists(path)),
+            None
+        ) # Vérifier que le chemin existe bien sur le disque
+        if frame_path:
+            selected_frame_paths.append(frame_path)
+        if len(selected_frame_paths) >= 4:
+            break
+
+    if not selected_frame_paths:
+        print("⚠️ Aucune frame de vignette disponible ou les chemins sont invalides. Impossible de créer la miniature basée sur les clips. Génération d'une miniature par défaut.")
+        generate_default_thumbnail(f"Aucune frame disponible pour la miniature ({date_str}).")
+        return 
+
+    quadrant_size = (THUMBNAIL_WIDTH // 2, THUMBNAIL_HEIGHT // 2)
+    full_size = (THUMBNAIL_WIDTH, THUMBNAIL_HEIGHT)
+    needs_hero = any(variant in ("hero_strip", "single") for variant in variants)
+
+    # Décodage unique des frames, à l'échelle des tuiles ; la première frame sert aussi d'image principale
+    tiles = []
+    hero_tile = None
+    for i, path in enumerate(selected_frame_paths): # Itérer sur les chemins locaux des frames
+        try:
+            if i == 0 and needs_hero:
+                hero_tile = load_frame_tile(path, full_size)
+                tiles.append(hero_tile.reduce(2))
+            else:
+                tiles.append(load_frame_tile(path, quadrant_size))
+        except (IOError, UnidentifiedImageError) as e:
+            print(f"  ❌ Échec de chargement de l'image locale {path}: {e}. Remplacement par une image noire.")
+            tiles.append(Image.new('RGB', quadrant_size, color='black'))
+
+    # S'assurer qu'il y a exactement 4 images (remplir avec du noir si moins de 4 ont été chargées)
+    while len(tiles) < 4:
+        tiles.append(Image.new('RGB', quadrant_size, color='black'))
+    if hero_tile is None:
+        hero_tile = Image.new('RGB', full_size, color='black')
+
+    # --- Superposer le logo au centre (calque préparé une seule fois pour toutes les variantes) ---
+    logo_layer = get_logo_layer()
+
+    # La miniature finale est toujours écrite : variante principale si elle est demandée, sinon la première demandée
+    main_variant = MAIN_THUMBNAIL_VARIANT if MAIN_THUMBNAIL_VARIANT in variants else variants[0]
+    os.makedirs(THUMBNAIL_VARIANTS_DIR, exist_ok=True)
+    for variant in variants:
+        final_image = render_variant(variant, tiles, hero_tile)
+        if logo_layer is not None:
+            final_image.paste(logo_layer, (0, 0), logo_layer)
+
+        # Sauvegarder la variante (et la miniature finale pour la variante principale)
+        output_paths = [os.path.join(THUMBNAIL_VARIANTS_DIR, f"{variant}.jpg")]
+        if variant == main_variant:
+            output_paths.append(OUTPUT_THUMBNAIL_PATH)
+        for output_path in output_paths:
+            try:
+                final_image.save(output_path)
+                print(f"✅ Miniature ({variant}) générée et sauvegardée avec succès dans {output_path}")
+            except Exception as e:
+                print(f"❌ Erreur lors de la sauvegarde de la miniature ({variant}) : {e}")
+
+    # Les frames ne sont plus réservées, mais restent en place tant que le budget disque le permet :
+    # l'étape de miniature peut être relancée seule (nouvel essai, upload échoué) sans réextraire les frames
+    workspace = Workspace()
+    for clip in clips_data:
+        for path in {clip.get("best_frame_path"), clip.get("first_frame_path")}:
+            workspace.release(path, "thumbnail", keep=True)
+
+def generate_default_thumbnail(message):
+    """Génère une miniature par défaut avec un message."""
+    print(f"Génération d'une miniature par défaut : {message}")
+    default_thumbnail = Image.new('RGB', (THUMBNAIL_WIDTH, THUMBNAIL_HEIGHT), color = 'black')
+    draw = ImageDraw.Draw(default_thumbnail)
+    
+    font = get_font(40)
+    bbox = draw.textbbox((0, 0), message, font=font)
+    text_width = bbox[2] - bbox[0]
+    text_height = bbox[3] - bbox[1]
+
+    draw.text(((THUMBNAIL_WIDTH - text_width) / 2, (THUMBNAIL_HEIGHT - text_height) / 2), message, font=font, fill=(255, 255, 255))
+    
+    try:
+        default_thumbnail.save(OUTPUT_THUMBNAIL_PATH)
+        print(f"✅ Miniature par défaut générée et sauvegardée dans {OUTPUT_THUMBNAIL_PATH}.")
+    except Exception as e:
+        print(f"❌ Erreur lors de la sauvegarde de la miniature par défaut : {e}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Génère la miniature YouTube (et ses variantes) à partir des frames des clips.")
+    parser.add_argument("--variants", nargs="+", choices=THUMBNAIL_VARIANTS, default=THUMBNAIL_VARIANTS,
+                        help="Variantes de mise en page à rendre.")
+    args = parser.parse_args(argv)
+    generate_thumbnail(args.variants)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -1,343 +1,680 @@
-import requests
-import os
-import json
-import sys
-from datetime import datetime, timedelta, timezone
-
-# Twitch API credentials from GitHub Secrets
-CLIENT_ID = os.getenv("TWITCH_CLIENT_ID")
-CLIENT_SECRET = os.getenv("TWITCH_CLIENT_SECRET")
-
-if not CLIENT_ID or not CLIENT_SECRET:
-    print("❌ ERREUR: TWITCH_CLIENT_ID ou TWITCH_CLIENT_SECRET non définis.")
-    sys.exit(1)
-
-TWITCH_AUTH_URL = "https://id.twitch.tv/oauth2/token"
-TWITCH_API_URL = "https://api.twitch.tv/helix/clips"
-
-OUTPUT_CLIPS_JSON = os.path.join("data", "top_clips.json")
-
-# --- PARAMÈTRES DE FILTRAGE ET DE SÉLECTION ---
-
-# NOUVELLE OPTION DE CONFIGURATION :
-# Si TRUE, le script privilégiera strictement les clips de BROADCASTER_IDS avant d'ajouter des clips de GAME_IDS.
-# Si FALSE, tous les clips (broadcasters et jeux) seront collectés puis triés globalement par vues.
-PRIORITIZE_BROADCASTERS_STRICTLY = False # <-- CHANGEZ CETTE VALEUR (True/False) POUR BASCULER LA LOGIQUE
-
-# NOUVEAU PARAMÈTRE : Nombre maximal de clips par streamer dans la compilation finale.
-MAX_CLIPS_PER_BROADCASTER_IN_FINAL_COMPILATION = 3 # Définis ta limite ici (ex: 5, 10, etc.)
-
-# Liste des IDs de jeux pour lesquels vous voulez récupérer des clips.
-GAME_IDS = [
-    "509670",        # Just Chatting
-    "21779",         # League of Legends
-    "32982",         # Grand Theft Auto V
-    "512965",        # VALORANT
-    "518018",        # Minecraft
-    "513143",        # Fortnite
-    "32982",         # Grand Theft Auto V
-    "32399",         # Counter-Strike
-    "511224",        # Apex Legends
-    "506520",        # Dota 2
-    "490422",        # Dead by Daylight
-    "514873",        # Call of Duty: Warzone
-    "65768",         # Rocket League
-    "518883",        # EA Sports FC 24
-    "180025139",     # Mario Kart 8 Deluxe
-    "280721",        # Teamfight Tactics
-    "488427",        # World of Warcraft
-    "1467408070",    # Rust
-    "32213",         # Hearthstone
-    "138585",        # Chess
-    "493306",        # Overwatch 2
-    "509660",        # Special Events
-    "1063683693",    # Pokémon Scarlet and Violet
-    "1678120671",    # Baldur's Gate 3
-    "27471",         # osu!
-    "507316",        # Phasmophobia
-    "19326",         # The Elder Scrolls V: Skyrim
-    "512710",        # Fall Guys
-    "1285324545",    # Lethal Company
-    # Ajoutez d'autres IDs si nécessaire
-]
-
-# Liste des IDs de streamers francophones populaires.
-# Les clips seront prioritaires selon l'ordre de cette liste si PRIORITIZE_BROADCASTERS_STRICTLY est True.
-BROADCASTER_IDS = [
-    "737048563",     # Anyme023
-    "52130765",      # Squeezie (chaîne principale)
-    "22245231",      # SqueezieLive (sa chaîne secondaire pour le live)
-    "80716629",      # Inoxtag
-    "153066440",     # Michou
-    "737048563",     # AmineMaTue
-    "496105401",     # byilhann
-    "57402636",      # RebeuDeter
-    "887001013",     # Nico_la
-    "60256640",      # Flamby
-    "253195796",     # helydia
-    "24147592",      # Gotaga
-    "134966333",     # Kameto
-    "175560856",     # Hctuan
-    "57404419",      # Ponce
-    "38038890",      # Antoine Daniel
-    "48480373",      # MisterMV
-    "19075728",      # Sardoche
-    "54546583",      # Locklear
-    "50290500",      # Domingo
-    "47565457",      # Joyca
-    "41719107",      # ZeratoR
-    "41487980",      # Pauleta_Twitch (Pfut)
-    "31429949",      # LeBouseuh
-    "46296316",      # Maghla
-    "49896798",      # Chowh1
-    "49749557",      # Jiraya
-    "53696803",      # Wankil Studio (Laink et Terracid - chaîne principale)
-    "72366922",      # Laink (ID individuel, généralement couvert par Wankil Studio)
-    "129845722",     # Terracid (ID individuel, généralement couvert par Wankil Studio)
-    "51950294",      # Mynthos
-    "53140510",      # Etoiles
-    "134812328",     # LittleBigWhale
-    "180237751",     # Mister V (l'artiste/youtubeur, différent de MisterMV)
-    "55787682",      # Shaunz
-    "142436402",     # Ultia
-    "20875990",      # LCK_France (pour les clips de la ligue de LoL française)
-    # Ajoutez d'autres IDs vérifiés ici
-]
-
-# --- NOUVEAU PARAMÈTRE : Langue du clip ---
-CLIP_LANGUAGE = "fr" # Code ISO 639-1 pour le français
-
-# PARAMÈTRE POUR LA DURÉE CUMULÉE MINIMALE DE LA VIDÉO FINALE
-MIN_VIDEO_DURATION_SECONDS = 630 # 10 minutes et 30 secondes (10*60 + 30)
-
-# --- FIN PARAMÈTRES ---
-
-def get_twitch_access_token():
-    """Gets an application access token for Twitch API."""
-    print("🔑 Récupération du jeton d'accès Twitch...")
-    payload = {
-        "client_id": CLIENT_ID,
-        "client_secret": CLIENT_SECRET,
-        "grant_type": "client_credentials"
-    }
-    try:
-        response = requests.post(TWITCH_AUTH_URL, data=payload)
-        response.raise_for_status()
-        token_data = response.json()
-        print("✅ Jeton d'accès Twitch récupéré.")
-        return token_data["access_token"]
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Erreur lors de la récupération du jeton d'accès Twitch : {e}")
-        sys.exit(1)
-
-def fetch_clips(access_token, params, source_type, source_id):
-    """Helper function to fetch clips and handle errors."""
-    headers = {
-        "Client-ID": CLIENT_ID,
-        "Authorization": f"Bearer {access_token}"
-    }
-    try:
-        response = requests.get(TWITCH_API_URL, headers=headers, params=params)
-        response.raise_for_status()
-        clips_data = response.json()
-        
-        if not clips_data.get("data"):
-            print(f"  ⚠️ Aucune donnée de clip trouvée pour {source_type} {source_id} dans la période spécifiée.")
-            return []
-
-        collected_clips = []
-        for clip in clips_data.get("data", []):
-            collected_clips.append({
-                "id": clip.get("id"),
-                "url": clip.get("url"),
-                "embed_url": clip.get("embed_url"),
-                "thumbnail_url": clip.get("thumbnail_url"),
-                "title": clip.get("title"),
-                "viewer_count": clip.get("view_count", 0),
-                "broadcaster_id": clip.get("broadcaster_id"), # Assure-toi que l'ID du streamer est inclus
-                "broadcaster_name": clip.get("broadcaster_name"),
-                "game_name": clip.get("game_name"),
-                "created_at": clip.get("created_at"),
-                "duration": float(clip.get("duration", 0.0)),
-                "language": clip.get("language")
-            })
-        return collected_clips
-            
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Erreur lors de la récupération des clips Twitch pour {source_type} {source_id} : {e}")
-        if response.content:
-            print(f"    Contenu de la réponse API Twitch: {response.content.decode()}")
-        return []
-    except json.JSONDecodeError as e:
-        print(f"❌ Erreur de décodage JSON pour {source_type} {source_id}: {e}")
-        if response.content:
-            print(f"    Contenu brut de la réponse: {response.content.decode()}")
-        return []
-
-def get_top_clips(access_token, num_clips_per_source=50, days_ago=3):    
-    """Fetches and prioritizes clips based on configured parameters, with a limit per broadcaster."""
-    print(f"📊 Récupération d'un maximum de {num_clips_per_source} clips Twitch par source (jeu/streamer) pour les dernières {days_ago} jours...")
-            
-    end_date = datetime.now(timezone.utc)
-    start_date = end_date - timedelta(days=days_ago)
-    
-    seen_clip_ids = set() # Use a set to prevent duplicate clips across all collections
-
-    # --- Phase de collecte ---
-    # Collecte tous les clips des broadcasters prioritaires
-    print("\n--- Collecte des clips des streamers prioritaires ---")
-    all_broadcaster_clips = []
-    for broadcaster_id in BROADCASTER_IDS:
-        print(f"  - Recherche de clips pour le broadcaster_id: {broadcaster_id}")
-        params = {
-            "first": num_clips_per_source,
-            "started_at": start_date.strftime('%Y-%m-%dT%H:%M:%SZ'),
-            "ended_at": end_date.strftime('%Y-%m-%dT%H:%M:%SZ'),
-            "sort": "views",
-            "broadcaster_id": broadcaster_id,
-            "language": CLIP_LANGUAGE
-        }
-        clips = fetch_clips(access_token, params, "broadcaster_id", broadcaster_id)
-        for clip in clips:
-            if clip["id"] not in seen_clip_ids:
-                all_broadcaster_clips.append(clip)
-                seen_clip_ids.add(clip["id"])
-    print(f"✅ Collecté {len(all_broadcaster_clips)} clips uniques de streamers prioritaires.")
-
-    # Collecte tous les clips des jeux (excluant ceux déjà vus des broadcasters)
-    print("\n--- Collecte des clips des jeux spécifiés ---")
-    all_game_clips = []
-    for game_id in GAME_IDS:
-        print(f"  - Recherche de clips pour le game_id: {game_id}")
-        params = {
-            "first": num_clips_per_source,
-            "started_at": start_date.strftime('%Y-%m-%dT%H:%M:%SZ'),
-            "ended_at": end_date.strftime('%Y-%m-%dT%H:%M:%SZ'),
-            "sort": "views",
-            "game_id": game_id,
-            "language": CLIP_LANGUAGE
-        }
-        clips = fetch_clips(access_token, params, "game_id", game_id)
-        for clip in clips:
-            if clip["id"] not in seen_clip_ids: # Important: avoid duplicates from priority broadcasters
-                all_game_clips.append(clip)
-                seen_clip_ids.add(clip["id"])
-    print(f"✅ Collecté {len(all_game_clips)} clips uniques des jeux spécifiés (hors clips déjà inclus).")
-
-    # --- Logique de sélection finale basée sur l'option ---
-    final_clips_for_compilation = []
-    current_duration_sum = 0.0
-    clips_added_per_broadcaster = {} # Nouveau dictionnaire pour suivre le nombre de clips ajoutés par streamer
-
-    if PRIORITIZE_BROADCASTERS_STRICTLY:
-        print(f"\nMode de sélection: PRIORITAIRE (streamers d'abord). Atteindre {MIN_VIDEO_DURATION_SECONDS}s.")
-        # 1. Trier et ajouter les clips des streamers prioritaires
-        sorted_priority_clips = sorted(all_broadcaster_clips, key=lambda x: x.get('viewer_count', 0), reverse=True)
-        for clip in sorted_priority_clips:
-            broadcaster_id = clip.get('broadcaster_id')
-            
-            # Vérifie si la limite pour ce streamer est atteinte
-            if clips_added_per_broadcaster.get(broadcaster_id, 0) >= MAX_CLIPS_PER_BROADCASTER_IN_FINAL_COMPILATION:
-                print(f"  [PRIO] Ignoré : Limite de clips ({MAX_CLIPS_PER_BROADCASTER_IN_FINAL_COMPILATION}) atteinte pour {clip.get('broadcaster_name', 'N/A')}")
-                continue # Passe au clip suivant
-
-            clip_duration = float(clip.get('duration', 0.0))
-            if clip_duration > 0:
-                final_clips_for_compilation.append(clip)
-                current_duration_sum += clip_duration
-                # Incrémente le compteur de clips pour ce streamer
-                clips_added_per_broadcaster[broadcaster_id] = clips_added_per_broadcaster.get(broadcaster_id, 0) + 1 
-                
-                print(f"  [PRIO] Ajouté : '{clip.get('title', 'N/A')}' par {clip.get('broadcaster_name', 'N/A')} ({clip_duration:.1f}s, Vues: {clip.get('viewer_count', 0)}). Durée cumulée: {current_duration_sum:.1f}s. Clips de ce streamer: {clips_added_per_broadcaster[broadcaster_id]}/{MAX_CLIPS_PER_BROADCASTER_IN_FINAL_COMPILATION}")
-                
-                if current_duration_sum >= MIN_VIDEO_DURATION_SECONDS and len(final_clips_for_compilation) >= 3:
-                    print(f"  ✅ Durée minimale ({MIN_VIDEO_DURATION_SECONDS}s) atteinte avec {len(final_clips_for_compilation)} clips prioritaires.")
-                    break # Stop adding priority clips
-
-        # 2. Si la durée n'est pas atteinte, compléter avec les clips de jeux
-        if current_duration_sum < MIN_VIDEO_DURATION_SECONDS:
-            print(f"  ⚠️ Durée minimale pas encore atteinte ({current_duration_sum:.1f}s). Ajout de clips des jeux pour compléter.")
-            sorted_game_clips = sorted(all_game_clips, key=lambda x: x.get('viewer_count', 0), reverse=True)
-            for clip in sorted_game_clips:
-                # Double-check if already added (should be covered by seen_clip_ids, but safety)
-                if clip["id"] in [c["id"] for c in final_clips_for_compilation]:
-                    continue
-                
-                broadcaster_id = clip.get('broadcaster_id')
-
-                # Applique aussi la limite aux clips de jeux pour éviter qu'un streamer dominent trop la fin
-                if clips_added_per_broadcaster.get(broadcaster_id, 0) >= MAX_CLIPS_PER_BROADCASTER_IN_FINAL_COMPILATION:
-                    print(f"  [JEUX] Ignoré : Limite de clips ({MAX_CLIPS_PER_BROADCASTER_IN_FINAL_COMPILATION}) atteinte pour {clip.get('broadcaster_name', 'N/A')}")
-                    continue # Passe au clip suivant
-
-                clip_duration = float(clip.get('duration', 0.0))
-                if clip_duration > 0:
-                    final_clips_for_compilation.append(clip)
-                    current_duration_sum += clip_duration
-                    clips_added_per_broadcaster[broadcaster_id] = clips_added_per_broadcaster.get(broadcaster_id, 0) + 1 
-                    print(f"  [JEUX] Ajouté : '{clip.get('title', 'N/A')}' par {clip.get('broadcaster_name', 'N/A')} ({clip_duration:.1f}s, Vues: {clip.get('viewer_count', 0)}). Durée cumulée: {current_duration_sum:.1f}s. Clips de ce streamer: {clips_added_per_broadcaster[broadcaster_id]}/{MAX_CLIPS_PER_BROADCASTER_IN_FINAL_COMPILATION}")
-                    
-                    if current_duration_sum >= MIN_VIDEO_DURATION_SECONDS and len(final_clips_for_compilation) >= 3:
-                        print(f"  ✅ Durée minimale ({MIN_VIDEO_DURATION_SECONDS}s) atteinte avec {len(final_clips_for_compilation)} clips (mix prioritaires/jeux).")
-                        break # Stop adding game clips
-
-    else: # Logique "comme avant": tout trier par vues
-        print(f"\nMode de sélection: CLASSIQUE (tous les clips triés par vues). Atteindre {MIN_VIDEO_DURATION_SECONDS}s.")
-        all_collected_clips = []
-        all_collected_clips.extend(all_broadcaster_clips)
-        all_collected_clips.extend(all_game_clips) # game_clips should not contain duplicates already in broadcaster_clips due to seen_clip_ids
-
-        # Filtrer par langue une dernière fois (au cas où l'API renverrait des clips hors langue)
-        filtered_clips_by_language = [clip for clip in all_collected_clips if clip.get('language') == CLIP_LANGUAGE]
-        sorted_clips_by_views = sorted(filtered_clips_by_language, key=lambda x: x.get('viewer_count', 0), reverse=True)
-
-        for clip in sorted_clips_by_views:
-            broadcaster_id = clip.get('broadcaster_id')
-
-            # Vérifie si la limite pour ce streamer est atteinte, même en mode classique
-            if clips_added_per_broadcaster.get(broadcaster_id, 0) >= MAX_CLIPS_PER_BROADCASTER_IN_FINAL_COMPILATION:
-                print(f"  [GLOBAL] Ignoré : Limite de clips ({MAX_CLIPS_PER_BROADCASTER_IN_FINAL_COMPILATION}) atteinte pour {clip.get('broadcaster_name', 'N/A')}")
-                continue # Passe au clip suivant
-
-            clip_duration = float(clip.get('duration', 0.0))
-            if clip_duration > 0:
-                final_clips_for_compilation.append(clip)
-                current_duration_sum += clip_duration
-                clips_added_per_broadcaster[broadcaster_id] = clips_added_per_broadcaster.get(broadcaster_id, 0) + 1 
-                print(f"  [GLOBAL] Ajouté : '{clip.get('title', 'N/A')}' par {clip.get('broadcaster_name', 'N/A')} ({clip_duration:.1f}s, Vues: {clip.get('viewer_count', 0)}). Durée cumulée: {current_duration_sum:.1f}s. Clips de ce streamer: {clips_added_per_broadcaster[broadcaster_id]}/{MAX_CLIPS_PER_BROADCASTER_IN_FINAL_COMPILATION}")
-                
-                if current_duration_sum >= MIN_VIDEO_DURATION_SECONDS and len(final_clips_for_compilation) >= 3:
-                    print(f"  ✅ Durée minimale ({MIN_VIDEO_DURATION_SECONDS}s) atteinte avec {len(final_clips_for_compilation)} clips.")
-                    break
-
-
-    # Final check and logging
-    if current_duration_sum < MIN_VIDEO_DURATION_SECONDS and final_clips_for_compilation:
-        print(f"⚠️ ATTENTION: Impossible d'atteindre la durée minimale de {MIN_VIDEO_DURATION_SECONDS} secondes ({MIN_VIDEO_DURATION_SECONDS / 60:.2f} minutes) avec les clips disponibles. Durée finale: {current_duration_sum:.1f}s")
-            
-    if not final_clips_for_compilation:
-        print("⚠️ Aucun clip viable n'a été sélectionné pour la compilation (peut-être tous avec durée 0, ou aucun trouvé). Le fichier top_clips.json sera vide.")
-        sys.exit(0)
-
-    # The final list of clips to save
-    final_clips = final_clips_for_compilation
-
-    # --- DÉBUGGAGE : Affiche les clips finaux avant de les écrire dans le JSON ---
-    print("\n--- CLIPS FINAUX SÉLECTIONNÉS POUR SAUVEGARDE ---")
-    if final_clips:
-        for i, clip in enumerate(final_clips):
-            print(f"{i+1}. Title: {clip.get('title', 'N/A')}, Broadcaster: {clip.get('broadcaster_name', 'N/A')}, Views: {clip.get('viewer_count', 0)}, Duration: {clip.get('duration', 'N/A')}s, Language: {clip.get('language', 'N/A')}, URL: {clip.get('url', 'N/A')}")
-    else:
-        print("Aucun clip à sauvegarder.")
-    print("--------------------------------------------------\n")
-            
-    with open(OUTPUT_CLIPS_JSON, "w", encoding="utf-8") as f:
-        json.dump(final_clips, f, ensure_ascii=False, indent=2)
-    
-    print(f"✅ {len(final_clips)} clips récupérés et sauvegardés dans {OUTPUT_CLIPS_JSON} pour une durée totale de {current_duration_sum:.1f} secondes.")
-    return final_clips
-
-if __name__ == "__main__":
-    token = get_twitch_access_token()
-    if token:
-        get_top_clips(token, num_clips_per_source=50)
\ No newline at end of file
+import requests
+import os
+import json
+import sys
+import argparse
+import heapq
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from clip_dedup import filter_near_duplicates, drop_overlapping_clips, VodIntervalIndex, clip_vod_interval
+from clip_model import Clip, save_clips, ClipStreamWriter, stream_path
+from run_context import target_path
+from credentials import require_access_token, twitch_get, CredentialError
+from source_stats import plan_source_fetch, record_source_yield, print_source_plan
+
+# Les identifiants Twitch (GitHub Secrets) et le jeton d'application sont gérés par credentials.py
+TWITCH_API_URL = "https://api.twitch.tv/helix/clips"
+
+# Fichiers écrits dans le dossier de données de chaque cible (data/ pour la cible principale)
+OUTPUT_CLIPS_FILENAME = "top_clips.json"
+# Liste classée des candidats : la sélection, puis les clips de remplacement utilisés par download_clips.py
+# si un téléchargement échoue ou si les durées réelles sont plus courtes que prévu.
+OUTPUT_CANDIDATES_FILENAME = "candidate_clips.json"
+# Les mêmes candidats sont aussi publiés au fur et à mesure dans candidate_clips.jsonl (voir ClipStreamWriter),
+# que download_clips.py --follow lit pendant la collecte.
+
+# --- PARAMÈTRES DE FILTRAGE ET DE SÉLECTION ---
+
+# NOUVELLE OPTION DE CONFIGURATION :
+# Si TRUE, le script privilégiera strictement les clips de BROADCASTER_IDS avant d'ajouter des clips de GAME_IDS.
+# Si FALSE, tous les clips (broadcasters et jeux) seront collectés puis triés globalement par vues.
+PRIORITIZE_BROADCASTERS_STRICTLY = False # <-- CHANGEZ CETTE VALEUR (True/False) POUR BASCULER LA LOGIQUE
+
+# NOUVEAU PARAMÈTRE : Nombre maximal de clips par streamer dans la compilation finale.
+MAX_CLIPS_PER_BROADCASTER_IN_FINAL_COMPILATION = 3 # Définis ta limite ici (ex: 5, 10, etc.)
+
+# Liste des IDs de jeux pour lesquels vous voulez récupérer des clips.
+GAME_IDS = [
+    "509670",        # Just Chatting
+    "21779",         # League of Legends
+    "32982",         # Grand Theft Auto V
+    "512965",        # VALORANT
+    "518018",        # Minecraft
+    "513143",        # Fortnite
+    "32399",         # Counter-Strike
+    "511224",        # Apex Legends
+    "506520",        # Dota 2
+    "490422",        # Dead by Daylight
+    "514873",        # Call of Duty: Warzone
+    "65768",         # Rocket League
+    "518883",        # EA Sports FC 24
+    "180025139",     # Mario Kart 8 Deluxe
+    "280721",        # Teamfight Tactics
+    "488427",        # World of Warcraft
+    "1467408070",    # Rust
+    "32213",         # Hearthstone
+    "138585",        # Chess
+    "493306",        # Overwatch 2
+    "509660",        # Special Events
+    "1063683693",    # Pokémon Scarlet and Violet
+    "1678120671",    # Baldur's Gate 3
+    "27471",         # osu!
+    "507316",        # Phasmophobia
+    "19326",         # The Elder Scrolls V: Skyrim
+    "512710",        # Fall Guys
+    "1285324545",    # Lethal Company
+    # Ajoutez d'autres IDs si nécessaire
+]
+
+# Liste des IDs de streamers francophones populaires.
+# Les clips seront prioritaires selon l'ordre de cette liste si PRIORITIZE_BROADCASTERS_STRICTLY est True.
+BROADCASTER_IDS = [
+    "737048563",     # Anyme023
+    "52130765",      # Squeezie (chaîne principale)
+    "22245231",      # SqueezieLive (sa chaîne secondaire pour le live)
+    "80716629",      # Inoxtag
+    "153066440",     # Michou
+    # AmineMaTue : l'ID noté ici était celui d'Anyme023 (737048563), à vérifier avec "cli.py broadcaster-id aminematue"
+    "496105401",     # byilhann
+    "57402636",      # RebeuDeter
+    "887001013",     # Nico_la
+    "60256640",      # Flamby
+    "253195796",     # helydia
+    "24147592",      # Gotaga
+    "134966333",     # Kameto
+    "175560856",     # Hctuan
+    "57404419",      # Ponce
+    "38038890",      # Antoine Daniel
+    "48480373",      # MisterMV
+    "19075728",      # Sardoche
+    "54546583",      # Locklear
+    "50290500",      # Domingo
+    "47565457",      # Joyca
+    "41719107",      # ZeratoR
+    "41487980",      # Pauleta_Twitch (Pfut)
+    "31429949",      # LeBouseuh
+    "46296316",      # Maghla
+    "49896798",      # Chowh1
+    "49749557",      # Jiraya
+    "53696803",      # Wankil Studio (Laink et Terracid - chaîne principale)
+    "72366922",      # Laink (ID individuel, généralement couvert par Wankil Studio)
+    "129845722",     # Terracid (ID individuel, généralement couvert par Wankil Studio)
+    "51950294",      # Mynthos
+    "53140510",      # Etoiles
+    "134812328",     # LittleBigWhale
+    "180237751",     # Mister V (l'artiste/youtubeur, différent de MisterMV)
+    "55787682",      # Shaunz
+    "142436402",     # Ultia
+    "20875990",      # LCK_France (pour les clips de la ligue de LoL française)
+    # Ajoutez d'autres IDs vérifiés ici
+]
+
+# --- NOUVEAU PARAMÈTRE : Langue du clip ---
+CLIP_LANGUAGE = "fr" # Code ISO 639-1 pour le français
+
+# PARAMÈTRE POUR LA DURÉE CUMULÉE MINIMALE DE LA VIDÉO FINALE
+MIN_VIDEO_DURATION_SECONDS = 630 # 10 minutes et 30 secondes (10*60 + 30)
+
+# Nombre maximal de clips de remplacement ajoutés après la sélection dans candidate_clips.json
+MAX_BACKFILL_CANDIDATES = 20
+
+# --- DÉCOUPAGE TEMPOREL DES REQUÊTES (sources denses) ---
+# Une requête Helix ne renvoie qu'une tranche limitée des clips les plus vus de la fenêtre : pour un gros jeu,
+# les clips d'un seul jour évincent ceux des autres. Une source dont la réponse est pleine est donc réinterrogée
+# par tranches de TIME_SHARD_HOURS, puis chaque tranche encore pleine est coupée en deux (jusqu'à
+# MIN_TIME_SHARD_HOURS). Les sources peu actives restent à une seule requête.
+TIME_SHARDING_ENABLED = True
+TIME_SHARD_HOURS = 6
+MIN_TIME_SHARD_HOURS = 1
+MAX_SHARDS_PER_SOURCE = 48 # Borne du nombre de requêtes par source
+MAX_CLIPS_PER_SOURCE = 500 # Taille maximale du pool fusionné d'une source
+FETCH_WORKERS = 8 # Requêtes Helix simultanées
+
+# --- BUDGET DE REQUÊTES ADAPTATIF ---
+# Si TRUE, la profondeur de page de chaque source et la fréquence à laquelle elle est interrogée dépendent de
+# son rendement lors des exécutions précédentes (clips renvoyés, dans la langue, retenus ; voir source_stats.py).
+# Les sources qui n'ont rien donné depuis plusieurs exécutions sont reportées. --all-sources ignore ce réglage.
+ADAPTIVE_FETCH_ENABLED = True
+
+# --- SÉLECTION PROVISOIRE ---
+# Dès qu'un streamer prioritaire a été interrogé, ses PROVISIONAL_CLIPS_PER_BROADCASTER clips les plus vus
+# (dans la langue de la cible) sont publiés comme provisoires dans le flux des candidats : download_clips.py --follow
+# les télécharge sans attendre la fin de la collecte. Un clip provisoire non confirmé reste disponible
+# pour une autre cible. Les clips provisoires d'une cible s'arrêtent à sa durée minimale. 0 pour désactiver.
+# Comme pour la sélection finale, un clip qui chevauche dans sa VOD un clip déjà publié, ou quasi identique
+# à l'un d'eux (voir clip_dedup.py), n'est pas publié.
+PROVISIONAL_CLIPS_PER_BROADCASTER = 1
+
+# --- CIBLES DE COMPILATION (plusieurs chaînes / langues) ---
+# Chaque cible produit sa propre sélection à partir d'une seule passe de collecte sur l'API Helix :
+# une source (streamer ou jeu) utilisée par plusieurs cibles n'est interrogée qu'une fois, sans filtre
+# de langue si les cibles qui la partagent ont des langues différentes (le filtre est alors appliqué localement).
+#   language: code ISO 639-1, ou None pour accepter toutes les langues
+#   data_dir: dossier où écrire top_clips.json / candidate_clips.json, target_path("data", target=<nom>) : les étapes
+#       suivantes de la cible sont lancées avec "cli.py --target <nom> <étape>" (voir run_context.py).
+#       La cible principale (target="") garde data/ et output/ et se lance sans --target.
+COMPILATION_TARGETS = [
+    {
+        "name": "fr",
+        "language": CLIP_LANGUAGE,
+        "broadcaster_ids": BROADCASTER_IDS,
+        "game_ids": GAME_IDS,
+        "max_clips_per_broadcaster": MAX_CLIPS_PER_BROADCASTER_IN_FINAL_COMPILATION,
+        "min_duration_seconds": MIN_VIDEO_DURATION_SECONDS,
+        "prioritize_broadcasters": PRIORITIZE_BROADCASTERS_STRICTLY,
+        "data_dir": target_path("data", target="")
+    },
+    # Exemple de cible supplémentaire (compilation anglophone GTA V) :
+    # {
+    #     "name": "en_gta",
+    #     "language": "en",
+    #     "broadcaster_ids": [],
+    #     "game_ids": ["32982"],
+    #     "max_clips_per_broadcaster": 2,
+    #     "min_duration_seconds": 480,
+    #     "prioritize_broadcasters": False,
+    #     "data_dir": target_path("data", target="en_gta")
+    # },
+]
+
+# --- FIN PARAMÈTRES ---
+
+def fetch_clips(params, source_type, source_id):
+    """Helper function to fetch clips and handle errors."""
+    response = None
+    try:
+        response = twitch_get(TWITCH_API_URL, params=params)
+        response.raise_for_status()
+        clips_data = response.json()
+        
+        if not clips_data.get("data"):
+            print(f"  ⚠️ Aucune donnée de clip trouvée pour {source_type} {source_id} dans la période spécifiée.")
+            return []
+
+        return [Clip.from_helix(clip) for clip in clips_data.get("data", [])]
+            
+    except CredentialError as e:
+        print(f"❌ Authentification Twitch impossible pour {source_type} {source_id} : {e}")
+        return []
+    except requests.exceptions.RequestException as e:
+        print(f"❌ Erreur lors de la récupération des clips Twitch pour {source_type} {source_id} : {e}")
+        if response is not None and response.content:
+            print(f"    Contenu de la réponse API Twitch: {response.content.decode()}")
+        return []
+    except json.JSONDecodeError as e:
+        print(f"❌ Erreur de décodage JSON pour {source_type} {source_id}: {e}")
+        if response.content:
+            print(f"    Contenu brut de la réponse: {response.content.decode()}")
+        return []
+
+def build_backfill_candidates(ranked_pool, selected_clips, clips_added_per_broadcaster, max_clips_per_broadcaster, max_candidates=MAX_BACKFILL_CANDIDATES):
+    """
+    Prolonge le classement au-delà de la sélection : les clips suivants du même classement,
+    en respectant toujours la limite de clips par streamer.
+    """
+    selected_ids = {clip.id for clip in selected_clips}
+    counts = dict(clips_added_per_broadcaster)
+    backfill = []
+    for clip in ranked_pool:
+        if len(backfill) >= max_candidates:
+            break
+        if clip.id in selected_ids or clip.duration <= 0:
+            continue
+        broadcaster_id = clip.broadcaster_id
+        if counts.get(broadcaster_id, 0) >= max_clips_per_broadcaster:
+            continue
+        backfill.append(clip)
+        selected_ids.add(clip.id)
+        counts[broadcaster_id] = counts.get(broadcaster_id, 0) + 1
+    return backfill
+
+def split_time_window(start, end, hours):
+    """Découpe [start, end] en tranches consécutives de `hours` heures (la dernière peut être plus courte)."""
+    shards = []
+    cursor = start
+    while cursor < end:
+        shard_end = min(cursor + timedelta(hours=hours), end)
+        shards.append((cursor, shard_end))
+        cursor = shard_end
+    return shards
+
+def plan_shard_split(start, end, clip_count, page_size):
+    """
+    Décide si une tranche doit être réinterrogée plus finement : seulement si sa réponse est pleine
+    (d'autres clips très vus ont probablement été coupés). Retourne la liste des sous-tranches, ou [].
+    """
+    if not TIME_SHARDING_ENABLED or clip_count < page_size:
+        return []
+    hours = (end - start).total_seconds() / 3600
+    if hours > TIME_SHARD_HOURS:
+        return split_time_window(start, end, TIME_SHARD_HOURS)
+    if hours / 2 >= MIN_TIME_SHARD_HOURS:
+        return split_time_window(start, end, hours / 2)
+    return []
+
+def merge_shards(shard_results, limit=MAX_CLIPS_PER_SOURCE):
+    """Fusion k-voies (tas) des tranches triées par vues, sans doublons, limitée aux `limit` clips les plus vus."""
+    sorted_shards = [sorted(clips, key=lambda clip: clip.viewer_count, reverse=True) for clips in shard_results]
+    merged = []
+    seen_ids = set()
+    for clip in heapq.merge(*sorted_shards, key=lambda clip: clip.viewer_count, reverse=True):
+        if clip.id in seen_ids:
+            continue
+        seen_ids.add(clip.id)
+        merged.append(clip)
+        if len(merged) >= limit:
+            break
+    return merged
+
+def fetch_sources_sharded(source_params, start_date, end_date, on_source_done=None):
+    """
+    Interroge toutes les sources en parallèle. Chaque source commence par une requête sur toute la fenêtre ;
+    les tranches dont la réponse est pleine sont redécoupées (voir plan_shard_split) et réinterrogées.
+    source_params: {(type de source, ID): paramètres Helix sans started_at/ended_at, dont la profondeur de page "first"}.
+    on_source_done: fonction (source, clips) appelée dès que toutes les tranches d'une source sont terminées.
+    Retourne {(type de source, ID): [clips triés par vues]}.
+    """
+    leaf_results = {source: [] for source in source_params}
+    shard_counts = {source: 0 for source in source_params}
+    open_shards = {source: 1 for source in source_params} # Tranches lancées et pas encore terminées
+    source_clips = {}
+
+    def submit(executor, source, shard_start, shard_end):
+        params = dict(source_params[source])
+        params["started_at"] = shard_start.strftime('%Y-%m-%dT%H:%M:%SZ')
+        params["ended_at"] = shard_end.strftime('%Y-%m-%dT%H:%M:%SZ')
+        shard_counts[source] += 1
+        return executor.submit(fetch_clips, params, *source)
+
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as executor:
+        pending = {submit(executor, source, start_date, end_date): (source, start_date, end_date) for source in source_params}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                source, shard_start, shard_end = pending.pop(future)
+                clips = future.result()
+                sub_shards = plan_shard_split(shard_start, shard_end, len(clips), source_params[source]["first"])
+                if sub_shards and shard_counts[source] + len(sub_shards) <= MAX_SHARDS_PER_SOURCE:
+                    for sub_start, sub_end in sub_shards:
+                        pending[submit(executor, source, sub_start, sub_end)] = (source, sub_start, sub_end)
+                    open_shards[source] += len(sub_shards)
+                else:
+                    leaf_results[source].append(clips)
+                open_shards[source] -= 1
+                if open_shards[source] == 0:
+                    source_clips[source] = merge_shards(leaf_results[source])
+                    if shard_counts[source] > 1:
+                        print(f"  🧩 {source[0]} {source[1]} : source dense, {shard_counts[source]} requêtes par tranches -> {len(source_clips[source])} clips.")
+                    if on_source_done is not None:
+                        on_source_done(source, source_clips[source])
+
+    # Même ordre que source_params
+    return {source: source_clips[source] for source in source_params}
+
+def collect_source_languages(targets):
+    """
+    Langues demandées pour chaque source par les cibles : {(type de source, ID): {langues}}.
+    Une source listée plusieurs fois (dans une cible ou par plusieurs cibles) n'apparaît qu'une fois.
+    """
+    source_languages = {} # dict pour garder l'ordre des listes
+    for target in targets:
+        for source_type, ids in (("broadcaster_id", target["broadcaster_ids"]), ("game_id", target["game_ids"])):
+            duplicates = sorted({source_id for source_id in ids if ids.count(source_id) > 1})
+            if duplicates:
+                print(f"  ⚠️ Cible '{target['name']}' : {source_type} en double ignoré(s) : {', '.join(duplicates)}")
+            for source_id in ids:
+                source_languages.setdefault((source_type, source_id), set()).add(target["language"])
+    return source_languages
+
+def collect_source_clips(targets, num_clips_per_source=50, days_ago=3, adaptive=ADAPTIVE_FETCH_ENABLED, on_source_done=None):
+    """
+    Interroge une seule fois chaque source (streamer ou jeu) utilisée par au moins une cible,
+    en découpant la fenêtre en tranches de temps pour les sources denses.
+    adaptive: profondeur de page et report des sources selon leur rendement passé (voir source_stats.py).
+    on_source_done: voir fetch_sources_sharded (clips bruts, avant la suppression des chevauchements).
+    Retourne {(type de source, ID): [clips]} pour les sources interrogées.
+    """
+    print(f"📊 Récupération d'un maximum de {num_clips_per_source} clips Twitch par source (jeu/streamer) pour les dernières {days_ago} jours...")
+            
+    end_date = datetime.now(timezone.utc)
+    start_date = end_date - timedelta(days=days_ago)
+
+    source_languages = collect_source_languages(targets)
+    if adaptive:
+        page_sizes, deferred = plan_source_fetch(list(source_languages), num_clips_per_source, days_ago, now=end_date)
+        print_source_plan(page_sizes, deferred, num_clips_per_source)
+    else:
+        page_sizes = {source: num_clips_per_source for source in source_languages}
+
+    source_params = {}
+    print(f"\n--- Collecte des clips de {len(page_sizes)} sources uniques pour {len(targets)} cible(s) ---")
+    for (source_type, source_id), page_size in page_sizes.items():
+        languages = source_languages[(source_type, source_id)]
+        print(f"  - Recherche de clips pour le {source_type}: {source_id}")
+        params = {
+            "first": page_size,
+            "sort": "views",
+            source_type: source_id
+        }
+        # Filtre de langue côté API seulement si toutes les cibles de cette source veulent la même langue
+        if len(languages) == 1 and None not in languages:
+            params["language"] = next(iter(languages))
+        source_params[(source_type, source_id)] = params
+    source_clips = fetch_sources_sharded(source_params, start_date, end_date, on_source_done)
+
+    # --- Suppression des clips d'un même moment de stream (chevauchement dans la VOD) ---
+    print("\n--- Recherche des clips qui se chevauchent dans une même VOD ---")
+    unique_clips = {}
+    for clips in source_clips.values():
+        for clip in clips:
+            unique_clips.setdefault(clip.id, clip)
+    kept_ids = {clip.id for clip in drop_overlapping_clips(list(unique_clips.values()))}
+    for source, clips in source_clips.items():
+        source_clips[source] = [clip for clip in clips if clip.id in kept_ids]
+
+    print(f"✅ Collecté {len(kept_ids)} clips uniques au total.")
+    return source_clips
+
+def select_clips_for_target(target, source_clips, stream=None):
+    """
+    Fetches and prioritizes clips based on the target's parameters, with a limit per broadcaster.
+    stream: ClipStreamWriter du flux des candidats de la cible (les candidats définitifs y sont publiés).
+    """
+    print(f"\n======== Sélection pour la cible '{target['name']}' (langue: {target['language'] or 'toutes'}) ========")
+    max_clips_per_broadcaster = target["max_clips_per_broadcaster"]
+    min_duration_seconds = target["min_duration_seconds"]
+
+    def matches_language(clip):
+        return target["language"] is None or clip.language == target["language"]
+
+    seen_clip_ids = set() # Use a set to prevent duplicate clips across all collections
+
+    # --- Phase de collecte (à partir des sources déjà interrogées) ---
+    # Collecte tous les clips des broadcasters prioritaires
+    all_broadcaster_clips = []
+    for broadcaster_id in target["broadcaster_ids"]:
+        for clip in source_clips.get(("broadcaster_id", broadcaster_id), []):
+            if clip.id not in seen_clip_ids and matches_language(clip):
+                all_broadcaster_clips.append(clip)
+                seen_clip_ids.add(clip.id)
+    print(f"✅ {len(all_broadcaster_clips)} clips uniques de streamers prioritaires.")
+
+    # Collecte tous les clips des jeux (excluant ceux déjà vus des broadcasters)
+    all_game_clips = []
+    for game_id in target["game_ids"]:
+        for clip in source_clips.get(("game_id", game_id), []):
+            if clip.id not in seen_clip_ids and matches_language(clip): # Important: avoid duplicates from priority broadcasters
+                all_game_clips.append(clip)
+                seen_clip_ids.add(clip.id)
+    print(f"✅ {len(all_game_clips)} clips uniques des jeux spécifiés (hors clips déjà inclus).")
+
+    # --- Logique de sélection finale basée sur l'option ---
+    final_clips_for_compilation = []
+    current_duration_sum = 0.0
+    clips_added_per_broadcaster = {} # Nouveau dictionnaire pour suivre le nombre de clips ajoutés par streamer
+
+    if target["prioritize_broadcasters"]:
+        print(f"\nMode de sélection: PRIORITAIRE (streamers d'abord). Atteindre {min_duration_seconds}s.")
+        # 1. Trier et ajouter les clips des streamers prioritaires
+        sorted_priority_clips = sorted(all_broadcaster_clips, key=lambda x: x.viewer_count, reverse=True)
+        ranked_pool = sorted_priority_clips + sorted(all_game_clips, key=lambda x: x.viewer_count, reverse=True)
+        for clip in sorted_priority_clips:
+            broadcaster_id = clip.broadcaster_id
+            
+            # Vérifie si la limite pour ce streamer est atteinte
+            if clips_added_per_broadcaster.get(broadcaster_id, 0) >= max_clips_per_broadcaster:
+                print(f"  [PRIO] Ignoré : Limite de clips ({max_clips_per_broadcaster}) atteinte pour {clip.broadcaster_name}")
+                continue # Passe au clip suivant
+
+            clip_duration = clip.duration
+            if clip_duration > 0:
+                final_clips_for_compilation.append(clip)
+                current_duration_sum += clip_duration
+                # Incrémente le compteur de clips pour ce streamer
+                clips_added_per_broadcaster[broadcaster_id] = clips_added_per_broadcaster.get(broadcaster_id, 0) + 1 
+                
+                print(f"  [PRIO] Ajouté : '{clip.title}' par {clip.broadcaster_name} ({clip_duration:.1f}s, Vues: {clip.viewer_count}). Durée cumulée: {current_duration_sum:.1f}s. Clips de ce streamer: {clips_added_per_broadcaster[broadcaster_id]}/{max_clips_per_broadcaster}")
+                
+                if current_duration_sum >= min_duration_seconds and len(final_clips_for_compilation) >= 3:
+                    print(f"  ✅ Durée minimale ({min_duration_seconds}s) atteinte avec {len(final_clips_for_compilation)} clips prioritaires.")
+                    break # Stop adding priority clips
+
+        # 2. Si la durée n'est pas atteinte, compléter avec les clips de jeux
+        if current_duration_sum < min_duration_seconds:
+            print(f"  ⚠️ Durée minimale pas encore atteinte ({current_duration_sum:.1f}s). Ajout de clips des jeux pour compléter.")
+            sorted_game_clips = sorted(all_game_clips, key=lambda x: x.viewer_count, reverse=True)
+            for clip in sorted_game_clips:
+                # Double-check if already added (should be covered by seen_clip_ids, but safety)
+                if clip.id in [c.id for c in final_clips_for_compilation]:
+                    continue
+                
+                broadcaster_id = clip.broadcaster_id
+
+                # Applique aussi la limite aux clips de jeux pour éviter qu'un streamer dominent trop la fin
+                if clips_added_per_broadcaster.get(broadcaster_id, 0) >= max_clips_per_broadcaster:
+                    print(f"  [JEUX] Ignoré : Limite de clips ({max_clips_per_broadcaster}) atteinte pour {clip.broadcaster_name}")
+                    continue # Passe au clip suivant
+
+                clip_duration = clip.duration
+                if clip_duration > 0:
+                    final_clips_for_compilation.append(clip)
+                    current_duration_sum += clip_duration
+                    clips_added_per_broadcaster[broadcaster_id] = clips_added_per_broadcaster.get(broadcaster_id, 0) + 1 
+                    print(f"  [JEUX] Ajouté : '{clip.title}' par {clip.broadcaster_name} ({clip_duration:.1f}s, Vues: {clip.viewer_count}). Durée cumulée: {current_duration_sum:.1f}s. Clips de ce streamer: {clips_added_per_broadcaster[broadcaster_id]}/{max_clips_per_broadcaster}")
+                    
+                    if current_duration_sum >= min_duration_seconds and len(final_clips_for_compilation) >= 3:
+                        print(f"  ✅ Durée minimale ({min_duration_seconds}s) atteinte avec {len(final_clips_for_compilation)} clips (mix prioritaires/jeux).")
+                        break # Stop adding game clips
+
+    else: # Logique "comme avant": tout trier par vues
+        print(f"\nMode de sélection: CLASSIQUE (tous les clips triés par vues). Atteindre {min_duration_seconds}s.")
+        all_collected_clips = []
+        all_collected_clips.extend(all_broadcaster_clips)
+        all_collected_clips.extend(all_game_clips) # game_clips should not contain duplicates already in broadcaster_clips due to seen_clip_ids
+
+        # Filtrer par langue une dernière fois (au cas où l'API renverrait des clips hors langue)
+        filtered_clips_by_language = [clip for clip in all_collected_clips if matches_language(clip)]
+        sorted_clips_by_views = sorted(filtered_clips_by_language, key=lambda x: x.viewer_count, reverse=True)
+        ranked_pool = sorted_clips_by_views
+
+        for clip in sorted_clips_by_views:
+            broadcaster_id = clip.broadcaster_id
+
+            # Vérifie si la limite pour ce streamer est atteinte, même en mode classique
+            if clips_added_per_broadcaster.get(broadcaster_id, 0) >= max_clips_per_broadcaster:
+                print(f"  [GLOBAL] Ignoré : Limite de clips ({max_clips_per_broadcaster}) atteinte pour {clip.broadcaster_name}")
+                continue # Passe au clip suivant
+
+            clip_duration = clip.duration
+            if clip_duration > 0:
+                final_clips_for_compilation.append(clip)
+                current_duration_sum += clip_duration
+                clips_added_per_broadcaster[broadcaster_id] = clips_added_per_broadcaster.get(broadcaster_id, 0) + 1 
+                print(f"  [GLOBAL] Ajouté : '{clip.title}' par {clip.broadcaster_name} ({clip_duration:.1f}s, Vues: {clip.viewer_count}). Durée cumulée: {current_duration_sum:.1f}s. Clips de ce streamer: {clips_added_per_broadcaster[broadcaster_id]}/{max_clips_per_broadcaster}")
+                
+                if current_duration_sum >= min_duration_seconds and len(final_clips_for_compilation) >= 3:
+                    print(f"  ✅ Durée minimale ({min_duration_seconds}s) atteinte avec {len(final_clips_for_compilation)} clips.")
+                    break
+
+
+    # Final check and logging
+    if current_duration_sum < min_duration_seconds and final_clips_for_compilation:
+        print(f"⚠️ ATTENTION: Impossible d'atteindre la durée minimale de {min_duration_seconds} secondes ({min_duration_seconds / 60:.2f} minutes) avec les clips disponibles. Durée finale: {current_duration_sum:.1f}s")
+            
+    if not final_clips_for_compilation:
+        print(f"⚠️ Aucun clip viable n'a été sélectionné pour la cible '{target['name']}' (peut-être tous avec durée 0, ou aucun trouvé). Aucun fichier top_clips.json ne sera écrit.")
+        # La sélection d'une exécution précédente ne doit pas être reprise par download_clips.py
+        for filename in (OUTPUT_CLIPS_FILENAME, OUTPUT_CANDIDATES_FILENAME):
+            stale_path = os.path.join(target["data_dir"], filename)
+            if os.path.exists(stale_path):
+                os.remove(stale_path)
+                print(f"  🗑️ Ancienne sélection supprimée : {stale_path}")
+        return []
+
+    # The final list of clips to save
+    final_clips = final_clips_for_compilation
+
+    # --- Dédoublonnage perceptuel (sélection + clips de remplacement) avant tout téléchargement ---
+    backfill_clips = build_backfill_candidates(ranked_pool, final_clips, clips_added_per_broadcaster, max_clips_per_broadcaster)
+    candidate_clips = filter_near_duplicates(final_clips + backfill_clips)
+    kept_ids = {clip.id for clip in candidate_clips}
+    final_clips = [clip for clip in final_clips if clip.id in kept_ids]
+    backfill_clips = [clip for clip in backfill_clips if clip.id in kept_ids]
+    current_duration_sum = sum(clip.duration for clip in final_clips)
+
+    # --- DÉBUGGAGE : Affiche les clips finaux avant de les écrire dans le JSON ---
+    print("\n--- CLIPS FINAUX SÉLECTIONNÉS POUR SAUVEGARDE ---")
+    if final_clips:
+        for i, clip in enumerate(final_clips):
+            print(f"{i+1}. Title: {clip.title}, Broadcaster: {clip.broadcaster_name}, Views: {clip.viewer_count}, Duration: {clip.duration}s, Language: {clip.language}, URL: {clip.url}")
+    else:
+        print("Aucun clip à sauvegarder.")
+    print("--------------------------------------------------\n")
+            
+    os.makedirs(target["data_dir"], exist_ok=True)
+    output_clips_json = os.path.join(target["data_dir"], OUTPUT_CLIPS_FILENAME)
+    output_candidates_json = os.path.join(target["data_dir"], OUTPUT_CANDIDATES_FILENAME)
+    save_clips(output_clips_json, final_clips)
+    
+    print(f"✅ {len(final_clips)} clips récupérés et sauvegardés dans {output_clips_json} pour une durée totale de {current_duration_sum:.1f} secondes.")
+
+    save_clips(output_candidates_json, final_clips + backfill_clips)
+    print(f"✅ {len(final_clips)} clips sélectionnés + {len(backfill_clips)} clips de remplacement sauvegardés dans {output_candidates_json}.")
+    if stream is not None:
+        for clip in final_clips + backfill_clips:
+            stream.append(clip)
+    return final_clips
+
+def provisional_publisher(targets, streams):
+    """
+    Fonction à passer à collect_source_clips : publie dans le flux de chaque cible les clips les plus vus
+    de ses streamers prioritaires dès qu'ils sont interrogés (voir PROVISIONAL_CLIPS_PER_BROADCASTER),
+    sans chevauchement ni doublon avec les clips provisoires déjà publiés pour la cible.
+    """
+    published = {target["name"]: [] for target in targets}
+
+    def publish(source, clips):
+        source_type, source_id = source
+        if source_type != "broadcaster_id" or PROVISIONAL_CLIPS_PER_BROADCASTER <= 0:
+            return
+        for target in targets:
+            already = published[target["name"]]
+            if source_id not in target["broadcaster_ids"] or sum(clip.duration for clip in already) >= target["min_duration_seconds"]:
+                continue
+            eligible = [
+                clip for clip in clips
+                if clip.duration > 0 and (target["language"] is None or clip.language == target["language"])
+            ]
+            index = VodIntervalIndex(already)
+            fresh = [
+                clip for clip in drop_overlapping_clips(eligible)
+                if clip_vod_interval(clip) is None or not index.overlapping(clip.video_id, *clip_vod_interval(clip))
+            ][:min(PROVISIONAL_CLIPS_PER_BROADCASTER, target["max_clips_per_broadcaster"])]
+            if not fresh:
+                continue
+            already_ids = {clip.id for clip in already}
+            for clip in filter_near_duplicates(already + fresh):
+                if clip.id in already_ids:
+                    continue
+                streams[target["name"]].provisional(clip)
+                already.append(clip)
+                print(f"  ⚡ Clip provisoire pour '{target['name']}' : '{clip.title}' par {clip.broadcaster_name} (Vues: {clip.viewer_count}).")
+    return publish
+
+def count_selected_by_source(source_clips, selections):
+    """Nombre de clips de chaque source retenus dans les sélections finales (un clip peut venir de plusieurs sources)."""
+    sources_by_clip = {}
+    for source, clips in source_clips.items():
+        for clip in clips:
+            sources_by_clip.setdefault(clip.id, []).append(source)
+    selected = {}
+    for clips in selections.values():
+        for clip in clips:
+            for source in sources_by_clip.get(clip.id, []):
+                selected[source] = selected.get(source, 0) + 1
+    return selected
+
+def target_command(target, stage):
+    """Commande à lancer pour une étape d'une cible (voir data_dir dans COMPILATION_TARGETS)."""
+    if target["data_dir"] == target_path("data", target=""):
+        return f"python scripts/cli.py {stage}"
+    return f"python scripts/cli.py --target {target['name']} {stage}"
+
+def open_candidate_streams(targets):
+    """
+    Recrée le flux des candidats de chaque cible (candidate_clips.jsonl) : clips provisoires pendant la collecte,
+    puis liste définitive. Retourne {nom de la cible: ClipStreamWriter}.
+    """
+    return {
+        target["name"]: ClipStreamWriter(stream_path(os.path.join(target["data_dir"], OUTPUT_CANDIDATES_FILENAME)))
+        for target in targets
+    }
+
+def select_all_targets(num_clips_per_source=50, days_ago=3, targets=None, adaptive=ADAPTIVE_FETCH_ENABLED, streams=None):
+    """
+    Collecte les clips de toutes les sources en une passe, puis produit la sélection de chaque cible.
+    streams: flux des candidats déjà ouverts (voir open_candidate_streams), sinon ouverts ici.
+    Retourne {nom de la cible: clips sélectionnés}.
+    """
+    if targets is None:
+        targets = COMPILATION_TARGETS
+
+    # Le marqueur de fin est toujours écrit, y compris en cas d'erreur, pour ne pas bloquer download_clips.py --follow.
+    if streams is None:
+        streams = open_candidate_streams(targets)
+    status = "failed"
+    try:
+        source_clips = collect_source_clips(targets, num_clips_per_source, days_ago, adaptive, provisional_publisher(targets, streams))
+
+        selections = {}
+        for target in targets:
+            selections[target["name"]] = select_clips_for_target(target, source_clips, streams[target["name"]])
+        status = "ok"
+    finally:
+        for stream in streams.values():
+            stream.complete(status)
+
+    # Rendement des sources interrogées, pour le budget de requêtes des prochaines exécutions
+    record_source_yield(source_clips, collect_source_languages(targets), count_selected_by_source(source_clips, selections))
+
+    if len(targets) > 1:
+        print("\n--- Cibles prêtes ---")
+        for target in targets:
+            print(f"  {target['name']}: {len(selections[target['name']])} clips -> {target_command(target, 'download')}")
+
+    if not any(selections.values()):
+        sys.exit(0)
+    return selections
+
+def get_top_clips(num_clips_per_source=50, days_ago=3, targets=None, adaptive=ADAPTIVE_FETCH_ENABLED, streams=None):
+    """
+    Sélectionne les clips de toutes les cibles (voir select_all_targets).
+    Retourne les clips sélectionnés pour la première cible (la cible principale par défaut).
+    """
+    if targets is None:
+        targets = COMPILATION_TARGETS
+    selections = select_all_targets(num_clips_per_source, days_ago, targets, adaptive, streams)
+    return selections[targets[0]["name"]]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sélectionne les meilleurs clips Twitch de chaque cible (COMPILATION_TARGETS).")
+    parser.add_argument("--all-sources", action="store_true",
+                        help="Interroge toutes les sources à la profondeur par défaut, sans tenir compte de leur rendement passé.")
+    args = parser.parse_args(argv)
+
+    # Flux des candidats recréés avant toute étape qui peut échouer (jeton, collecte) : un download_clips.py --follow
+    # lancé en parallèle reçoit toujours un marqueur de fin. Les arguments sont lus avant, pour qu'un --help ou
+    # un argument invalide ne tronque pas le flux d'une exécution en cours (le lecteur s'arrête alors sur le PID).
+    streams = open_candidate_streams(COMPILATION_TARGETS)
+    try:
+        # Jeton obtenu (ou repris du cache) avant de lancer les requêtes parallèles
+        require_access_token("twitch")
+        get_top_clips(num_clips_per_source=50, adaptive=ADAPTIVE_FETCH_ENABLED and not args.all_sources, streams=streams)
+    finally:
+        # Sans effet si la sélection a déjà terminé les flux (voir ClipStreamWriter.complete)
+        for stream in streams.values():
+            stream.complete("failed")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
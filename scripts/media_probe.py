@@ -0,0 +1,150 @@
+import os
+import json
+import atexit
+import threading
+import subprocess
+
+from run_context import target_path, file_lock, atomic_write_json, read_json
+
+# --- Chemins des fichiers ---
+# Analyses ffprobe complètes (format + flux), identifiées par (chemin, taille, date de modification) :
+# un fichier n'est jamais analysé deux fois tant qu'il n'a pas changé. Persistant entre les exécutions.
+PROBE_CACHE_JSON = os.path.join("cache", "media_probes.json")
+MAX_PROBE_CACHE_ENTRIES = 5000 # Les analyses les plus anciennes sont oubliées au-delà
+# Chronologie de la vidéo compilée (écrite par compile_video.py) : début exact de chaque segment dans
+# la vidéo principale. Seule source des timecodes pour les légendes et les chapitres de generate_metadata.py.
+TIMELINE_JSON = target_path("data", "timeline.json")
+
+# Paramètres du flux vidéo qui doivent être identiques pour concaténer deux fichiers H.264 sans réencodage
+# (le démultiplexeur concat garde le SPS/PPS du premier fichier) ; extradata_hash couvre le SPS/PPS complet.
+VIDEO_SIGNATURE_KEYS = ("codec_name", "profile", "level", "pix_fmt", "width", "height", "refs", "has_b_frames", "time_base", "extradata_hash")
+
+_probes = None # Cache en mémoire, chargé au premier appel
+_pending_probes = {} # Nouvelles analyses, écrites sur disque une seule fois à la fin du processus (flush_probes)
+_probes_lock = threading.Lock()
+
+def probe_key(path):
+    stat = os.stat(path)
+    return f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}"
+
+def _load_probes():
+    global _probes
+    if _probes is None:
+        _probes = read_json(PROBE_CACHE_JSON, {})
+    return _probes
+
+def flush_probes():
+    """
+    Ajoute les nouvelles analyses au cache sur disque (fusion sous verrou avec celles des autres processus).
+    Appelé automatiquement à la fin du processus : le fichier est réécrit une fois, et non à chaque analyse.
+    """
+    with _probes_lock:
+        if not _pending_probes:
+            return
+        pending = dict(_pending_probes)
+        _pending_probes.clear()
+    with file_lock(PROBE_CACHE_JSON):
+        probes = read_json(PROBE_CACHE_JSON, {})
+        probes.update(pending)
+        if len(probes) > MAX_PROBE_CACHE_ENTRIES:
+            probes = dict(list(probes.items())[-MAX_PROBE_CACHE_ENTRIES:])
+        atomic_write_json(PROBE_CACHE_JSON, probes)
+
+atexit.register(flush_probes)
+
+def probe_media(filepath):
+    """
+    Analyse un fichier média avec un seul appel ffprobe (sortie JSON : format + flux), reprise du cache
+    si le fichier n'a pas changé. Retourne None si le fichier ne peut pas être analysé.
+    """
+    try:
+        key = probe_key(filepath)
+    except OSError as e:
+        print(f"  ⚠️ Impossible d'analyser {filepath}: {e}")
+        return None
+    with _probes_lock:
+        cached = _load_probes().get(key)
+    if cached is not None:
+        return cached
+
+    try:
+        cmd = [
+            "ffprobe",
+            "-v", "error",
+            "-print_format", "json",
+            "-show_format",
+            "-show_streams",
+            filepath
+        ]
+        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+        probe = json.loads(result.stdout)
+    except (subprocess.CalledProcessError, json.JSONDecodeError) as e:
+        print(f"  ⚠️ Impossible d'analyser {filepath} avec ffprobe: {e}")
+        return None
+
+    with _probes_lock:
+        _load_probes()[key] = probe
+        _pending_probes[key] = probe
+    return probe
+
+def probe_duration(filepath):
+    """Durée d'un fichier média en secondes (conteneur), ou 0.0 si elle ne peut pas être déterminée."""
+    probe = probe_media(filepath)
+    try:
+        return float((probe or {}).get("format", {}).get("duration"))
+    except (TypeError, ValueError):
+        return 0.0
+
+def probe_video_duration(filepath):
+    """Durée du flux vidéo en secondes (à défaut, celle du conteneur), ou 0.0 si elle ne peut pas être déterminée."""
+    probe = probe_media(filepath)
+    video = next((stream for stream in (probe or {}).get("streams", []) if stream.get("codec_type") == "video"), {})
+    try:
+        return float(video["duration"])
+    except (KeyError, TypeError, ValueError):
+        return probe_duration(filepath)
+
+def probe_video_signature(filepath):
+    """
+    Paramètres du premier flux vidéo (VIDEO_SIGNATURE_KEYS), avec l'empreinte SHA-256 de l'extradata (SPS/PPS).
+    Appel ffprobe dédié, repris du cache comme probe_media. Retourne None si le fichier ne peut pas être analysé.
+    """
+    try:
+        key = f"{probe_key(filepath)}|video_signature"
+    except OSError as e:
+        print(f"  ⚠️ Impossible d'analyser {filepath}: {e}")
+        return None
+    with _probes_lock:
+        cached = _load_probes().get(key)
+    if cached is not None:
+        return cached
+
+    cmd = [
+        "ffprobe", "-v", "error",
+        "-select_streams", "v:0",
+        "-show_data_hash", "SHA256",
+        "-show_streams",
+        "-print_format", "json",
+        filepath
+    ]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+        streams = json.loads(result.stdout).get("streams", [])
+    except (subprocess.CalledProcessError, json.JSONDecodeError) as e:
+        print(f"  ⚠️ Impossible d'analyser le flux vidéo de {filepath} avec ffprobe: {e}")
+        return None
+    if not streams:
+        return None
+    signature = {key_name: streams[0].get(key_name) for key_name in VIDEO_SIGNATURE_KEYS}
+    with _probes_lock:
+        _load_probes()[key] = signature
+        _pending_probes[key] = signature
+    return signature
+
+def probe_has_audio(filepath):
+    probe = probe_media(filepath)
+    return any(stream.get("codec_type") == "audio" for stream in (probe or {}).get("streams", []))
+
+def load_timeline(path=TIMELINE_JSON):
+    """Chronologie écrite par compile_video.py, ou None si la compilation ne l'a pas (encore) produite."""
+    return read_json(path, None)
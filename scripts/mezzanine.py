@@ -0,0 +1,191 @@
+import os
+import json
+import hashlib
+import subprocess
+
+from encode_scheduler import x264_arguments
+from run_context import file_lock
+from media_probe import probe_duration, probe_has_audio, probe_video_signature
+
+# --- Chemins des fichiers ---
+# Segments d'habillage déjà encodés (persistant entre les exécutions), un fichier par asset et par format
+MEZZANINE_CACHE_DIR = os.path.join("cache", "mezzanine")
+# À incrémenter si la commande de rendu change : tous les segments en cache sont alors rendus à nouveau
+MEZZANINE_VERSION = 1
+
+# --- Segments d'habillage ---
+# Pour chaque type, la première source existante est utilisée (vidéo, ou image affichée "seconds" secondes).
+# Un type sans source disponible est simplement ignoré.
+#   intro / outro: ajoutés au début / à la fin de chaque rendu (format du rendu)
+#   stinger: transition insérée entre deux clips (format des clips prétraités)
+BRANDING_SEGMENTS = {
+    "intro": {"sources": [os.path.join("assets", "intro.mp4"), os.path.join("assets", "your_logo.png")], "seconds": 2.0},
+    "outro": {"sources": [os.path.join("assets", "outro.mp4")], "seconds": 3.0},
+    "stinger": {"sources": [os.path.join("assets", "stinger.mp4")], "seconds": 0.8}
+}
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+
+# --- Format commun des segments ---
+# Les segments doivent avoir exactement les paramètres des vidéos auxquelles ils sont concaténés sans
+# réencodage : résolution, fps, base de temps, GOP (keyint par défaut de x264), en-têtes SPS/PPS et disposition
+# audio. Le preset détermine le SPS et le CRF le PPS (pic_init_qp), sauf pour un encodage "stitchable".
+SEGMENT_FPS = 30
+SEGMENT_PIX_FMT = "yuv420p"
+SEGMENT_TIMESCALE = 15360 # Base de temps du muxer MP4 de FFmpeg pour du 30 fps
+SEGMENT_AUDIO_SAMPLE_RATE = 44100
+SEGMENT_AUDIO_CHANNELS = 2
+
+def segment_format(width, height, encoder_settings, audio_bitrate):
+    """Paramètres d'un segment (clé du cache) : résolution, encodeur x264 et débit audio de la vidéo cible."""
+    return {
+        "width": width, "height": height, "fps": SEGMENT_FPS, "pix_fmt": SEGMENT_PIX_FMT,
+        "timescale": SEGMENT_TIMESCALE, "preset": encoder_settings["preset"], "crf": encoder_settings["crf"],
+        "tune": encoder_settings.get("tune"), "stitchable": bool(encoder_settings.get("stitchable")), "audio_bitrate": audio_bitrate,
+        "sample_rate": SEGMENT_AUDIO_SAMPLE_RATE, "channels": SEGMENT_AUDIO_CHANNELS
+    }
+
+def file_hash(path):
+    sha1 = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+def build_render_command(source, seconds, fmt, output_path):
+    """
+    Commande FFmpeg de rendu d'un segment : la source est mise à l'échelle (sans déformation) sur un fond
+    noir au format cible ; l'audio est rééchantillonné, ou remplacé par du silence si la source n'en a pas.
+    """
+    is_image = source.lower().endswith(IMAGE_EXTENSIONS)
+    background = f"color=c=black:s={fmt['width']}x{fmt['height']}:r={fmt['fps']}"
+    if is_image:
+        background += f":d={seconds}"
+    command = ["ffmpeg", "-f", "lavfi", "-i", background]
+    command.extend(["-loop", "1", "-framerate", str(fmt["fps"]), "-i", source] if is_image else ["-i", source])
+
+    source_has_audio = not is_image and probe_has_audio(source)
+    if not source_has_audio:
+        command.extend(["-f", "lavfi", "-i", f"anullsrc=r={fmt['sample_rate']}:cl=stereo"])
+
+    command.extend([
+        "-filter_complex",
+        f"[1:v]scale={fmt['width']}:{fmt['height']}:force_original_aspect_ratio=decrease[fg];"
+        f"[0:v][fg]overlay=x=(W-w)/2:y=(H-h)/2:shortest=1:format=auto,setsar=1[v]",
+        "-map", "[v]",
+        "-map", "1:a:0" if source_has_audio else "2:a",
+        *x264_arguments(fmt),
+        "-pix_fmt", fmt["pix_fmt"],
+        "-r", str(fmt["fps"]),
+        "-video_track_timescale", str(fmt["timescale"]),
+        "-c:a", "aac", "-b:a", fmt["audio_bitrate"], "-ar", str(fmt["sample_rate"]), "-ac", str(fmt["channels"]),
+        "-shortest", "-movflags", "+faststart",
+        "-loglevel", "error", "-y", output_path
+    ])
+    return command
+
+def get_branding_segment(kind, fmt):
+    """
+    Retourne (chemin, durée) du segment d'habillage de ce type au format demandé, rendu une seule fois puis
+    repris du cache tant que ni l'asset ni le format ne changent. Retourne None si aucune source n'existe
+    ou si le rendu échoue.
+    """
+    settings = BRANDING_SEGMENTS[kind]
+    source = next((path for path in settings["sources"] if os.path.exists(path)), None)
+    if source is None:
+        return None
+
+    key_data = json.dumps([MEZZANINE_VERSION, kind, file_hash(source), settings["seconds"], fmt], sort_keys=True)
+    segment_path = os.path.join(MEZZANINE_CACHE_DIR, f"{kind}_{hashlib.sha1(key_data.encode('utf-8')).hexdigest()}.mp4")
+    with file_lock(segment_path):
+        if not os.path.exists(segment_path):
+            print(f"  🎞️ Rendu du segment {kind} ({fmt['width']}x{fmt['height']}) depuis {source}...")
+            temp_path = f"{segment_path}.{os.getpid()}.tmp.mp4"
+            try:
+                subprocess.run(build_render_command(source, settings["seconds"], fmt, temp_path), check=True, capture_output=True, text=True)
+            except subprocess.CalledProcessError as e:
+                print(f"  ⚠️ Rendu du segment {kind} impossible, il sera ignoré : {e.stderr}")
+                return None
+            os.replace(temp_path, segment_path)
+    return segment_path, probe_duration(segment_path)
+
+def encoder_reference_signature(fmt):
+    """
+    Paramètres du flux vidéo (voir probe_video_signature) que produit libx264 avec ce format : mesurés une fois
+    sur une seconde d'image noire encodée avec les mêmes arguments, puis repris du cache. Sert à vérifier qu'un
+    fichier peut être concaténé sans réencodage avec des fichiers encodés par le pipeline. Retourne None en cas d'échec.
+    """
+    key_data = json.dumps([MEZZANINE_VERSION, "reference", fmt], sort_keys=True)
+    reference_path = os.path.join(MEZZANINE_CACHE_DIR, f"reference_{hashlib.sha1(key_data.encode('utf-8')).hexdigest()}.mp4")
+    with file_lock(reference_path):
+        if not os.path.exists(reference_path):
+            temp_path = f"{reference_path}.{os.getpid()}.tmp.mp4"
+            command = [
+                "ffmpeg", "-f", "lavfi", "-i", f"color=c=black:s={fmt['width']}x{fmt['height']}:r={fmt['fps']}:d=1",
+                *x264_arguments(fmt),
+                "-pix_fmt", fmt["pix_fmt"],
+                "-r", str(fmt["fps"]),
+                "-video_track_timescale", str(fmt["timescale"]),
+                "-loglevel", "error", "-y", temp_path
+            ]
+            try:
+                subprocess.run(command, check=True, capture_output=True, text=True)
+            except subprocess.CalledProcessError as e:
+                print(f"  ⚠️ Encodage de référence impossible : {e.stderr}")
+                return None
+            os.replace(temp_path, reference_path)
+    return probe_video_signature(reference_path)
+
+def conform_for_concat(paths, fmt):
+    """
+    Vérifie, avant une concaténation sans réencodage, que chaque fichier a les en-têtes (SPS/PPS) et les paramètres
+    vidéo de ce format (voir encoder_reference_signature) : le démultiplexeur concat ne garde que ceux du premier
+    fichier, et un fichier différent serait corrompu à la lecture. Un fichier différent est réencodé sur place avec
+    les réglages du format (audio copié). Si la référence ne peut pas être mesurée, le premier fichier sert de référence.
+    Retourne le nombre de fichiers réencodés.
+    """
+    reference = encoder_reference_signature(fmt) or probe_video_signature(paths[0])
+    conformed = 0
+    for path in dict.fromkeys(paths):
+        if probe_video_signature(path) == reference:
+            continue
+        with file_lock(path):
+            if probe_video_signature(path) == reference:
+                continue # Réencodé entre-temps par un autre processus
+            print(f"  🔧 En-têtes vidéo différents du format {fmt['width']}x{fmt['height']} (-preset {fmt['preset']} -crf {fmt['crf']}), réencodage : {os.path.basename(path)}")
+            root, extension = os.path.splitext(path)
+            temp_path = f"{root}.{os.getpid()}.conform{extension}"
+            command = [
+                "ffmpeg", "-i", path,
+                "-map", "0:v:0", "-map", "0:a?",
+                *x264_arguments(fmt),
+                "-pix_fmt", fmt["pix_fmt"],
+                "-video_track_timescale", str(fmt["timescale"]),
+                "-c:a", "copy", "-movflags", "+faststart",
+                "-loglevel", "error", "-y", temp_path
+            ]
+            try:
+                subprocess.run(command, check=True, capture_output=True, text=True)
+            except subprocess.CalledProcessError:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+            os.replace(temp_path, path)
+            conformed += 1
+    return conformed
+
+def concat_copy(paths, output_path, list_path, fmt):
+    """
+    Concatène des fichiers sans réencodage (démultiplexeur concat), après avoir réencodé ceux dont les en-têtes
+    vidéo diffèrent de ce format (voir conform_for_concat).
+    """
+    conform_for_concat(paths, fmt)
+    with open(list_path, "w", encoding="utf-8") as f:
+        for path in paths:
+            f.write(f"file '{os.path.abspath(path)}'\n")
+    command = [
+        "ffmpeg", "-f", "concat", "-safe", "0", "-i", list_path,
+        "-c", "copy", "-movflags", "+faststart",
+        "-loglevel", "error", "-y", output_path
+    ]
+    subprocess.run(command, check=True, capture_output=True, text=True)
+    os.remove(list_path)
@@ -0,0 +1,259 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import subprocess
+from datetime import datetime, timedelta
+
+from captions import render_caption, caption_strip_height
+from clip_model import Clip, load_clips
+from mezzanine import segment_format, build_render_command, conform_for_concat
+from workspace import scratch_path
+from run_context import run_path, target_path, file_lock, atomic_write_json, read_json
+
+# --- Chemins des fichiers ---
+# Archive des segments quotidiens (un fichier par clip, au format ARCHIVE_SEGMENT_FORMAT) et de leurs métadonnées de
+# sélection, partagée par toutes les exécutions. Prévoir ~400 Mo par jour : à placer sur un disque persistant, ce que ne
+# sont ni archive/ ni cache/ (10 Go au plus) sur GitHub Actions. compile_video.py n'archive que si ROLLUP_ARCHIVE_DIR
+# est défini (voir ARCHIVE_DAILY_SEGMENTS).
+ARCHIVE_DIR_ENV_VAR = "ROLLUP_ARCHIVE_DIR"
+ARCHIVE_DIR = os.getenv(ARCHIVE_DIR_ENV_VAR, "archive")
+ARCHIVE_SEGMENTS_DIR = os.path.join(ARCHIVE_DIR, "segments")
+ARCHIVE_MANIFESTS_DIR = os.path.join(ARCHIVE_DIR, "manifests") # Un manifeste JSON par jour (AAAA-MM-JJ.json)
+ARCHIVE_RETENTION_DAYS = 35 # Les jours plus anciens sont supprimés de l'archive
+# Fichiers de sélection de l'exécution, pour retrouver le nombre de vues des clips compilés
+SELECTION_FILES = [target_path("data", "candidate_clips.json"), target_path("data", "top_clips.json")]
+
+ROLLUP_WORK_DIR = run_path("data", "rollup")
+ROLLUP_OUTPUT_DIR = run_path("output")
+
+# --- Compilations récapitulatives ---
+#   days: période couverte (jusqu'à aujourd'hui inclus), clips: nombre de clips retenus (les plus vus)
+ROLLUP_PERIODS = {
+    "weekly": {"days": 7, "clips": 20, "title": "Best of de la semaine"},
+    "monthly": {"days": 30, "clips": 40, "title": "Best of du mois"}
+}
+MAX_CLIPS_PER_BROADCASTER = 3 # Variété : nombre maximal de clips d'un même streamer dans un récapitulatif
+TITLE_CARD_SECONDS = 2.0 # Carton "#rang - titre" inséré avant chaque clip
+TITLE_CARD_FONT_SIZE = 56
+
+# --- Format des segments archivés ---
+# Profil fixe, indépendant des réglages du jour (benchmark, échéance) : les segments de jours différents et les
+# cartons titres, encodés dans ce format, partagent les mêmes en-têtes SPS/PPS ("stitchable") et le récapitulatif
+# les assemble sans réencodage vidéo. Seuls les cartons titres sont encodés, et l'audio normalisé en une passe.
+# compile_video.py encode les segments comme un rendu sans légende (voir ARCHIVE_PROFILE) : avec les réglages par
+# défaut du rendu "landscape", seules les têtes de clips (sans timecode incrusté) sont encodées en plus.
+ARCHIVE_ENCODER_SETTINGS = {"preset": "medium", "crf": 23, "stitchable": True}
+ARCHIVE_SEGMENT_FORMAT = segment_format(1920, 1080, ARCHIVE_ENCODER_SETTINGS, "192k")
+LOUDNORM_FILTER = "loudnorm=I=-16:TP=-1.5:LRA=11"
+
+def load_view_counts():
+    """ID de clip -> nombre de vues, d'après les fichiers de sélection de get_top_clips.py."""
+    views = {}
+    for path in SELECTION_FILES:
+        if os.path.exists(path):
+            for clip in load_clips(path, Clip):
+                views.setdefault(clip.id, clip.viewer_count)
+    return views
+
+def concat_list(paths, list_path):
+    with open(list_path, "w", encoding="utf-8") as f:
+        for path in paths:
+            f.write(f"file '{os.path.abspath(path)}'\n")
+
+def build_archive_segment(part_paths, audio_path, output_path):
+    """
+    Assemble le segment archivé d'un clip sans réencoder la vidéo : ses parties encodées par compile_video.py
+    (vérifiées par conform_for_concat) et l'audio du segment (PCM, calé sur la vidéo), encodé en AAC.
+    """
+    conform_for_concat(part_paths, ARCHIVE_SEGMENT_FORMAT)
+    list_path = scratch_path(f"archive_{os.getpid()}_{os.path.basename(output_path)}.txt")
+    temp_path = f"{os.path.splitext(output_path)[0]}.tmp.mp4"
+    concat_list(part_paths, list_path)
+    command = [
+        "ffmpeg",
+        "-f", "concat", "-safe", "0", "-i", list_path,
+        "-i", audio_path,
+        "-map", "0:v", "-map", "1:a",
+        "-c:v", "copy",
+        "-video_track_timescale", str(ARCHIVE_SEGMENT_FORMAT["timescale"]),
+        "-c:a", "aac", "-b:a", ARCHIVE_SEGMENT_FORMAT["audio_bitrate"],
+        "-ar", str(ARCHIVE_SEGMENT_FORMAT["sample_rate"]), "-ac", str(ARCHIVE_SEGMENT_FORMAT["channels"]),
+        "-movflags", "+faststart",
+        "-loglevel", "error", "-y", temp_path
+    ]
+    try:
+        subprocess.run(command, check=True, capture_output=True, text=True)
+        os.replace(temp_path, output_path)
+    finally:
+        for path in (list_path, temp_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+def archive_daily_segments(clips, day=None):
+    """
+    Archive les clips d'une compilation quotidienne avec leurs métadonnées de sélection, pour les récapitulatifs
+    hebdomadaires et mensuels. clips: dictionnaires de downloaded_clip_paths.json complétés par "parts" (parties
+    vidéo encodées au format ARCHIVE_SEGMENT_FORMAT) et "audio" (audio du segment), fournis par compile_video.py.
+    """
+    day = day or datetime.now().strftime("%Y-%m-%d")
+    views = load_view_counts()
+    segments_dir = os.path.join(ARCHIVE_SEGMENTS_DIR, day)
+    os.makedirs(segments_dir, exist_ok=True)
+
+    entries = []
+    for clip in clips:
+        segment_path = os.path.join(segments_dir, f"{clip['id']}.mp4")
+        if not os.path.exists(segment_path):
+            try:
+                build_archive_segment(clip["parts"], clip["audio"], segment_path)
+            except (OSError, subprocess.CalledProcessError) as e:
+                print(f"  ⚠️ Impossible d'archiver le clip {clip['id']}: {getattr(e, 'stderr', None) or e}")
+                continue
+        entries.append({
+            "id": clip["id"], "path": segment_path, "duration": clip.get("duration", 0.0),
+            "title": clip.get("title"), "broadcaster_name": clip.get("broadcaster_name"),
+            "viewer_count": views.get(clip["id"], 0), "day": day
+        })
+
+    manifest_path = os.path.join(ARCHIVE_MANIFESTS_DIR, f"{day}.json")
+    with file_lock(manifest_path):
+        # Plusieurs cibles peuvent compiler le même jour : les clips s'ajoutent au manifeste existant
+        existing = {entry["id"]: entry for entry in read_json(manifest_path, [])}
+        existing.update({entry["id"]: entry for entry in entries})
+        atomic_write_json(manifest_path, list(existing.values()), ensure_ascii=False, indent=2)
+    print(f"🗄️ {len(entries)} segment(s) archivé(s) pour les récapitulatifs ({segments_dir}).")
+    prune_archive()
+
+def prune_archive(retention_days=ARCHIVE_RETENTION_DAYS):
+    """Supprime les jours archivés au-delà de la durée de conservation."""
+    if not os.path.isdir(ARCHIVE_MANIFESTS_DIR):
+        return
+    oldest = (datetime.now() - timedelta(days=retention_days)).strftime("%Y-%m-%d")
+    for filename in os.listdir(ARCHIVE_MANIFESTS_DIR):
+        day, extension = os.path.splitext(filename)
+        if extension == ".json" and day < oldest:
+            shutil.rmtree(os.path.join(ARCHIVE_SEGMENTS_DIR, day), ignore_errors=True)
+            for path in (os.path.join(ARCHIVE_MANIFESTS_DIR, filename), os.path.join(ARCHIVE_MANIFESTS_DIR, f"{filename}.lock")):
+                if os.path.exists(path):
+                    os.remove(path)
+
+def select_rollup_clips(days, count, end_day=None):
+    """Clips les plus vus de la période (un clip compilé plusieurs jours n'est compté qu'une fois)."""
+    end = datetime.strptime(end_day, "%Y-%m-%d") if end_day else datetime.now()
+    period = {(end - timedelta(days=offset)).strftime("%Y-%m-%d") for offset in range(days)}
+    pool = {}
+    for day in sorted(period):
+        for entry in read_json(os.path.join(ARCHIVE_MANIFESTS_DIR, f"{day}.json"), []):
+            if os.path.exists(entry["path"]):
+                pool[entry["id"]] = entry
+
+    selected = []
+    per_broadcaster = {}
+    for entry in sorted(pool.values(), key=lambda e: e.get("viewer_count", 0), reverse=True):
+        broadcaster = entry.get("broadcaster_name")
+        if per_broadcaster.get(broadcaster, 0) >= MAX_CLIPS_PER_BROADCASTER:
+            continue
+        selected.append(entry)
+        per_broadcaster[broadcaster] = per_broadcaster.get(broadcaster, 0) + 1
+        if len(selected) >= count:
+            break
+    return selected
+
+def build_title_card(text_lines, output_path):
+    """Encode un court carton titre au format des segments archivés (voir ARCHIVE_SEGMENT_FORMAT), silence compris."""
+    fmt = ARCHIVE_SEGMENT_FORMAT
+    strip_height = caption_strip_height(TITLE_CARD_FONT_SIZE, len(text_lines))
+    caption_path = render_caption(text_lines, fmt["width"], strip_height, TITLE_CARD_FONT_SIZE, style="box")
+    subprocess.run(build_render_command(caption_path, TITLE_CARD_SECONDS, fmt, output_path), check=True, capture_output=True, text=True)
+
+def build_rollup_command(list_path, output_path):
+    """
+    Commande FFmpeg d'assemblage du récapitulatif (démultiplexeur concat) : la vidéo des cartons titres et des
+    segments archivés est copiée sans réencodage, l'audio normalisé en une passe sur l'ensemble puis encodé en AAC.
+    """
+    return [
+        "ffmpeg",
+        "-f", "concat", "-safe", "0", "-i", list_path,
+        "-map", "0:v", "-map", "0:a",
+        "-c:v", "copy",
+        "-af", LOUDNORM_FILTER,
+        # loudnorm travaille à 192 kHz : l'audio est ramené au format des segments
+        "-c:a", "aac", "-b:a", ARCHIVE_SEGMENT_FORMAT["audio_bitrate"],
+        "-ar", str(ARCHIVE_SEGMENT_FORMAT["sample_rate"]), "-ac", str(ARCHIVE_SEGMENT_FORMAT["channels"]),
+        "-movflags", "+faststart",
+        "-loglevel", "error", "-y", output_path
+    ]
+
+def format_timecode(seconds):
+    return f"{int(seconds // 3600):02}:{int(seconds % 3600 // 60):02}:{int(seconds % 60):02}"
+
+def build_rollup(period, end_day=None, clip_count=None):
+    """
+    Assemble un récapitulatif à partir des segments archivés (aucun téléchargement) : seuls les cartons titres
+    sont encodés, les clips sont enchaînés sans réencodage vidéo (voir build_rollup_command).
+    Retourne le chemin de la vidéo, ou None si l'archive ne contient aucun clip pour la période.
+    """
+    settings = ROLLUP_PERIODS[period]
+    start = time.monotonic()
+    clips = select_rollup_clips(settings["days"], clip_count or settings["clips"], end_day)
+    if not clips:
+        print(f"⚠️ Aucun segment archivé sur les {settings['days']} derniers jours ({ARCHIVE_DIR}).")
+        return None
+    print(f"🏆 {settings['title']} : {len(clips)} clips sélectionnés parmi les segments archivés.")
+
+    os.makedirs(ROLLUP_WORK_DIR, exist_ok=True)
+    os.makedirs(ROLLUP_OUTPUT_DIR, exist_ok=True)
+
+    # Les clips sont présentés du moins vu au plus vu (compte à rebours)
+    ranked = list(enumerate(clips, start=1))[::-1]
+    paths = []
+    chapters = []
+    offset = 0.0
+    for rank, clip in ranked:
+        card_path = os.path.join(ROLLUP_WORK_DIR, f"{period}_card_{rank:02d}.mp4")
+        build_title_card([f"#{rank}", f"{clip['title']} par {clip['broadcaster_name']}"], card_path)
+        chapters.append(f"{format_timecode(offset)} - #{rank} {clip['title']} par {clip['broadcaster_name']}")
+        offset += TITLE_CARD_SECONDS + clip.get("duration", 0.0)
+        paths.extend([card_path, clip["path"]])
+
+    end_label = end_day or datetime.now().strftime("%Y-%m-%d")
+    output_path = os.path.join(ROLLUP_OUTPUT_DIR, f"rollup_{period}_{end_label}.mp4")
+    list_path = scratch_path(f"rollup_{period}_{os.getpid()}.txt")
+    try:
+        # Un segment archivé dont les en-têtes vidéo diffèrent (autre version de x264, archive antérieure) est réencodé
+        conform_for_concat(paths, ARCHIVE_SEGMENT_FORMAT)
+        concat_list(paths, list_path)
+        subprocess.run(build_rollup_command(list_path, output_path), check=True, capture_output=True, text=True)
+    except subprocess.CalledProcessError as e:
+        print(f"❌ Erreur lors de l'assemblage du récapitulatif : {e.stderr}")
+        sys.exit(1)
+    finally:
+        if os.path.exists(list_path):
+            os.remove(list_path)
+
+    metadata_path = os.path.join(ROLLUP_OUTPUT_DIR, f"rollup_{period}_{end_label}.json")
+    with open(metadata_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "title": f"{settings['title']} | Le Clip Twitch du Jour FR",
+            "description": "\n".join(["Les clips les plus vus de la période :", ""] + chapters),
+            "clips": clips
+        }, f, ensure_ascii=False, indent=2)
+
+    shutil.rmtree(ROLLUP_WORK_DIR, ignore_errors=True)
+    print(f"✅ Récapitulatif ({offset / 60:.1f} min de vidéo) assemblé en {(time.monotonic() - start) / 60:.1f} min : {output_path}")
+    print(f"Métadonnées et chapitres : {metadata_path}")
+    return output_path
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Assemble un best of hebdomadaire ou mensuel à partir des segments quotidiens archivés.")
+    parser.add_argument("period", choices=list(ROLLUP_PERIODS), help="Période du récapitulatif.")
+    parser.add_argument("--end", metavar="AAAA-MM-JJ", help="Dernier jour de la période (par défaut : aujourd'hui).")
+    parser.add_argument("--clips", type=int, help="Nombre de clips retenus (par défaut : selon la période).")
+    args = parser.parse_args(argv)
+    build_rollup(args.period, args.end, args.clips)
+
+if __name__ == "__main__":
+    main()
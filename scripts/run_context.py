@@ -0,0 +1,101 @@
+import os
+import json
+import threading
+from contextlib import contextmanager
+
+# Verrous de fichiers (POSIX). Sans fcntl (Windows), les verrous sont ignorés : une seule exécution à la fois.
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# --- CONTEXTE D'EXÉCUTION ---
+# Chaque exécution du pipeline lit et écrit ses fichiers (data/, output/) sous sa propre racine, ce qui
+# permet de lancer plusieurs exécutions en parallèle sur la même machine (rattrapage + exécution du jour,
+# plusieurs chaînes...). Les caches persistants (cache/) et la configuration (config/, assets/) restent partagés.
+#   RUN_ID: identifiant de l'exécution ; la racine est alors runs/<RUN_ID>
+#   RUN_ROOT: racine explicite (prioritaire sur RUN_ID)
+# Sans ces variables, la racine est le dossier courant (data/ et output/ à la racine du dépôt, comme avant).
+RUN_ID_ENV_VAR = "RUN_ID"
+RUN_ROOT_ENV_VAR = "RUN_ROOT"
+RUNS_DIR = "runs"
+DEFAULT_RUN_ID = "default"
+
+# --- CIBLE DE COMPILATION ---
+# Les fichiers propres à une cible (voir COMPILATION_TARGETS dans get_top_clips.py) : sélection, clips retenus,
+# vidéo compilée, chronologie, métadonnées, miniature. Sans cible (TARGET non défini), ceux de la cible
+# principale, dans data/ et output/ ; avec TARGET=<nom>, sous targets/<nom>/data et targets/<nom>/output.
+# Les clips téléchargés et prétraités restent partagés par toutes les cibles de l'exécution (run_path).
+TARGET_ENV_VAR = "TARGET"
+TARGETS_DIR = "targets"
+
+def run_id():
+    return os.getenv(RUN_ID_ENV_VAR) or DEFAULT_RUN_ID
+
+def run_root():
+    if os.getenv(RUN_ROOT_ENV_VAR):
+        return os.getenv(RUN_ROOT_ENV_VAR)
+    if os.getenv(RUN_ID_ENV_VAR):
+        return os.path.join(RUNS_DIR, os.getenv(RUN_ID_ENV_VAR))
+    return ""
+
+def run_path(*parts):
+    """Chemin d'un fichier propre à l'exécution en cours, ex. run_path("data", "top_clips.json")."""
+    return os.path.join(run_root(), *parts)
+
+def target_path(*parts, target=None):
+    """
+    Chemin d'un fichier propre à une cible, ex. target_path("data", "top_clips.json").
+    target: nom de la cible, par défaut la variable TARGET (None ou vide = cible principale).
+    """
+    target = target if target is not None else os.getenv(TARGET_ENV_VAR)
+    if target:
+        return run_path(TARGETS_DIR, target, *parts)
+    return run_path(*parts)
+
+@contextmanager
+def file_lock(path):
+    """
+    Verrou exclusif entre processus (et entre threads) sur un fichier partagé, via un fichier <path>.lock.
+    À utiliser autour de toute lecture-modification-écriture d'un cache partagé entre exécutions.
+    """
+    if fcntl is None:
+        yield
+        return
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(f"{path}.lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def atomic_write_bytes(path, data, mode=None):
+    """
+    Écrit un fichier par renommage atomique : un lecteur ne voit jamais un fichier à moitié écrit.
+    mode: permissions du fichier (ex. 0o600), appliquées avant qu'il ne soit visible.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, "wb") as f:
+        if mode is not None:
+            os.chmod(temp_path, mode)
+        f.write(data)
+    os.replace(temp_path, path)
+
+def atomic_write_json(path, data, **dump_options):
+    atomic_write_bytes(path, json.dumps(data, **dump_options).encode("utf-8"))
+
+def read_json(path, default):
+    """Relit un fichier JSON ; retourne default s'il est absent ou illisible."""
+    if not os.path.exists(path):
+        return default
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (IOError, json.JSONDecodeError):
+        return default
@@ -0,0 +1,117 @@
+import os
+import statistics
+from datetime import datetime, timedelta, timezone
+
+from run_context import file_lock, atomic_write_json, read_json
+
+# --- Chemins des fichiers ---
+# Rendement de chaque source (jeu ou streamer) lors des exécutions précédentes, persistant entre les exécutions
+# (voir l'étape de cache du workflow). Clé "<type de source>:<ID>", ex. "game_id:32982".
+#   runs: nombre d'exécutions où la source a été interrogée
+#   returned / language_hits / selected / median_views: moyennes glissantes des clips renvoyés, des clips
+#       dans la langue d'une cible, des clips retenus dans une sélection finale, et de la médiane des vues
+#   empty_runs: exécutions consécutives sans aucun clip retenu
+#   last_polled / last_selected: dates (ISO) de la dernière interrogation et du dernier clip retenu
+SOURCE_YIELD_JSON = os.path.join("cache", "metrics", "source_yield.json")
+
+# --- BUDGET DE REQUÊTES ---
+# Profondeur de page ("first" de l'API Helix, 100 au maximum) selon la valeur attendue d'une source :
+#   une source qui place régulièrement des clips dans la sélection est interrogée en profondeur,
+#   une source dont aucun clip n'est dans la langue des cibles ne reçoit qu'une page courte.
+MIN_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+HIGH_VALUE_SELECTED_PER_RUN = 1.0 # Clips retenus par exécution au-delà desquels la profondeur est maximale
+# Une source sans statistiques suffisantes garde la profondeur par défaut et est interrogée à chaque exécution
+MIN_RUNS_FOR_ADAPTATION = 3
+# Une source sans clip retenu depuis DEFER_AFTER_EMPTY_RUNS exécutions n'est plus interrogée qu'à intervalle
+# croissant (1, 2, 4... jours), plafonné à la fenêtre de recherche : chaque clip reste vu au moins une fois.
+DEFER_AFTER_EMPTY_RUNS = 3
+# Poids des nouvelles mesures dans la moyenne glissante
+MEASUREMENT_WEIGHT = 0.3
+
+def source_key(source):
+    source_type, source_id = source
+    return f"{source_type}:{source_id}"
+
+def load_source_stats(path=SOURCE_YIELD_JSON):
+    return read_json(path, {})
+
+def page_size_for(stats, default_page_size):
+    """Profondeur de page d'une source d'après sa valeur attendue (clips retenus et clips dans la langue)."""
+    if not stats or stats.get("runs", 0) < MIN_RUNS_FOR_ADAPTATION:
+        return default_page_size
+    if stats["selected"] >= HIGH_VALUE_SELECTED_PER_RUN:
+        return MAX_PAGE_SIZE
+    if stats["selected"] > 0:
+        # Entre la profondeur par défaut et la profondeur maximale, proportionnellement aux clips retenus
+        share = stats["selected"] / HIGH_VALUE_SELECTED_PER_RUN
+        return int(min(MAX_PAGE_SIZE, default_page_size + share * (MAX_PAGE_SIZE - default_page_size)))
+    if stats["language_hits"] < 1:
+        return MIN_PAGE_SIZE
+    return max(MIN_PAGE_SIZE, default_page_size // 2)
+
+def poll_interval(stats, window_days):
+    """Intervalle minimal entre deux interrogations d'une source (timedelta nul : à chaque exécution)."""
+    empty_runs = (stats or {}).get("empty_runs", 0)
+    if (stats or {}).get("runs", 0) < MIN_RUNS_FOR_ADAPTATION or empty_runs < DEFER_AFTER_EMPTY_RUNS:
+        return timedelta(0)
+    return timedelta(days=min(window_days, 2 ** (empty_runs - DEFER_AFTER_EMPTY_RUNS)))
+
+def plan_source_fetch(sources, default_page_size, window_days, stats=None, now=None):
+    """
+    Répartit le budget de requêtes entre les sources (dans l'ordre donné, sans doublons).
+    Retourne ({source: profondeur de page} des sources à interroger, {source: date de la prochaine interrogation} des sources reportées).
+    """
+    stats = load_source_stats() if stats is None else stats
+    now = now or datetime.now(timezone.utc)
+    page_sizes = {}
+    deferred = {}
+    for source in dict.fromkeys(sources):
+        source_stats = stats.get(source_key(source))
+        interval = poll_interval(source_stats, window_days)
+        if interval and source_stats.get("last_polled"):
+            next_poll = datetime.fromisoformat(source_stats["last_polled"]) + interval
+            if next_poll > now:
+                deferred[source] = next_poll
+                continue
+        page_sizes[source] = page_size_for(source_stats, default_page_size)
+    return page_sizes, deferred
+
+def record_source_yield(source_clips, source_languages, selected_sources, path=SOURCE_YIELD_JSON, now=None):
+    """
+    Met à jour le rendement des sources interrogées pendant cette exécution.
+    source_clips: {source: [clips renvoyés]} ; source_languages: {source: langues des cibles (None = toutes)} ;
+    selected_sources: {source: nombre de clips de la source retenus dans une sélection finale}.
+    """
+    now = (now or datetime.now(timezone.utc)).isoformat(timespec="seconds")
+    with file_lock(path):
+        recorded = read_json(path, {})
+        for source, clips in source_clips.items():
+            languages = source_languages.get(source, {None})
+            language_hits = sum(1 for clip in clips if None in languages or clip.language in languages)
+            selected = selected_sources.get(source, 0)
+            measurements = {
+                "returned": len(clips),
+                "language_hits": language_hits,
+                "selected": selected,
+                "median_views": statistics.median(clip.viewer_count for clip in clips) if clips else 0
+            }
+            entry = recorded.setdefault(source_key(source), {"runs": 0, "empty_runs": 0, "last_selected": None})
+            for name, value in measurements.items():
+                previous = entry.get(name, value)
+                entry[name] = round((1 - MEASUREMENT_WEIGHT) * previous + MEASUREMENT_WEIGHT * value, 3)
+            entry["runs"] += 1
+            entry["empty_runs"] = 0 if selected else entry["empty_runs"] + 1
+            entry["last_polled"] = now
+            if selected:
+                entry["last_selected"] = now
+        atomic_write_json(path, recorded, indent=2)
+
+def print_source_plan(page_sizes, deferred, default_page_size):
+    """Résumé du budget de requêtes : sources reportées et profondeurs adaptées."""
+    adapted = {source: size for source, size in page_sizes.items() if size != default_page_size}
+    print(f"📈 Budget de requêtes : {len(page_sizes)} source(s) interrogée(s), {len(adapted)} à profondeur adaptée, {len(deferred)} reportée(s).")
+    for source, next_poll in deferred.items():
+        print(f"  ⏭️ {source[0]} {source[1]} : aucun clip retenu récemment, prochaine interrogation après le {next_poll:%Y-%m-%d %H:%M} UTC.")
+    for source, size in adapted.items():
+        print(f"  🎚️ {source[0]} {source[1]} : {size} clips par page (au lieu de {default_page_size}).")
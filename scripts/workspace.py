@@ -0,0 +1,173 @@
+import os
+import json
+import time
+import shutil
+import threading
+
+from run_context import run_id, run_path, file_lock, atomic_write_json
+
+# --- Chemins des fichiers ---
+# Registre des fichiers intermédiaires de l'exécution (partagé par les étapes, qui sont des processus distincts)
+WORKSPACE_LEDGER_JSON = run_path("data", "workspace_ledger.json")
+
+# --- BUDGET DISQUE ---
+# Taille maximale des fichiers intermédiaires suivis (variable d'environnement WORKSPACE_DISK_BUDGET_MB pour la modifier).
+# Au-delà, les fichiers qui n'ont plus de consommateur en attente sont supprimés, du plus ancien au plus récent.
+DEFAULT_DISK_BUDGET_MB = 8 * 1024
+DISK_BUDGET_ENV_VAR = "WORKSPACE_DISK_BUDGET_MB"
+
+# --- ESPACE TEMPORAIRE (scratch) ---
+# Les fichiers propres à une exécution (audio PCM des segments et listes de concaténation de compile_video.py) sont
+# placés sur un tmpfs quand il a assez de place : SCRATCH_DIR si défini, sinon /dev/shm, sinon data/scratch.
+# Chaque exécution (voir run_context.py) a son propre sous-dossier.
+SCRATCH_ENV_VAR = "SCRATCH_DIR"
+TMPFS_DIR = "/dev/shm"
+FALLBACK_SCRATCH_DIR = run_path("data", "scratch")
+SCRATCH_SUBDIR = "lctdj"
+# Marge laissée libre sur le tmpfs (il partage la mémoire vive avec FFmpeg)
+TMPFS_RESERVED_BYTES = 1024 * 1024 * 1024
+
+# Classes d'artefacts suivies. Un artefact est supprimé dès que son dernier consommateur l'a libéré.
+#   raw_clips: téléchargements yt-dlp, consommés par le prétraitement et la sélection de la meilleure frame
+#   processed_clips: clips normalisés, consommés par compile_video.py (un consommateur par cible qui les utilise)
+#   clip_frames / thumbnail_frames: frames extraites, consommées par generate_thumbnail.py
+#   compile_segments: parties encodées et audio des segments de compile_video.py, gardés pour une recompilation
+ARTIFACT_CLASSES = ["raw_clips", "processed_clips", "clip_frames", "thumbnail_frames", "compile_segments"]
+
+def disk_budget_bytes():
+    try:
+        return int(float(os.getenv(DISK_BUDGET_ENV_VAR, DEFAULT_DISK_BUDGET_MB)) * 1024 * 1024)
+    except ValueError:
+        print(f"⚠️ {DISK_BUDGET_ENV_VAR} invalide, budget par défaut ({DEFAULT_DISK_BUDGET_MB} Mo) utilisé.")
+        return DEFAULT_DISK_BUDGET_MB * 1024 * 1024
+
+def scratch_dir(expected_bytes=0):
+    """
+    Dossier scratch de l'exécution : SCRATCH_DIR, sinon /dev/shm si expected_bytes y tiennent (en gardant
+    TMPFS_RESERVED_BYTES libres), sinon data/scratch sur le disque persistant.
+    """
+    candidates = []
+    if os.getenv(SCRATCH_ENV_VAR):
+        candidates.append(os.path.join(os.getenv(SCRATCH_ENV_VAR), run_id()))
+    if os.path.isdir(TMPFS_DIR):
+        candidates.append(os.path.join(TMPFS_DIR, SCRATCH_SUBDIR, run_id()))
+    for directory in candidates:
+        try:
+            os.makedirs(directory, exist_ok=True)
+            if shutil.disk_usage(directory).free - expected_bytes >= TMPFS_RESERVED_BYTES:
+                return directory
+        except OSError:
+            continue
+    os.makedirs(FALLBACK_SCRATCH_DIR, exist_ok=True)
+    return FALLBACK_SCRATCH_DIR
+
+def scratch_path(filename, expected_bytes=0):
+    """Chemin d'un fichier temporaire sur l'espace scratch (voir scratch_dir)."""
+    return os.path.join(scratch_dir(expected_bytes), filename)
+
+def format_bytes(size):
+    return f"{size / (1024 * 1024):.1f} Mo"
+
+class Workspace:
+    """
+    Suit les fichiers intermédiaires d'une exécution : taille par classe d'artefact et consommateurs
+    en attente. Le registre est relu et réécrit à chaque opération, car chaque étape du pipeline
+    est un processus distinct ; un verrou de fichier protège les accès concurrents.
+    """
+
+    def __init__(self, ledger_path=WORKSPACE_LEDGER_JSON, budget_bytes=None):
+        self.ledger_path = ledger_path
+        self.budget_bytes = budget_bytes if budget_bytes is not None else disk_budget_bytes()
+        self.lock = threading.Lock()
+
+    def _load(self):
+        if not os.path.exists(self.ledger_path):
+            return {"artifacts": {}, "peak_bytes": 0}
+        try:
+            with open(self.ledger_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (IOError, json.JSONDecodeError) as e:
+            print(f"  ⚠️ Registre de l'espace de travail illisible ({e}), il sera recréé.")
+            return {"artifacts": {}, "peak_bytes": 0}
+
+    def _save(self, ledger):
+        atomic_write_json(self.ledger_path, ledger, indent=2)
+
+    def register(self, path, artifact_class, consumers=()):
+        """Enregistre (ou met à jour) un artefact et ajoute ses consommateurs en attente."""
+        if not path or not os.path.exists(path):
+            return
+        with self.lock, file_lock(self.ledger_path):
+            ledger = self._load()
+            key = os.path.normpath(path)
+            entry = ledger["artifacts"].setdefault(key, {"class": artifact_class, "consumers": [], "created": time.time()})
+            entry["size"] = os.path.getsize(key)
+            entry["consumers"].extend(consumers)
+            total = sum(artifact["size"] for artifact in ledger["artifacts"].values())
+            ledger["peak_bytes"] = max(ledger.get("peak_bytes", 0), total)
+            if total > self.budget_bytes:
+                self._evict(ledger, total)
+            self._save(ledger)
+
+    def release(self, path, consumer, keep=False):
+        """
+        Signale qu'un consommateur a fini d'utiliser l'artefact. S'il n'a plus aucun consommateur en attente,
+        le fichier est supprimé, sauf si keep est vrai : il reste alors disponible (réutilisable par une autre
+        cible) jusqu'à ce que le budget disque impose de le supprimer. Retourne True si le fichier a été supprimé.
+        """
+        if not path:
+            return False
+        with self.lock, file_lock(self.ledger_path):
+            ledger = self._load()
+            key = os.path.normpath(path)
+            entry = ledger["artifacts"].get(key)
+            if entry is None:
+                return False
+            if consumer in entry["consumers"]:
+                entry["consumers"].remove(consumer)
+            deleted = False
+            if not entry["consumers"] and not keep:
+                deleted = self._delete(ledger, key)
+            self._save(ledger)
+            return deleted
+
+    def _delete(self, ledger, key):
+        ledger["artifacts"].pop(key, None)
+        try:
+            os.remove(key)
+            return True
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            print(f"  ⚠️ Impossible de supprimer {key}: {e}")
+            return False
+
+    def _evict(self, ledger, total):
+        """Supprime les artefacts sans consommateur en attente (les plus anciens d'abord) jusqu'à repasser sous le budget."""
+        idle = sorted(
+            (key for key, entry in ledger["artifacts"].items() if not entry["consumers"]),
+            key=lambda key: ledger["artifacts"][key]["created"]
+        )
+        for key in idle:
+            if total <= self.budget_bytes:
+                break
+            size = ledger["artifacts"][key]["size"]
+            if self._delete(ledger, key):
+                total -= size
+                print(f"  🧹 Budget disque dépassé : {key} supprimé ({format_bytes(size)}).")
+        if total > self.budget_bytes:
+            print(f"  ⚠️ Budget disque ({format_bytes(self.budget_bytes)}) dépassé : {format_bytes(total)} encore utilisés par des fichiers en attente de traitement.")
+
+    def usage(self):
+        """Retourne {classe d'artefact: octets} pour les fichiers encore présents."""
+        with self.lock:
+            ledger = self._load()
+        usage = {artifact_class: 0 for artifact_class in ARTIFACT_CLASSES}
+        for entry in ledger["artifacts"].values():
+            usage[entry["class"]] = usage.get(entry["class"], 0) + entry["size"]
+        return usage, ledger.get("peak_bytes", 0)
+
+    def report(self):
+        usage, peak_bytes = self.usage()
+        details = ", ".join(f"{artifact_class}: {format_bytes(size)}" for artifact_class, size in usage.items() if size)
+        print(f"💾 Espace de travail : {format_bytes(sum(usage.values()))} ({details or 'vide'}), pic {format_bytes(peak_bytes)}, budget {format_bytes(self.budget_bytes)}.")